@@ -5,13 +5,14 @@ import json
 import secrets
 import string
 from types import TracebackType
-from typing import Optional, Type
+from typing import Any, Optional, Type
 
 import typer
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
 from pymongo.operations import SearchIndexModel
 
-from whyhow_api.config import Settings
+from whyhow_api.config import Settings, SettingsMongoDB
 from whyhow_api.database import (
     close_mongo_connection,
     connect_to_mongo,
@@ -54,10 +55,42 @@ def generate_api_key(length: int = 40) -> str:
     return "".join(secrets.choice(characters) for _ in range(length))
 
 
+def vector_index_fields(
+    search_index: dict[str, Any], settings: SettingsMongoDB
+) -> list[dict[str, Any]]:
+    """Adapt the fields of a vector search index to the MongoDB settings.
+
+    The dimensions of vector fields are taken from the setting named by the
+    index's `dimensions_setting`, if any. `bit` vectors are compared with
+    euclidean (hamming) distance, the only similarity Atlas supports for
+    them, and automatic quantization only applies to float vectors.
+    """
+    fields = []
+    for field in search_index["fields"]:
+        if field["type"] == "vector":
+            field = {**field}
+            if "dimensions_setting" in search_index:
+                field["numDimensions"] = getattr(
+                    settings, search_index["dimensions_setting"]
+                )
+            if settings.embedding_storage_format == "bit":
+                field["similarity"] = "euclidean"
+            elif (
+                settings.embedding_storage_format in ("array", "float32")
+                and settings.vector_index_quantization != "none"
+            ):
+                field["quantization"] = settings.vector_index_quantization
+        fields.append(field)
+    return fields
+
+
 async def setup_collections_and_indexes(
-    db: AsyncIOMotorDatabase, config_file: str
+    db: AsyncIOMotorDatabase,
+    config_file: str,
+    settings: SettingsMongoDB | None = None,
 ) -> None:
     """Set up collections and indexes from a configuration file."""
+    settings = settings or Settings().mongodb
     with open(config_file, "r") as file:
         config = json.load(file)
 
@@ -103,7 +136,11 @@ async def setup_collections_and_indexes(
                 elif search_index["type"] == "vectorSearch":
                     # Vector Search indexes
                     search_index_model = SearchIndexModel(
-                        definition={"fields": search_index["fields"]},
+                        definition={
+                            "fields": vector_index_fields(
+                                search_index, settings
+                            )
+                        },
                         name=search_index["name"],
                         type="vectorSearch",
                     )
@@ -120,6 +157,61 @@ async def setup_collections_and_indexes(
                 )
 
 
+async def move_chunk_embeddings(
+    db: AsyncIOMotorDatabase, batch_size: int = 1000
+) -> int:
+    """Move chunk embeddings into the `chunk_embedding` collection.
+
+    Chunks are moved in batches, each embedding being upserted before it
+    is unset from its chunk, so an interrupted run can be resumed.
+    """
+    moved = 0
+    while True:
+        chunks = (
+            await db.chunk.find(
+                {"embedding": {"$exists": True}},
+                {
+                    "created_by": 1,
+                    "document": 1,
+                    "workspaces": 1,
+                    "data_type": 1,
+                    "embedding": 1,
+                },
+            )
+            .limit(batch_size)
+            .to_list(None)
+        )
+        if not chunks:
+            break
+
+        await db.chunk_embedding.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": chunk["_id"]},
+                    {
+                        "$set": {
+                            "created_by": chunk["created_by"],
+                            "document": chunk.get("document"),
+                            "workspaces": chunk.get("workspaces", []),
+                            "data_type": chunk.get("data_type"),
+                            "embedding": chunk["embedding"],
+                        }
+                    },
+                    upsert=True,
+                )
+                for chunk in chunks
+            ],
+            ordered=False,
+        )
+        await db.chunk.update_many(
+            {"_id": {"$in": [chunk["_id"] for chunk in chunks]}},
+            {"$unset": {"embedding": ""}},
+        )
+        moved += len(chunks)
+        print(f"Moved {moved} chunk embeddings.")
+    return moved
+
+
 async def create_user_in_db(
     db: AsyncIOMotorDatabase, email: str, openai_key: str
 ) -> None:
@@ -152,9 +244,32 @@ def setup_collections(
         ..., help="Path to the configuration JSON file."
     )
 ) -> None:
-    """Set up collections and indexes."""
+    """Set up collections and indexes.
+
+    Vector search indexes follow the embedding dimensions, storage format
+    and quantization of the MongoDB settings.
+    """
+    connection = MongoDBConnection()
+    with connection as db:
+        asyncio.run(
+            setup_collections_and_indexes(
+                db, config_file, connection.settings.mongodb
+            )
+        )
+
+
+@app.command()
+def split_chunk_embeddings(
+    batch_size: int = typer.Option(
+        1000, help="Number of chunks moved at once."
+    )
+) -> None:
+    """Move chunk embeddings into the `chunk_embedding` collection.
+
+    Run before enabling the `chunk_embedding_collection` setting.
+    """
     with MongoDBConnection() as db:
-        asyncio.run(setup_collections_and_indexes(db, config_file))
+        asyncio.run(move_chunk_embeddings(db, batch_size))
 
 
 @app.command()
@@ -51,6 +51,9 @@ OPENAI_RATE_LIMITS = {
     },
 }
 OPENAI_TIERS = Literal[1, 2, 3, 4, 5]
+EMBEDDING_STORAGE_FORMATS = Literal["array", "float32", "int8", "bit"]
+QUERY_RERANKERS = Literal["local", "llm"]
+VECTOR_INDEX_QUANTIZATIONS = Literal["none", "scalar", "binary"]
 
 
 class SettingsDev(BaseModel):
@@ -147,6 +150,80 @@ class SettingsAPI(BaseModel):
         64  # max number of candidates to consider (default mongodb)
     )
     restrict_structured_chunk_retrieval: bool = False
+    build_embedding_concurrency: int = (
+        4  # max number of triple batches embedded concurrently during a graph build
+    )
+    build_embedding_queue_size: int = (
+        8  # max number of committed triple batches waiting to be embedded
+    )
+    build_batch_size: int = 1000  # number of nodes or triples per write batch
+    build_max_concurrent_batches: int = (
+        4  # max number of write batches in flight during a graph build
+    )
+    build_ordered_bulk_writes: bool = False
+    build_stream_queue_size: int = (
+        2  # max number of streamed triple batches waiting to be written
+    )
+    build_streaming: bool = (
+        True  # write extracted triples while the extraction is still running
+    )
+    completion_cache_enabled: bool = True
+    completion_cache_ttl_seconds: int = 30 * 24 * 60 * 60  # 30 days
+    completion_cache_max_entries: int = 100_000
+    completion_cache_evict_interval: int = (
+        100  # writes between checks of the completion cache size
+    )
+    completion_cache_nonzero_temperature: bool = (
+        False  # cache completions sampled with a temperature above zero
+    )
+    extraction_max_concurrency: int = (
+        16  # max number of triple extraction requests in flight
+    )
+    extraction_max_retries: int = 4  # retries of a failed extraction request
+    extraction_retry_base_delay: float = 1.0  # seconds, doubled per retry
+    extraction_retry_max_delay: float = 30.0  # seconds
+    extraction_progress_interval: float = (
+        2.0  # seconds between extraction progress updates of a task
+    )
+    llm_client_pool_size: int = 64  # max number of pooled LLM clients
+    llm_client_close_delay: float = (
+        60.0  # seconds before an evicted LLM client is closed
+    )
+    llm_max_connections: int = 100  # per pooled LLM client
+    llm_max_keepalive_connections: int = 20  # per pooled LLM client
+    llm_keepalive_expiry: float = 30.0  # seconds an idle connection is kept
+    llm_http2: bool = True  # used only if the `h2` package is installed
+    query_cache_enabled: bool = True
+    query_cache_ttl_seconds: int = 60 * 60  # 1 hour
+    query_cache_similarity_threshold: float | None = (
+        None  # min cosine similarity of near-duplicate queries, exact if unset
+    )
+    query_cache_similarity_candidates: int = (
+        100  # max number of cached queries compared for near-duplicate hits
+    )
+    query_reranker: QUERY_RERANKERS = (
+        "local"  # relevance check of similar triples, unless set per query
+    )
+    query_rerank_min_score: float = (
+        0.75  # min vector search score of triples kept by the local reranker
+    )
+    query_rerank_top_k: int = (
+        16  # max number of triples kept by the local reranker
+    )
+    query_rerank_mmr_lambda: float = (
+        0.7  # weight of relevance over diversity in MMR, 1 to rank by score
+    )
+    embedding_cache_enabled: bool = True
+    embedding_cache_ttl_seconds: int = 30 * 24 * 60 * 60  # 30 days
+    embedding_cache_memory_entries: int = (
+        10_000  # max number of embeddings cached in process memory
+    )
+    embedding_max_concurrency: int = (
+        4  # max number of embedding batches in flight per call
+    )
+    embedding_batch_max_tokens: int = (
+        250_000  # below the provider's limit of 300k tokens per request
+    )
 
     model_config = SettingsConfigDict(frozen=True)
 
@@ -241,7 +318,22 @@ class SettingsMongoDB(BaseModel):
     # group_id: str | None = None
     # cluster_name: str | None = None
     chunk_collection_name: str = "chunk"
-    vector_search_embedding_size: int = 1536
+    vector_search_embedding_size: int = 1536  # chunk embedding dimensions
+    triple_vector_search_embedding_size: int = (
+        1024  # triple embedding dimensions
+    )
+    embedding_storage_format: EMBEDDING_STORAGE_FORMATS = (
+        "array"  # array of doubles, or BSON binary vector
+    )
+    vector_index_quantization: VECTOR_INDEX_QUANTIZATIONS = (
+        "none"  # automatic quantization of `array` and `float32` vectors
+    )
+    chunk_embedding_collection: bool = (
+        False  # store chunk embeddings in the `chunk_embedding` collection
+    )
+    triple_vector_index_type_filter: bool = (
+        False  # the triple vector search index has a `type` filter field
+    )
 
     model_config = SettingsConfigDict(frozen=True)
 
@@ -265,6 +357,7 @@ class SettingsLogfire(BaseModel):
     """Logfire settings."""
 
     token: SecretStr | None = None
+    llm_span_sample_rate: float = 1.0  # fraction of LLM request spans sent
 
 
 class Settings(BaseSettings):
@@ -7,15 +7,19 @@ from typing import Any, Dict, List, Union
 
 from bson import ObjectId
 
+from whyhow_api.config import Settings
 from whyhow_api.schemas.chunks import ChunkDocumentModel
 from whyhow_api.schemas.graphs import GraphDocumentModel
 from whyhow_api.schemas.nodes import NodeDocumentModel
 from whyhow_api.schemas.schemas import SchemaDocumentModel
 from whyhow_api.schemas.triples import TripleDocumentModel
 from whyhow_api.schemas.workspaces import WorkspaceDocumentModel
+from whyhow_api.utilities.vectors import encode_vector
 
 logger = logging.getLogger(__name__)
 
+settings = Settings()
+
 
 class DemoDataLoader:
     """Initialises demo data from JSON files for testing environments and new users."""
@@ -88,6 +92,15 @@ class DemoDataLoader:
             else:
                 data[key] = data[key].model_dump(by_alias=True)
 
+        # Store the embeddings in the configured format
+        for key in ["chunks", "triples"]:
+            for document in data[key]:
+                if document.get("embedding") is not None:
+                    document["embedding"] = encode_vector(
+                        document["embedding"],
+                        settings.mongodb.embedding_storage_format,
+                    )
+
         return data
 
     def process_chunks(self) -> list[ChunkDocumentModel]:
@@ -2,7 +2,7 @@
 
 import logging
 from functools import cache
-from typing import Any, AsyncGenerator, Dict, List
+from typing import Any, AsyncGenerator, Callable, Dict, List
 
 ###########################
 # Auth0 used for UI #######
@@ -11,6 +11,8 @@ from typing import Any, AsyncGenerator, Dict, List
 # import requests
 # from auth0.authentication import GetToken
 # from auth0.management import Auth0
+import httpx
+import logfire
 from bson import ObjectId
 from bson.errors import InvalidId
 from fastapi import Depends, HTTPException, Request, status
@@ -19,7 +21,7 @@ from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from openai import AsyncAzureOpenAI, AsyncOpenAI
 from pydantic import ValidationError
 
-from whyhow_api.config import Settings
+from whyhow_api.config import OPENAI_RATE_LIMITS, Settings
 from whyhow_api.database import get_client
 from whyhow_api.models.common import LLMClient
 from whyhow_api.schemas.chunks import ChunkDocumentModel
@@ -45,6 +47,19 @@ from whyhow_api.schemas.workspaces import WorkspaceDocumentModel
 from whyhow_api.services.crud.base import get_all, get_one
 from whyhow_api.services.crud.document import get_document
 from whyhow_api.services.crud.graph import get_graph
+from whyhow_api.utilities.embedding_batcher import (
+    EmbeddingBatcher,
+    get_embedding_tokenizer,
+)
+from whyhow_api.utilities.embedding_cache import (
+    EmbeddingCache,
+    get_embedding_lru,
+)
+from whyhow_api.utilities.llm_client_pool import (
+    LLMProviderClient,
+    get_llm_client_pool,
+)
+from whyhow_api.utilities.rate_limiter import get_rate_limiter
 from whyhow_api.utilities.validation import safe_object_id
 
 logger = logging.getLogger(__name__)
@@ -211,6 +226,76 @@ async def get_user(
         )
 
 
+def get_pooled_llm_client(
+    settings: Settings,
+    provider: str,
+    create: Callable[[httpx.AsyncClient], LLMProviderClient],
+    api_key: str,
+    endpoint: str | None = None,
+    api_version: str | None = None,
+) -> LLMProviderClient:
+    """Get the pooled client of a provider config, creating it if needed.
+
+    New clients are instrumented with Logfire.
+    """
+    pool = get_llm_client_pool(
+        max_size=settings.api.llm_client_pool_size,
+        close_delay=settings.api.llm_client_close_delay,
+        max_connections=settings.api.llm_max_connections,
+        max_keepalive_connections=settings.api.llm_max_keepalive_connections,
+        keepalive_expiry=settings.api.llm_keepalive_expiry,
+        http2=settings.api.llm_http2,
+    )
+    key = pool.make_key(provider, api_key, endpoint, api_version)
+
+    def create_instrumented(
+        http_client: httpx.AsyncClient,
+    ) -> LLMProviderClient:
+        # Instrumented once per client, as pooled clients are reused
+        client = create(http_client)
+        logfire.instrument_openai(client)
+        return client
+
+    return pool.get(key, create_instrumented)
+
+
+def get_embedding_cache(
+    db: AsyncIOMotorDatabase, settings: Settings, client: LLMProviderClient
+) -> EmbeddingCache | None:
+    """Get the embedding cache of an LLM client, if enabled."""
+    if not settings.api.embedding_cache_enabled:
+        return None
+    return EmbeddingCache(
+        collection=db["embedding_cache"],
+        lru=get_embedding_lru(settings.api.embedding_cache_memory_entries),
+        ttl_seconds=settings.api.embedding_cache_ttl_seconds,
+        endpoint=str(client.base_url),
+    )
+
+
+def get_embedding_batcher(
+    client: LLMProviderClient, embedding_name: str | None, settings: Settings
+) -> EmbeddingBatcher:
+    """Get the embedding batcher of an LLM client.
+
+    Embedding requests are rate limited per provider endpoint, API key and
+    embedding model.
+    """
+    model = embedding_name if embedding_name else "text-embedding-3-small"
+    rate_limits = OPENAI_RATE_LIMITS[settings.generative.openai.tier]
+    limits = rate_limits.get(model, rate_limits["text-embedding-3-small"])
+    return EmbeddingBatcher(
+        max_batch_tokens=settings.api.embedding_batch_max_tokens,
+        max_concurrency=settings.api.embedding_max_concurrency,
+        rate_limiter=get_rate_limiter(
+            f"{client.base_url}:{client.api_key}:{model}",
+            limits["rpm"],
+            limits["tpm"],
+        ),
+        tokenizer=get_embedding_tokenizer(),
+    )
+
+
 async def get_llm_client(
     user_id: ObjectId = Depends(get_user),
     db: AsyncIOMotorDatabase = Depends(get_db),
@@ -294,12 +379,30 @@ async def get_llm_client(
                 detail="BYO Azure OpenAI embedding name is missing",
             )
 
-        azure_client = AsyncAzureOpenAI(
-            api_key=llm_provider.api_key,
-            api_version=byo_aoai_metadata.api_version,
-            azure_endpoint=byo_aoai_metadata.azure_endpoint,
+        api_key = llm_provider.api_key
+        api_version = byo_aoai_metadata.api_version
+        azure_endpoint = byo_aoai_metadata.azure_endpoint
+        azure_client = get_pooled_llm_client(
+            settings,
+            llm_provider.value,
+            lambda http_client: AsyncAzureOpenAI(
+                api_key=api_key,
+                api_version=api_version,
+                azure_endpoint=azure_endpoint,
+                http_client=http_client,
+            ),
+            api_key=api_key,
+            endpoint=azure_endpoint,
+            api_version=api_version,
+        )
+        return LLMClient(
+            azure_client,
+            byo_aoai_metadata,
+            embedding_cache=get_embedding_cache(db, settings, azure_client),
+            embedding_batcher=get_embedding_batcher(
+                azure_client, byo_aoai_metadata.embedding_name, settings
+            ),
         )
-        return LLMClient(azure_client, byo_aoai_metadata)
     elif llm_provider.value == "byo-openai":
         byo_oai_metadata = BYOOpenAIMetadata.model_validate(
             llm_provider.metadata["byo-openai"]
@@ -311,8 +414,22 @@ async def get_llm_client(
                 detail="API key is missing",
             )
 
-        client = AsyncOpenAI(api_key=llm_provider.api_key)
-        return LLMClient(client, byo_oai_metadata)
+        client = get_pooled_llm_client(
+            settings,
+            llm_provider.value,
+            lambda http_client: AsyncOpenAI(
+                api_key=llm_provider.api_key, http_client=http_client
+            ),
+            api_key=llm_provider.api_key,
+        )
+        return LLMClient(
+            client,
+            byo_oai_metadata,
+            embedding_cache=get_embedding_cache(db, settings, client),
+            embedding_batcher=get_embedding_batcher(
+                client, byo_oai_metadata.embedding_name, settings
+            ),
+        )
     else:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
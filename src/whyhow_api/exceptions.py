@@ -7,3 +7,11 @@ class NotFoundException(Exception):
     def __init__(self, message: str):
         """Initialise the NotFoundException."""
         super().__init__(message)
+
+
+class ExtractionError(Exception):
+    """Exception raised when triples could not be extracted from chunks."""
+
+    def __init__(self, message: str):
+        """Initialise the ExtractionError."""
+        super().__init__(message)
@@ -40,6 +40,8 @@ from whyhow_api.routers import (
     users,
     workspaces,
 )
+from whyhow_api.utilities.llm_client_pool import close_llm_client_pool
+from whyhow_api.utilities.tracing import LLMSpanSampler
 
 logger = logging.getLogger(
     "whyhow_api.main"
@@ -73,7 +75,8 @@ async def lifespan(app: FastAPI):  # type: ignore
     try:
         yield
     finally:
-        # Cleanup: close database connection
+        # Cleanup: close pooled LLM clients and database connection
+        await close_llm_client_pool()
         close_mongo_connection()
         logger.info("Database connection closed")
 
@@ -85,7 +88,12 @@ else:
     logfire_token = settings_.logfire.token.get_secret_value()
 
 logfire.configure(
-    token=logfire_token, send_to_logfire="if-token-present", console=False
+    token=logfire_token,
+    send_to_logfire="if-token-present",
+    console=False,
+    sampling=logfire.SamplingOptions(
+        head=LLMSpanSampler(settings_.logfire.llm_span_sample_rate)
+    ),
 )
 
 app = FastAPI(
@@ -11,6 +11,8 @@ from whyhow_api.schemas.users import (
     BYOOpenAIMetadata,
     WhyHowOpenAIMetadata,
 )
+from whyhow_api.utilities.embedding_batcher import EmbeddingBatcher
+from whyhow_api.utilities.embedding_cache import EmbeddingCache
 
 settings = Settings()
 
@@ -24,10 +26,14 @@ class LLMClient:
         metadata: Union[
             BYOOpenAIMetadata, BYOAzureOpenAIMetadata, WhyHowOpenAIMetadata
         ],
+        embedding_cache: EmbeddingCache | None = None,
+        embedding_batcher: EmbeddingBatcher | None = None,
     ) -> None:
         """Initialize the LLM client."""
         self.client = client
         self.metadata = metadata
+        self.embedding_cache = embedding_cache
+        self.embedding_batcher = embedding_batcher
 
 
 class Node(BaseModel):
@@ -1,7 +1,7 @@
 """Graphs router."""
 
 import logging
-from typing import Annotated, Any, Dict, List
+from typing import Annotated, Any, AsyncIterator, Dict, List
 
 from bson import ObjectId
 from fastapi import (
@@ -12,6 +12,7 @@ from fastapi import (
     Query,
     status,
 )
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo.errors import DuplicateKeyError
 
@@ -79,8 +80,9 @@ from whyhow_api.services.crud.graph import (
 )
 from whyhow_api.services.crud.node import get_nodes_by_ids
 from whyhow_api.services.crud.rule import create_rule, get_graph_rules
+from whyhow_api.services.crud.task import create_task
 from whyhow_api.services.graph_service import MixedQueryProcessor
-from whyhow_api.utilities.routers import order_query
+from whyhow_api.utilities.routers import format_sse, order_query
 
 logger = logging.getLogger(__name__)
 
@@ -303,7 +305,10 @@ async def add_chunks_to_graph_endpoint(
             detail="Graph not found.",
         )
 
-    background_tasks.add_task(
+    task = await create_task(
+        db,
+        user_id,
+        background_tasks,
         graph_service.create_or_update_graph,
         db=db,
         db_client=db_client,
@@ -314,12 +319,15 @@ async def add_chunks_to_graph_endpoint(
         schema_id=ObjectId(graph["schema_id"]),
         settings=settings,
         filters=body.filters,
+        incremental=body.incremental,
+        pattern_group_size=graph.get("extraction_pattern_group_size", 1),
     )
     return GraphsResponse(
         message="Hold tight - your graph is being created!",
         status="success",
         graphs=[GraphOut.model_validate(graph)],
         count=1,
+        task_id=str(task.id),
     )
 
 
@@ -335,6 +343,7 @@ async def create_graph_from_triples_endpoint(
     db_client: AsyncIOMotorClient = Depends(get_db_client),
     user_id: ObjectId = Depends(get_user),
     llm_client: LLMClient = Depends(get_llm_client),
+    settings: Settings = Depends(get_settings),
 ) -> GraphsResponse:
     """Build a graph from triples.
 
@@ -359,6 +368,7 @@ async def create_graph_from_triples_endpoint(
             db_client=db_client,
             user_id=user_id,
             llm_client=llm_client,
+            settings=settings,
             graph_id=ObjectId(graph.id) if graph.id else None,
         )
         return GraphsResponse(
@@ -478,9 +488,11 @@ async def delete_graph_endpoint(
 )
 async def merge_nodes_endpoint(
     request: MergeNodesRequest,
+    background_tasks: BackgroundTasks,
     graph: DetailedGraphDocumentModel = Depends(valid_graph_id),
     db: AsyncIOMotorDatabase = Depends(get_db),
     user_id: ObjectId = Depends(get_user),
+    llm_client: LLMClient = Depends(get_llm_client),
 ) -> DetailedGraphsResponse:
     """Merge nodes on a graph."""
     from_nodes = request.from_nodes
@@ -512,6 +524,8 @@ async def merge_nodes_endpoint(
             user_id=user_id,
             from_nodes=[ObjectId(n) for n in from_nodes],
             to_node=ObjectId(to_node),
+            llm_client=llm_client,
+            background_tasks=background_tasks,
         )
     except ValueError:
         raise HTTPException(
@@ -552,6 +566,7 @@ async def merge_nodes_endpoint(
 )
 async def graph_query_endpoint(
     request: QueryGraphRequest,
+    background_tasks: BackgroundTasks,
     graph: DetailedGraphDocumentModel = Depends(valid_graph_id),
     llm_client: LLMClient = Depends(get_llm_client),
     db: AsyncIOMotorDatabase = Depends(get_db),
@@ -568,7 +583,9 @@ async def graph_query_endpoint(
             llm_client=llm_client,
             settings=settings,
         )
-        response = await query_processor.query(request=request)
+        response = await query_processor.query(
+            request=request, background_tasks=background_tasks
+        )
 
         success_message = (
             "Graph query successful." if response else "No answer found."
@@ -594,6 +611,67 @@ async def graph_query_endpoint(
         )
 
 
+@router.post(
+    "/{graph_id}/query/stream",
+    response_class=StreamingResponse,
+    description="Query a graph, streaming the relevant triples and the answer as Server-Sent Events.",
+)
+async def graph_query_stream_endpoint(
+    request: QueryGraphRequest,
+    graph: DetailedGraphDocumentModel = Depends(valid_graph_id),
+    llm_client: LLMClient = Depends(get_llm_client),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    settings: Settings = Depends(get_settings),
+) -> StreamingResponse:
+    """Query a graph, streaming the results.
+
+    Sends a `triples` event with the relevant triples and their nodes as
+    soon as they are retrieved, a `token` event per token of the answer as
+    it is generated, then a `done` event with the query. Errors are sent as
+    an `error` event, as the response has already started.
+    """
+    query_processor = MixedQueryProcessor(
+        db=db,
+        graph_id=ObjectId(graph.id),
+        user_id=ObjectId(graph.created_by),
+        workspace_id=ObjectId(graph.workspace.id),
+        schema_id=ObjectId(graph.schema_.id),
+        llm_client=llm_client,
+        settings=settings,
+    )
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            async for event, data in query_processor.stream_query(request):
+                if event == "triples":
+                    data = {
+                        "triples": [
+                            t.model_dump(mode="json", by_alias=True)
+                            for t in data["triples"]
+                        ],
+                        "nodes": [
+                            n.model_dump(mode="json", by_alias=True)
+                            for n in data["nodes"]
+                        ],
+                    }
+                elif event == "done":
+                    data = QueryOut.model_validate(data).model_dump(
+                        mode="json", by_alias=True, exclude_none=True
+                    )
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.error(f"Error: {e}", exc_info=True)
+            yield format_sse(
+                "error", {"detail": "Failed to perform graph query."}
+            )
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/{graph_id}/nodes",
     response_model=GraphsDetailedNodeResponse,
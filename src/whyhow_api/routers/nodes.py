@@ -4,7 +4,7 @@ import logging
 from typing import Annotated, Any, Dict, List
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from whyhow_api.dependencies import (
@@ -31,6 +31,7 @@ from whyhow_api.services.crud.base import (
     get_all_count,
     get_one,
 )
+from whyhow_api.services.crud.graph import bump_graph_version
 from whyhow_api.services.crud.node import (
     delete_node,
     get_node_chunks,
@@ -140,6 +141,7 @@ async def create_node(
         user_id=user_id,
         document=body,
     )
+    await bump_graph_version(db, {"_id": ObjectId(graph.id)})
     return NodesResponse(
         message="Node created successfully",
         status="success",
@@ -278,6 +280,7 @@ async def read_node_endpoint(
 @router.put("/{node_id}", response_model=NodesResponse)
 async def update_node_endpoint(
     body: NodeUpdate,
+    background_tasks: BackgroundTasks,
     node: NodeDocumentModel = Depends(valid_node_id),
     db: AsyncIOMotorDatabase = Depends(get_db),
     db_client: AsyncIOMotorClient = Depends(get_db_client),
@@ -293,6 +296,7 @@ async def update_node_endpoint(
         node_id=ObjectId(node.id),
         node=node,
         update=body,
+        background_tasks=background_tasks,
     )
     return update_node_response(NodeOut.model_validate(updated_node))
 
@@ -316,6 +320,7 @@ async def delete_node_endpoint(
         user_id=user_id,
         node_id=ObjectId(node.id),
     )
+    await bump_graph_version(db, {"_id": ObjectId(node.graph)})
 
     return NodesResponse(
         message="Node deleted successfully",
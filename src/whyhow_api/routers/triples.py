@@ -10,31 +10,34 @@ from fastapi import (
     Depends,
     HTTPException,
     Query,
+    Request,
     status,
 )
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
+from whyhow_api.config import Settings
 from whyhow_api.dependencies import (
     get_db,
     get_db_client,
     get_llm_client,
+    get_settings,
     get_user,
     valid_public_graph_id,
     valid_triple_id,
 )
 from whyhow_api.exceptions import NotFoundException
 from whyhow_api.models.common import LLMClient
+from whyhow_api.schemas.base import AnnotatedObjectId
 from whyhow_api.schemas.chunks import PublicChunksOutWithWorkspaceDetails
 from whyhow_api.schemas.graphs import (
     GraphDocumentModel,
     GraphStateErrorsUpdate,
-    Triple,
 )
 from whyhow_api.schemas.tasks import TaskOut, TaskResponse
 from whyhow_api.schemas.triples import (
     PublicTripleChunksResponse,
     TripleChunksResponse,
-    TripleCreateNode,
+    TripleCreate,
     TripleDocumentModel,
     TripleOut,
     TriplesCreate,
@@ -42,8 +45,13 @@ from whyhow_api.schemas.triples import (
 )
 from whyhow_api.services import graph_service
 from whyhow_api.services.crud.base import get_all, get_all_count, update_one
-from whyhow_api.services.crud.triple import delete_triple, get_triple_chunks
-from whyhow_api.utilities.routers import order_query
+from whyhow_api.services.crud.graph import bump_graph_version
+from whyhow_api.services.crud.triple import (
+    delete_triple,
+    get_triple_chunks,
+    resolve_triples,
+)
+from whyhow_api.utilities.routers import iter_ndjson_batches, order_query
 
 logger = logging.getLogger(__name__)
 
@@ -270,6 +278,7 @@ async def create_triples_endpoint(
     db_client: AsyncIOMotorClient = Depends(get_db_client),
     user_id: ObjectId = Depends(get_user),
     llm_client: LLMClient = Depends(get_llm_client),
+    settings: Settings = Depends(get_settings),
 ) -> TaskResponse:
     """Create triples."""
     # Check if the graph exists
@@ -282,67 +291,15 @@ async def create_triples_endpoint(
             detail="Graph not found.",
         )
 
-    # Prepare triples
-    triples: list[Triple] = []
-    for triple in body.triples:
-        if type(triple.head_node) is str:
-            node = await db.node.find_one(
-                {
-                    "_id": ObjectId(triple.head_node),
-                    "created_by": user_id,
-                    "graph": ObjectId(body.graph),
-                }
-            )
-            if node is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Node not found.",
-                )
-            head_node = TripleCreateNode(
-                name=node["name"],
-                type=node["type"],
-                properties=node["properties"],
-            )
-        else:
-            head_node = triple.head_node  # type: ignore
-
-        if type(triple.tail_node) is str:
-            node = await db.node.find_one(
-                {
-                    "_id": ObjectId(triple.tail_node),
-                    "created_by": user_id,
-                    "graph": ObjectId(body.graph),
-                }
-            )
-            if node is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Node not found.",
-                )
-            tail_node = TripleCreateNode(
-                name=node["name"],
-                type=node["type"],
-                properties=node["properties"],
-            )
-        else:
-            tail_node = triple.tail_node  # type: ignore
-
-        relation_properties = triple.properties
-        relation_properties["chunks"] = triple.chunks
-        triples.append(
-            Triple(
-                head=head_node.name,
-                head_type=head_node.type,
-                head_properties=head_node.properties,
-                tail=tail_node.name,
-                tail_type=tail_node.type,
-                tail_properties=tail_node.properties,
-                relation=triple.type,
-                relation_properties=relation_properties,
-            )
+    try:
+        # Prepare triples
+        triples = await resolve_triples(
+            db=db,
+            triples=body.triples,
+            graph_id=ObjectId(body.graph),
+            user_id=user_id,
         )
 
-    try:
         await update_one(
             collection=db["graph"],
             document_model=GraphDocumentModel,
@@ -357,6 +314,7 @@ async def create_triples_endpoint(
             db_client=db_client,
             user_id=user_id,
             llm_client=llm_client,
+            settings=settings,
             graph_id=ObjectId(body.graph),
             strict_mode=body.strict_mode,
         )
@@ -381,6 +339,72 @@ async def create_triples_endpoint(
         )
 
 
+@router.post("/stream", response_model=TaskResponse)
+async def create_triples_stream_endpoint(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    graph: AnnotatedObjectId = Query(
+        ..., description="The graph to add the triples to."
+    ),
+    strict_mode: bool = Query(
+        False,
+        description="Strict mode for triple creation. If True, triple validation will be performed. If False, invalid triples will be used to extend the graph's schema.",
+    ),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    db_client: AsyncIOMotorClient = Depends(get_db_client),
+    user_id: ObjectId = Depends(get_user),
+    llm_client: LLMClient = Depends(get_llm_client),
+    settings: Settings = Depends(get_settings),
+) -> TaskResponse:
+    """Create triples from a newline-delimited JSON stream.
+
+    Each line of the body is one triple, in the same format as the items of
+    `triples` in the body of `POST /triples`. Triples are written in batches
+    while the body is uploaded, so graphs of any size can be sent in a single
+    request. The request returns once all triples are written, the returned
+    task completes once they are embedded.
+    """
+    batches = (
+        [TripleCreate.model_validate(triple) for triple in batch]
+        async for batch in iter_ndjson_batches(
+            request.stream(), settings.api.build_batch_size
+        )
+    )
+    try:
+        task_doc = (
+            await graph_service.create_or_update_graph_from_triple_stream(
+                background_tasks=background_tasks,
+                batches=batches,
+                db=db,
+                db_client=db_client,
+                user_id=user_id,
+                llm_client=llm_client,
+                settings=settings,
+                graph_id=ObjectId(graph),
+                strict_mode=strict_mode,
+            )
+        )
+        task = TaskOut.model_validate(task_doc)
+        task.id = str(task.id)
+        task.created_by = str(task.created_by)
+        return TaskResponse(
+            message="Triples written, embedding task started successfully.",
+            status="success",
+            task=task,
+            count=1,
+        )
+    except NotFoundException as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
 @router.delete(
     "/{triple_id}",
     response_model=TriplesResponse,
@@ -397,6 +421,7 @@ async def delete_triple_endpoint(
         user_id=user_id,
         triple_id=ObjectId(triple.id),
     )
+    await bump_graph_version(db, {"_id": ObjectId(triple.graph)})
     return TriplesResponse(
         message="Triple deleted successfully.",
         status="success",
@@ -31,6 +31,10 @@ from whyhow_api.services.crud.base import (
     get_all_count,
     update_one,
 )
+from whyhow_api.services.crud.chunks import (
+    CHUNK_EMBEDDING_COLLECTION,
+    split_chunk_embeddings,
+)
 from whyhow_api.services.crud.workspace import delete_workspace
 from whyhow_api.utilities.routers import order_query
 
@@ -344,6 +348,9 @@ async def demo_endpoint(
     try:
         demo = DemoDataLoader(user_id=user_id)
         await db.workspace.insert_one(demo.data["workspace"])
+        chunk_embeddings = split_chunk_embeddings(demo.data["chunks"])
+        if chunk_embeddings:
+            await db[CHUNK_EMBEDDING_COLLECTION].insert_many(chunk_embeddings)
         await db.chunk.insert_many(demo.data["chunks"])
         await db.schema.insert_one(demo.data["schema"])
         await db.graph.insert_one(demo.data["graph"])
@@ -15,11 +15,15 @@ from pydantic import (
     field_validator,
 )
 
+from whyhow_api.utilities.vectors import decode_vector
+
 # Custom types
 AnnotatedObjectId = Annotated[str, BeforeValidator(lambda x: str(x))]
 AllowedUserMetadataTypes = str | int | bool | float
 AllowedChunkContentTypes = str | int | bool | float | None
 AllowedPropertyTypes = str | int | bool | float | None
+# Embeddings may be stored as BSON binary vectors
+AnnotatedEmbedding = Annotated[list[float], BeforeValidator(decode_vector)]
 
 Status = Literal["success", "pending", "failed"]
 Graph_Status = Literal["creating", "updating", "ready", "failed"]
@@ -30,6 +34,7 @@ Default_Relation_Type = "related_to"
 File_Extensions = Literal["csv", "json", "pdf", "txt"]
 Rule_Type = Literal["merge_nodes"]
 TaskStatus = Literal["pending", "success", "failed"]
+Embedding_Status = Literal["pending", "success", "failed", "stale"]
 
 
 def validate_object_id(value: str) -> ObjectId:
@@ -11,6 +11,7 @@ from whyhow_api.schemas.base import (
     AfterAnnotatedObjectId,
     AllowedChunkContentTypes,
     AllowedUserMetadataTypes,
+    AnnotatedEmbedding,
     AnnotatedObjectId,
     BaseAssignmentModel,
     BaseDocument,
@@ -72,7 +73,7 @@ class ChunkDocumentModel(BaseDocument):
     content: str | dict[str, AllowedChunkContentTypes] = Field(
         ..., description="Content of the chunk", min_length=1
     )
-    embedding: list[float] | None = Field(
+    embedding: AnnotatedEmbedding | None = Field(
         default=None, description="Embedding of the chunk"
     )
     metadata: ChunkMetadata
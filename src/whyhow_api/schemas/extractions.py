@@ -0,0 +1,22 @@
+"""Extraction schemas."""
+
+from pydantic import Field
+
+from whyhow_api.schemas.base import AfterAnnotatedObjectId, BaseDocument
+
+
+class ExtractionDocumentModel(BaseDocument):
+    """Extraction ledger entry.
+
+    Records that a chunk was extracted for a schema pattern with a model, so
+    that graph updates can skip the pairs that were already extracted.
+    """
+
+    graph: AfterAnnotatedObjectId = Field(..., description="Graph id")
+    chunk: AfterAnnotatedObjectId = Field(
+        ..., description="Chunk id the pattern was extracted from"
+    )
+    pattern_hash: str = Field(
+        ..., description="Hash of the schema pattern extracted"
+    )
+    model: str = Field(..., description="Model used for the extraction")
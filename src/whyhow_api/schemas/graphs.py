@@ -7,6 +7,7 @@ from bson import ObjectId
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing_extensions import Self
 
+from whyhow_api.config import QUERY_RERANKERS
 from whyhow_api.models.common import Node, Triple
 from whyhow_api.schemas.base import (
     AfterAnnotatedObjectId,
@@ -40,6 +41,15 @@ class GraphDocumentModel(BaseDocument):
         False,
         description="Whether the graph is public or not",
     )
+    extraction_pattern_group_size: int = Field(
+        1,
+        ge=1,
+        description="Number of schema patterns extracted per LLM request. Patterns in a group share one prompt, so the chunk text is sent once per group.",
+    )
+    content_version: int = Field(
+        0,
+        description="Version of the graph content, incremented whenever its nodes or triples change.",
+    )
 
     def __str__(self) -> str:
         """Return a string representation of the graph."""
@@ -61,6 +71,11 @@ class DetailedGraphDocumentModel(BaseDocument):
         default=[],
         description="Details about the error that occurred during graph creation.",
     )
+    extraction_pattern_group_size: int = Field(
+        1,
+        ge=1,
+        description="Number of schema patterns extracted per LLM request. Patterns in a group share one prompt, so the chunk text is sent once per group.",
+    )
 
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
@@ -86,6 +101,11 @@ class GraphUpdate(BaseModel):
     public: bool | None = Field(
         default=None, description="Whether the graph is public or not"
     )
+    extraction_pattern_group_size: int | None = Field(
+        default=None,
+        ge=1,
+        description="Number of schema patterns extracted per LLM request.",
+    )
 
 
 class GraphOut(GraphDocumentModel):
@@ -141,6 +161,9 @@ class GraphsResponse(BaseResponse):
     triples: list[Triple] | None = None
     count: int
     answer: str | None = None
+    task_id: str | None = Field(
+        default=None, description="ID of the task building the graph"
+    )
 
 
 class DetailedGraphsResponse(BaseResponse):
@@ -294,6 +317,10 @@ class AddChunksToGraphBody(BaseRequest):
         default=None,
         description="Filters to apply to the chunk retrieval. If not provided, all chunks will be used.",
     )
+    incremental: bool = Field(
+        default=True,
+        description="Only extract chunks that were not yet extracted for a schema pattern with the current model. If False, all matching chunks are extracted again.",
+    )
 
     model_config = ConfigDict(
         use_enum_values=True,
@@ -363,6 +390,10 @@ class QueryGraphRequest(BaseRequest):
         default=False,
         description="A boolean specifying if to include the chunks in the query or not.",
     )
+    reranker: QUERY_RERANKERS | None = Field(
+        default=None,
+        description="How to check the relevance of similar triples: `local` ranks them by similarity score with maximal marginal relevance, `llm` asks the LLM. Defaults to the `query_reranker` setting.",
+    )
 
     @model_validator(mode="after")
     def check_return_answer_valid(self) -> Self:
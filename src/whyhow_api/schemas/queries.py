@@ -2,6 +2,7 @@
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from whyhow_api.config import QUERY_RERANKERS
 from whyhow_api.schemas.base import (
     AfterAnnotatedObjectId,
     AnnotatedObjectId,
@@ -42,6 +43,10 @@ class QueryParameters(BaseModel):
         default=False,
         description="A boolean specifying if to include the chunks in the query or not.",
     )
+    reranker: QUERY_RERANKERS | None = Field(
+        default=None,
+        description="How the relevance of similar triples was checked.",
+    )
 
 
 class QueryDocumentModel(BaseDocument):
@@ -62,6 +67,10 @@ class QueryDocumentModel(BaseDocument):
     nodes: list[NodeWithId] = Field(
         default=[], description="Node ids associated with the query"
     )
+    timings: dict[str, float] = Field(
+        default={},
+        description="Duration of each stage of the query, in milliseconds",
+    )
     status: Status
 
 
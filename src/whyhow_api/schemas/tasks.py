@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from whyhow_api.schemas.base import (
     BaseDocument,
@@ -12,6 +12,24 @@ from whyhow_api.schemas.base import (
 )
 
 
+class TaskProgress(BaseModel):
+    """Progress of a task extracting triples with LLM requests."""
+
+    requests_total: int = Field(0, description="Number of requests queued")
+    requests_completed: int = Field(
+        0, description="Number of requests completed"
+    )
+    requests_retried: int = Field(
+        0, description="Number of retries of failed requests"
+    )
+    requests_failed: int = Field(
+        0, description="Number of requests given up after their retries"
+    )
+    triples_extracted: int = Field(
+        0, description="Number of triples extracted"
+    )
+
+
 class TaskDocumentModel(BaseDocument):
     """Task schema."""
 
@@ -19,6 +37,7 @@ class TaskDocumentModel(BaseDocument):
     end_time: datetime | None = None
     status: TaskStatus = Field(..., description="Status of task")
     result: str | None = None
+    progress: TaskProgress | None = None
 
 
 class TaskOut(TaskDocumentModel):
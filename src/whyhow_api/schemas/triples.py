@@ -12,11 +12,13 @@ from pydantic import (
 
 from whyhow_api.schemas.base import (
     AfterAnnotatedObjectId,
+    AnnotatedEmbedding,
     AnnotatedObjectId,
     BaseDocument,
     BaseResponse,
     Default_Entity_Type,
     Default_Relation_Type,
+    Embedding_Status,
 )
 from whyhow_api.schemas.chunks import (
     ChunksOutWithWorkspaceDetails,
@@ -41,7 +43,19 @@ class TripleDocumentModel(BaseDocument):
     properties: dict[str, Any] = {}
     chunks: list[AfterAnnotatedObjectId] = []
     graph: AfterAnnotatedObjectId | None
-    embedding: list[float] | None = None
+    embedding: AnnotatedEmbedding | None = None
+    embedding_status: Embedding_Status | None = Field(
+        default=None,
+        description="Status of the triple embedding; pending until embedded after a graph build",
+    )
+    embedding_text_hash: str | None = Field(
+        default=None,
+        description="Hash of the text the triple embedding was computed from",
+    )
+    embedding_version: int | None = Field(
+        default=None,
+        description="Incremented each time the triple embedding goes stale",
+    )
 
 
 class TripleCreateNode(BaseModel):
@@ -42,12 +42,155 @@ from whyhow_api.schemas.documents import (
     DocumentStateErrorsUpdate,
 )
 from whyhow_api.services.crud.base import update_one
+from whyhow_api.services.crud.graph import bump_graph_version
 from whyhow_api.utilities.common import embed_texts
+from whyhow_api.utilities.vectors import encode_vector
 
 logger = logging.getLogger(__name__)
 
 settings = Settings()
 
+# Collection of the chunk embeddings with the `chunk_embedding_collection`
+# setting
+CHUNK_EMBEDDING_COLLECTION = "chunk_embedding"
+
+
+def split_chunk_embeddings(
+    documents: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Move the embeddings of chunk documents into their own documents.
+
+    With the `chunk_embedding_collection` setting, chunk embeddings are
+    stored in the `chunk_embedding` collection, keyed by chunk ID, so chunk
+    reads and lookups never load them. The embedding documents copy the
+    owner, document, workspaces and data type of their chunk, to filter the
+    vector search and to select them as their chunks when the workspaces
+    change. Otherwise the chunk documents are left unchanged.
+
+    Parameters
+    ----------
+    documents : List[Dict[str, Any]]
+        The chunk documents to insert, modified in place.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        The `chunk_embedding` documents to insert.
+    """
+    if not settings.mongodb.chunk_embedding_collection:
+        return []
+    return [
+        {
+            "_id": document["_id"],
+            "created_by": document["created_by"],
+            "document": document.get("document"),
+            "workspaces": document.get("workspaces", []),
+            "data_type": document.get("data_type"),
+            "embedding": document.pop("embedding"),
+        }
+        for document in documents
+        if document.get("embedding") is not None
+    ]
+
+
+async def delete_chunk_embeddings(
+    db: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    session: AsyncIOMotorClientSession | None = None,
+) -> None:
+    """Delete the embeddings of deleted chunks from `chunk_embedding`."""
+    if settings.mongodb.chunk_embedding_collection:
+        await db[CHUNK_EMBEDDING_COLLECTION].delete_many(
+            query, session=session
+        )
+
+
+async def update_chunk_embeddings(
+    db: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    update: Dict[str, Any],
+    session: AsyncIOMotorClientSession | None = None,
+) -> None:
+    """Mirror an update of the chunk workspaces onto `chunk_embedding`.
+
+    The `query` selects the embedding documents by the fields they copy from
+    their chunks.
+    """
+    if settings.mongodb.chunk_embedding_collection:
+        await db[CHUNK_EMBEDDING_COLLECTION].update_many(
+            query, update, session=session
+        )
+
+
+def lookup_chunk_embeddings() -> List[Dict[str, Any]]:
+    """Get the stages setting chunk embeddings from `chunk_embedding`."""
+    return [
+        {
+            "$lookup": {
+                "from": CHUNK_EMBEDDING_COLLECTION,
+                "localField": "_id",
+                "foreignField": "_id",
+                "as": "embedding",
+            }
+        },
+        {
+            "$set": {
+                "embedding": {
+                    "$first": "$embedding.embedding",
+                }
+            }
+        },
+    ]
+
+
+async def search_chunk_embeddings(
+    collection: AsyncIOMotorCollection,
+    user_id: ObjectId,
+    filters: Dict[str, Any],
+    query_vector: Any,
+    limit: int,
+) -> List[ObjectId]:
+    """Find the chunks most similar to a query vector.
+
+    The vector search is filtered in the index by the owner, workspaces and
+    data type copied onto the `chunk_embedding` documents, as with the
+    embeddings stored in the chunks. The other `filters` are applied to the
+    chunks found.
+
+    Returns
+    -------
+    List[ObjectId]
+        The IDs of the most similar chunks.
+    """
+    results = (
+        await collection.database[CHUNK_EMBEDDING_COLLECTION]
+        .aggregate(
+            [
+                {
+                    "$vectorSearch": {
+                        "index": "chunk_embedding_vector_index",
+                        "filter": {
+                            "created_by": {"$eq": user_id},
+                            "workspaces": filters["workspaces"],
+                            **(
+                                {"data_type": filters["data_type"]}
+                                if "data_type" in filters
+                                else {}
+                            ),
+                        },
+                        "path": "embedding",
+                        "queryVector": query_vector,
+                        "numCandidates": 512,
+                        "limit": limit,
+                    }
+                },
+                {"$project": {"_id": 1}},
+            ]
+        )
+        .to_list(None)
+    )
+    return [r["_id"] for r in results]
+
 
 async def get_chunks(
     collection: AsyncIOMotorCollection,
@@ -63,7 +206,7 @@ async def get_chunks(
     """Get chunks for a user with optional population of related data."""
     seed_concept = filters.pop("seed_concept", None)
 
-    pipeline = []
+    pipeline: List[Dict[str, Any]] = []
 
     if seed_concept:
         if llm_client is None:
@@ -74,30 +217,44 @@ async def get_chunks(
             f"Using vector similarity search with seed concept: {seed_concept}"
         )
         query_vector_list = await embed_texts(
-            llm_client=llm_client, texts=[seed_concept]
+            llm_client=llm_client,
+            texts=[seed_concept],
+            dimensions=settings.mongodb.vector_search_embedding_size,
+        )
+        query_vector = encode_vector(
+            query_vector_list[0], settings.mongodb.embedding_storage_format
         )
-        query_vector = query_vector_list[0]
         # logger.info(f"Query vector length: {len(query_vector)}")
-        pipeline.append(
-            {
-                "$vectorSearch": {
-                    "index": "vector_search_index",
-                    "filter": {
-                        "created_by": {"$eq": user_id},
-                        "workspaces": filters["workspaces"],
-                        **(
-                            {"data_type": filters["data_type"]}
-                            if "data_type" in filters
-                            else {}
-                        ),
-                    },
-                    "path": "embedding",
-                    "queryVector": query_vector,
-                    "numCandidates": 512,
-                    "limit": limit,
+        if settings.mongodb.chunk_embedding_collection:
+            chunk_ids = await search_chunk_embeddings(
+                collection=collection,
+                user_id=user_id,
+                filters=filters,
+                query_vector=query_vector,
+                limit=limit,
+            )
+            pipeline.append({"$match": {"_id": {"$in": chunk_ids}}})
+        else:
+            pipeline.append(
+                {
+                    "$vectorSearch": {
+                        "index": "vector_search_index",
+                        "filter": {
+                            "created_by": {"$eq": user_id},
+                            "workspaces": filters["workspaces"],
+                            **(
+                                {"data_type": filters["data_type"]}
+                                if "data_type" in filters
+                                else {}
+                            ),
+                        },
+                        "path": "embedding",
+                        "queryVector": query_vector,
+                        "numCandidates": 512,
+                        "limit": limit,
+                    }
                 }
-            }
-        )
+            )
 
     # logger.info(f"Applying filters: {filters}")
     pipeline.append({"$match": {"created_by": user_id, **filters}})
@@ -105,6 +262,8 @@ async def get_chunks(
     if not include_embeddings:
         # logger.debug("Excluding embeddings from the results")
         pipeline.append({"$project": {"embedding": 0}})
+    elif settings.mongodb.chunk_embedding_collection:
+        pipeline.extend(lookup_chunk_embeddings())
 
     if populate:
         # logger.debug("Populating related data")
@@ -168,13 +327,13 @@ async def get_chunks(
     pipeline.extend(
         [
             {"$sort": {"created_at": order, "_id": order}},
-            {"$skip": skip},  # type: ignore[dict-item]
+            {"$skip": skip},
         ]
     )
 
     if limit >= 0:
         # logger.debug(f"Limiting results to {limit} chunks")
-        pipeline.append({"$limit": limit})  # type: ignore[dict-item]
+        pipeline.append({"$limit": limit})
 
     # logger.info(f"Running query: {pipeline}")
     chunks = await collection.aggregate(pipeline).to_list(None)
@@ -283,21 +442,30 @@ async def add_chunks(
                 )
                 for c in chunks
             ],
+            dimensions=settings.mongodb.vector_search_embedding_size,
         )
 
         # Add embeddings to chunks and create operation objects
-        operations = []
+        documents = []
         chunks_ids = []
         for idx, c in enumerate(chunks):
             c.embedding = embeddings[idx]
             c.id = ObjectId()
             chunks_ids.append(c.id)
-            operations.append(
-                InsertOne(
-                    c.model_dump(by_alias=True, exclude_none=True),
-                )
+            document = c.model_dump(by_alias=True, exclude_none=True)
+            document["embedding"] = encode_vector(
+                embeddings[idx], settings.mongodb.embedding_storage_format
+            )
+            documents.append(document)
+
+        # Embeddings are written first, so a chunk is never found without one
+        embedding_documents = split_chunk_embeddings(documents)
+        if embedding_documents:
+            await db[CHUNK_EMBEDDING_COLLECTION].insert_many(
+                embedding_documents, ordered=False
             )
 
+        operations = [InsertOne(document) for document in documents]
         if operations:
             await db.chunk.bulk_write(operations)
             inserted_chunks = await db.chunk.find(
@@ -595,6 +763,14 @@ async def assign_chunks_to_workspace(
 
     if bulk_operations:
         await db.chunk.bulk_write(bulk_operations)
+        await update_chunk_embeddings(
+            db,
+            {
+                "_id": {"$in": [ObjectId(i) for i in results.assigned]},
+                "created_by": user_id,
+            },
+            {"$push": {"workspaces": workspace_id}},
+        )
 
     return results
 
@@ -605,15 +781,22 @@ async def perform_node_chunk_unassignment(
     chunk_ids_to_delete: list[ObjectId],
     user_id: ObjectId,
 ) -> None:
-    """Perform unassignment of chunks from nodes."""
+    """Perform unassignment of chunks from nodes.
+
+    The content version of the graphs of the nodes is bumped, so that the
+    query answers cached with their chunks are no longer served.
+    """
+    query = {"chunks": {"$in": chunk_ids_to_delete}, "created_by": user_id}
+    graph_ids = await db.node.distinct("graph", query, session=session)
     await db.node.update_many(
-        {
-            "chunks": {"$in": chunk_ids_to_delete},
-            "created_by": user_id,
-        },
+        query,
         {"$pull": {"chunks": {"$in": chunk_ids_to_delete}}},
         session=session,
     )
+    if graph_ids:
+        await bump_graph_version(
+            db, {"_id": {"$in": graph_ids}}, session=session
+        )
 
 
 async def perform_triple_chunk_unassignment(
@@ -622,15 +805,22 @@ async def perform_triple_chunk_unassignment(
     chunk_ids_to_delete: List[ObjectId],
     user_id: ObjectId,
 ) -> None:
-    """Perform unassignment of chunks from triples."""
+    """Perform unassignment of chunks from triples.
+
+    The content version of the graphs of the triples is bumped, so that the
+    query answers cached with their chunks are no longer served.
+    """
+    query = {"chunks": {"$in": chunk_ids_to_delete}, "created_by": user_id}
+    graph_ids = await db.triple.distinct("graph", query, session=session)
     await db.triple.update_many(
-        {
-            "chunks": {"$in": chunk_ids_to_delete},
-            "created_by": user_id,
-        },
+        query,
         {"$pull": {"chunks": {"$in": chunk_ids_to_delete}}},
         session=session,
     )
+    if graph_ids:
+        await bump_graph_version(
+            db, {"_id": {"$in": graph_ids}}, session=session
+        )
 
 
 async def unassign_chunks_from_workspace(
@@ -702,6 +892,16 @@ async def unassign_chunks_from_workspace(
                         "created_by": user_id,
                     },
                     {"$pull": {"workspaces": ObjectId(workspace_id)}},
+                    session=session,
+                )
+                await update_chunk_embeddings(
+                    db,
+                    {
+                        "_id": {"$in": chunk_ids_to_delete},
+                        "created_by": user_id,
+                    },
+                    {"$pull": {"workspaces": ObjectId(workspace_id)}},
+                    session=session,
                 )
                 results.unassigned.extend(
                     [str(i) for i in chunk_ids_to_delete]
@@ -794,6 +994,9 @@ async def delete_chunk(
                 {"_id": chunk_id, "created_by": user_id},
                 session=session,
             )
+            await delete_chunk_embeddings(
+                db, {"_id": chunk_id, "created_by": user_id}, session=session
+            )
 
             # Unset chunk from nodes
             await perform_node_chunk_unassignment(
@@ -855,6 +1058,14 @@ async def get_chunks_with_ws_and_doc_details(
     if document_filename:
         post_filters["document.filename"] = document_filename
 
+    chunk_stages: List[Dict[str, Any]] = [
+        {"$sort": {"created_at": order, "_id": order}},
+        {"$skip": skip},
+        ({"$limit": limit} if limit != -1 else {}),
+    ]
+    if include_embeddings and settings.mongodb.chunk_embedding_collection:
+        chunk_stages.extend(lookup_chunk_embeddings())
+
     pipeline = [
         {"$match": pre_filters},
         {
@@ -913,11 +1124,7 @@ async def get_chunks_with_ws_and_doc_details(
         },
         {
             "$facet": {
-                "chunks": [
-                    {"$sort": {"created_at": order, "_id": order}},
-                    {"$skip": skip},
-                    ({"$limit": limit} if limit != -1 else {}),
-                ],
+                "chunks": chunk_stages,
                 "totalCount": [{"$count": "count"}],
             }
         },
@@ -25,9 +25,11 @@ from whyhow_api.schemas.documents import (
 )
 from whyhow_api.services.crud.base import update_one
 from whyhow_api.services.crud.chunks import (
+    delete_chunk_embeddings,
     perform_node_chunk_unassignment,
     perform_triple_chunk_unassignment,
     process_chunks,
+    update_chunk_embeddings,
 )
 
 logger = logging.getLogger(__name__)
@@ -191,6 +193,14 @@ async def delete_document(
                     },
                     session=session,
                 )
+                await delete_chunk_embeddings(
+                    db,
+                    {
+                        "_id": {"$in": chunk_ids_to_delete},
+                        "created_by": user_id,
+                    },
+                    session=session,
+                )
 
                 # Unset chunks from nodes
                 await perform_node_chunk_unassignment(
@@ -410,6 +420,14 @@ async def assign_documents_to_workspace(
     # Perform all related chunk updates in one bulk operation if there are any to perform
     if chunk_bulk_operations:
         await db.chunk.bulk_write(chunk_bulk_operations)
+        await update_chunk_embeddings(
+            db,
+            {
+                "document": {"$in": [ObjectId(i) for i in results.assigned]},
+                "created_by": user_id,
+            },
+            {"$push": {"workspaces": workspace_id}},
+        )
 
     return results
 
@@ -481,6 +499,14 @@ async def unassign_documents_from_workspace(
                     },
                     {"$pull": {"workspaces": ObjectId(workspace_id)}},
                 )
+                await update_chunk_embeddings(
+                    db,
+                    {
+                        "_id": {"$in": chunk_ids_to_delete},
+                        "created_by": user_id,
+                    },
+                    {"$pull": {"workspaces": ObjectId(workspace_id)}},
+                )
 
                 # Unset workspace from documents
                 await db.document.update_many(
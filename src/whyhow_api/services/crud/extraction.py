@@ -0,0 +1,118 @@
+"""CRUD operations for the extraction ledger."""
+
+import hashlib
+import logging
+from typing import Iterable, Mapping
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from whyhow_api.models.common import SchemaTriplePattern
+from whyhow_api.schemas.base import get_utc_now
+
+logger = logging.getLogger(__name__)
+
+
+def hash_pattern(pattern: SchemaTriplePattern) -> str:
+    """Hash a schema pattern.
+
+    The hash covers the full pattern, including descriptions and fields, so
+    any change to the pattern yields a new hash.
+    """
+    return hashlib.sha256(
+        pattern.model_dump_json().encode("utf-8")
+    ).hexdigest()
+
+
+async def get_extracted_chunk_ids(
+    db: AsyncIOMotorDatabase,
+    graph_id: ObjectId,
+    user_id: ObjectId,
+    pattern_hash: str,
+    model: str,
+    chunk_ids: Iterable[ObjectId],
+) -> set[ObjectId]:
+    """Get the chunks already extracted for a pattern and model.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database.
+    graph_id : ObjectId
+        The graph.
+    user_id : ObjectId
+        The owner of the graph.
+    pattern_hash : str
+        The hash of the pattern, see `hash_pattern`.
+    model : str
+        The model used for the extraction.
+    chunk_ids : Iterable[ObjectId]
+        The candidate chunks.
+
+    Returns
+    -------
+    set[ObjectId]
+        The subset of `chunk_ids` already extracted.
+    """
+    unique_chunk_ids = list(set(chunk_ids))
+    if not unique_chunk_ids:
+        return set()
+
+    extracted = await db.extraction.find(
+        {
+            "graph": graph_id,
+            "created_by": user_id,
+            "pattern_hash": pattern_hash,
+            "model": model,
+            "chunk": {"$in": unique_chunk_ids},
+        },
+        {"chunk": 1},
+    ).distinct("chunk")
+    return set(extracted)
+
+
+async def record_extractions(
+    db: AsyncIOMotorDatabase,
+    graph_id: ObjectId,
+    user_id: ObjectId,
+    model: str,
+    extractions: Mapping[str, Iterable[ObjectId]],
+) -> None:
+    """Record chunks as extracted.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database.
+    graph_id : ObjectId
+        The graph.
+    user_id : ObjectId
+        The owner of the graph.
+    model : str
+        The model used for the extraction.
+    extractions : Mapping[str, Iterable[ObjectId]]
+        The extracted chunks, keyed by pattern hash.
+    """
+    now = get_utc_now()
+    operations = [
+        UpdateOne(
+            {
+                "graph": graph_id,
+                "created_by": user_id,
+                "pattern_hash": pattern_hash,
+                "model": model,
+                "chunk": chunk_id,
+            },
+            {
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )
+        for pattern_hash, chunk_ids in extractions.items()
+        for chunk_id in set(chunk_ids)
+    ]
+    if operations:
+        await db.extraction.bulk_write(operations, ordered=False)
+    logger.info(f"Recorded {len(operations)} extractions")
@@ -30,7 +30,7 @@ async def delete_graphs(
     """Delete a graph.
 
     Deletes a single graph and its associated triples,
-    nodes, and queries.
+    nodes, queries, and extraction ledger.
     """
     if session is None:
         if db_client is None:
@@ -58,6 +58,10 @@ async def delete_graphs(
             {"graph": {"$in": graph_ids}, "created_by": user_id},
             session=session,
         )
+        await db.extraction.delete_many(
+            {"graph": {"$in": graph_ids}, "created_by": user_id},
+            session=session,
+        )
         await db.graph.delete_many(
             {"_id": {"$in": graph_ids}, "created_by": user_id}, session=session
         )
@@ -66,6 +70,21 @@ async def delete_graphs(
         )
 
 
+async def bump_graph_version(
+    db: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    session: AsyncIOMotorClientSession | None = None,
+) -> None:
+    """Increment the content version of the graphs matching a query.
+
+    Called once the nodes or triples of graphs change, so that answers
+    cached for a previous version are no longer served.
+    """
+    await db.graph.update_many(
+        query, {"$inc": {"content_version": 1}}, session=session
+    )
+
+
 async def list_relations(
     collection: AsyncIOMotorCollection,
     user_id: ObjectId | None,
@@ -1,16 +1,22 @@
 """CRUD operations for Node model."""
 
+import functools
 import logging
 from typing import Any, List
 
 from bson import ObjectId
+from fastapi import BackgroundTasks
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from whyhow_api.models.common import LLMClient
 from whyhow_api.schemas.chunks import ChunksOutWithWorkspaceDetails
 from whyhow_api.schemas.nodes import NodeDocumentModel, NodeUpdate
 from whyhow_api.services.crud.base import update_one
-from whyhow_api.services.crud.triple import update_triple_embeddings
+from whyhow_api.services.crud.graph import bump_graph_version
+from whyhow_api.services.crud.triple import (
+    mark_triples_stale,
+    reembed_stale_triples,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +29,14 @@ async def update_node(
     node_id: ObjectId,
     node: NodeDocumentModel,
     update: NodeUpdate,
+    background_tasks: BackgroundTasks | None = None,
 ) -> NodeDocumentModel:
-    """Update a node."""
+    """Update a node.
+
+    Changing the name, type or properties of the node marks the embeddings
+    of its triples as stale. They are re-embedded in `background_tasks`, or
+    before returning if none are given.
+    """
     try:
         async with await db_client.start_session() as session:
             async with session.start_transaction():
@@ -40,32 +52,38 @@ async def update_node(
                 if updated_node is None:
                     raise ValueError(f"Node {node_id} not found.")
 
-                # Update embeddings of all associated triples
+                # Mark the embeddings of the associated triples as stale
+                stale_count = 0
                 if update.name or update.type or update.properties:
-                    triples = await db.triple.find(
-                        {
-                            "$or": [
-                                {"head_node": node_id, "created_by": user_id},
-                                {"tail_node": node_id, "created_by": user_id},
-                            ]
-                        }
-                    ).to_list(None)
-
-                    if triples:
-                        await update_triple_embeddings(
-                            db=db,
-                            triple_ids=[
-                                ObjectId(triple["_id"]) for triple in triples
-                            ],
-                            llm_client=llm_client,
-                            user_id=user_id,
-                            session=session,
-                        )
+                    stale_count = await mark_triples_stale(
+                        db=db,
+                        user_id=user_id,
+                        node_ids=[node_id],
+                        session=session,
+                    )
 
                 await session.commit_transaction()
 
         logger.info(f"Node {node_id} was successfully updated.")
-        return NodeDocumentModel(**updated_node.model_dump())
+        updated = NodeDocumentModel(**updated_node.model_dump())
+        await bump_graph_version(
+            db, {"_id": {"$in": list({node.graph, updated.graph})}}
+        )
+
+        # Re-embed the stale triples once the response is sent, if possible
+        if stale_count:
+            reembed = functools.partial(
+                reembed_stale_triples,
+                db=db,
+                llm_client=llm_client,
+                user_id=user_id,
+                node_ids=[node_id],
+            )
+            if background_tasks is None:
+                await reembed()
+            else:
+                background_tasks.add_task(reembed)
+        return updated
     except Exception as e:
         logger.error(f"Failed to update node {node_id} due to error: {str(e)}")
         raise
@@ -152,10 +170,11 @@ async def get_node_chunks(
                 "from": "chunk",
                 "localField": "chunks",
                 "foreignField": "_id",
+                # Embeddings are dropped before the chunks are joined
+                "pipeline": [{"$project": {"embedding": 0}}],
                 "as": "chunks",
             }
         },
-        {"$project": {"chunks.embedding": 0}},
         {"$unwind": "$chunks"},
         {"$addFields": {"chunks.workspaces": ["$workspace"]}},
         {"$replaceRoot": {"newRoot": "$chunks"}},
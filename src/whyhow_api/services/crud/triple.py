@@ -1,20 +1,28 @@
 """CRUD operations for triples."""
 
+import hashlib
+import itertools
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
-import logfire
 from bson import ObjectId
 from motor.core import AgnosticClientSession
 from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
 from pymongo import UpdateOne
 
+from whyhow_api.config import Settings
+from whyhow_api.exceptions import NotFoundException
 from whyhow_api.models.common import LLMClient, Triple
 from whyhow_api.schemas.chunks import ChunksOutWithWorkspaceDetails
-from whyhow_api.utilities.common import clean_text
+from whyhow_api.schemas.triples import TripleCreate, TripleCreateNode
+from whyhow_api.services.crud.graph import bump_graph_version
+from whyhow_api.utilities.common import clean_text, embed_texts
+from whyhow_api.utilities.vectors import encode_vector
 
 logger = logging.getLogger(__name__)
 
+settings = Settings()
+
 
 async def delete_triple(
     db: AsyncIOMotorDatabase,
@@ -28,6 +36,91 @@ async def delete_triple(
     await db.triple.delete_one({"_id": triple_id, "created_by": user_id})
 
 
+async def resolve_triples(
+    db: AsyncIOMotorDatabase,
+    triples: list[TripleCreate],
+    graph_id: ObjectId,
+    user_id: ObjectId,
+) -> list[Triple]:
+    """Convert triples of a request body into triples to build.
+
+    Head and tail nodes given as IDs are resolved with a single query for the
+    whole batch.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database.
+    triples : list[TripleCreate]
+        The triples to convert.
+    graph_id : ObjectId
+        The graph the referenced nodes belong to.
+    user_id : ObjectId
+        The owner of the referenced nodes.
+
+    Returns
+    -------
+    list[Triple]
+        The converted triples, with their chunks in the relation properties.
+
+    Raises
+    ------
+    NotFoundException
+        If a referenced node does not exist.
+    """
+    node_ids = {
+        ObjectId(node)
+        for triple in triples
+        for node in (triple.head_node, triple.tail_node)
+        if isinstance(node, str)
+    }
+    nodes: Dict[str, TripleCreateNode] = {}
+    if node_ids:
+        cursor = db.node.find(
+            {
+                "_id": {"$in": list(node_ids)},
+                "created_by": user_id,
+                "graph": graph_id,
+            },
+            {"name": 1, "type": 1, "properties": 1},
+        )
+        async for node in cursor:
+            nodes[str(node["_id"])] = TripleCreateNode(
+                name=node["name"],
+                type=node["type"],
+                properties=node.get("properties", {}),
+            )
+
+    def resolve(node: TripleCreateNode | str) -> TripleCreateNode:
+        if not isinstance(node, str):
+            return node
+        node_id = str(ObjectId(node))
+        if node_id not in nodes:
+            raise NotFoundException("Node not found.")
+        return nodes[node_id]
+
+    resolved_triples = []
+    for triple in triples:
+        head_node = resolve(triple.head_node)
+        tail_node = resolve(triple.tail_node)
+        resolved_triples.append(
+            Triple(
+                head=head_node.name,
+                head_type=head_node.type,
+                head_properties=head_node.properties,
+                tail=tail_node.name,
+                tail_type=tail_node.type,
+                tail_properties=tail_node.properties,
+                relation=triple.type,
+                relation_properties={
+                    **triple.properties,
+                    "chunks": triple.chunks,
+                },
+            )
+        )
+    return resolved_triples
+
+
 async def get_triple_chunks(
     collection: AsyncIOMotorCollection,
     id: ObjectId,
@@ -94,10 +187,11 @@ async def get_triple_chunks(
                 "from": "chunk",
                 "localField": "chunks",
                 "foreignField": "_id",
+                # Embeddings are dropped before the chunks are joined
+                "pipeline": [{"$project": {"embedding": 0}}],
                 "as": "chunks",
             }
         },
-        {"$project": {"chunks.embedding": 0}},
         {"$unwind": "$chunks"},
         {"$addFields": {"chunks.workspaces": ["$workspace"]}},
         {"$replaceRoot": {"newRoot": "$chunks"}},
@@ -271,90 +365,62 @@ async def embed_triples(
     texts = [convert_triple_to_text(t, include_chunks=False) for t in triples]
     logger.info(f"Total triples converted to text: {len(texts)}")
 
-    # Logfire trace of LLM client
-    logfire.instrument_openai(llm_client.client)
-
-    # Batch processing of embeddings
-    all_embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch_texts = texts[i : i + batch_size]
-        logger.info(f"Processing batch from {i} to {i + batch_size}")
-
-        if len(batch_texts) > 2048:
-            raise RuntimeError("Texts must be 2048 items or less.")
-
-        # Get embeddings for the batch of texts
-        response = await llm_client.client.embeddings.create(
-            input=batch_texts,
-            model=(
-                llm_client.metadata.embedding_name
-                if llm_client.metadata.embedding_name
-                else "text-embedding-3-small"
-            ),
-            dimensions=1024,  # ONLY WORKS FOR TEXT-EMBEDDING-3-* models
-        )
-        # Extract embeddings and add to the list
-        batch_embeddings = [d.embedding for d in response.data]
-        all_embeddings.extend(batch_embeddings)
+    return await embed_texts(
+        llm_client=llm_client,
+        texts=texts,
+        batch_size=batch_size,
+        # ONLY WORKS FOR TEXT-EMBEDDING-3-* models
+        dimensions=settings.mongodb.triple_vector_search_embedding_size,
+    )
 
-    return all_embeddings
 
+def triple_text_hash(text: str) -> str:
+    """Hash the text a triple is embedded from."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-async def update_triple_embeddings(
-    db: AsyncIOMotorDatabase,
-    llm_client: LLMClient,
-    triple_ids: list[ObjectId],
-    user_id: ObjectId,
-    session: AgnosticClientSession | None = None,
-) -> None:
-    """Update the embedding of triples."""
-    triples: List[dict[str, Any]] = await db.triple.aggregate(
-        [
-            {
-                "$match": {
-                    "_id": {"$in": triple_ids},
-                    "created_by": ObjectId(user_id),
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "node",
-                    "localField": "head_node",
-                    "foreignField": "_id",
-                    "as": "head_node",
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "node",
-                    "localField": "tail_node",
-                    "foreignField": "_id",
-                    "as": "tail_node",
-                }
-            },
-            {"$unwind": "$head_node"},
-            {"$unwind": "$tail_node"},
-            {
-                "$project": {
-                    "_id": 0,
-                    "head": "$head_node.name",
-                    "head_type": "$head_node.type",
-                    "head_properties": "$head_node.properties",
-                    "relation": "$type",
-                    "relation_properties": "$properties",
-                    "tail": "$tail_node.name",
-                    "tail_type": "$tail_node.type",
-                    "tail_properties": "$tail_node.properties",
-                }
-            },
-        ],
-        session=session,
-    ).to_list(None)
 
-    if not triples:
-        raise ValueError("No triples found.")
+def triple_text_pipeline(match: dict[str, Any]) -> list[dict[str, Any]]:
+    """Build the pipeline resolving matched triples with their node texts."""
+    return [
+        {"$match": match},
+        {
+            "$lookup": {
+                "from": "node",
+                "localField": "head_node",
+                "foreignField": "_id",
+                "as": "head_node",
+            }
+        },
+        {
+            "$lookup": {
+                "from": "node",
+                "localField": "tail_node",
+                "foreignField": "_id",
+                "as": "tail_node",
+            }
+        },
+        {"$unwind": "$head_node"},
+        {"$unwind": "$tail_node"},
+        {
+            "$project": {
+                "head": "$head_node.name",
+                "head_type": "$head_node.type",
+                "head_properties": "$head_node.properties",
+                "relation": "$type",
+                "relation_properties": "$properties",
+                "tail": "$tail_node.name",
+                "tail_type": "$tail_node.type",
+                "tail_properties": "$tail_node.properties",
+                "embedding_text_hash": 1,
+                "embedding_version": 1,
+            }
+        },
+    ]
+
 
-    triple_embed_objs = [
+def triple_embedding_text(triple: dict[str, Any]) -> str:
+    """Convert a triple resolved by `triple_text_pipeline` into its text."""
+    return convert_triple_to_text(
         Triple(
             head=triple["head"],
             head_type=triple["head_type"],
@@ -364,27 +430,290 @@ async def update_triple_embeddings(
             tail=triple["tail"],
             tail_type=triple["tail_type"],
             tail_properties=triple["tail_properties"],
+        ).model_dump(),
+        include_chunks=False,
+    )
+
+
+async def update_triple_embeddings(
+    db: AsyncIOMotorDatabase,
+    llm_client: LLMClient,
+    triple_ids: Iterable[ObjectId],
+    user_id: ObjectId,
+    session: AgnosticClientSession | None = None,
+    page_size: int = 1000,
+) -> int:
+    """Update the embedding of triples.
+
+    Triple IDs are consumed in pages of `page_size`, so large or streamed ID
+    lists are never resolved at once. Each triple keeps its `_id` through text
+    construction and embedding and is written back by ID, so embeddings do
+    not depend on the order the triples are returned in. Triples marked stale
+    since they were read are skipped and stay stale.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database.
+    llm_client : LLMClient
+        The LLM client to embed with.
+    triple_ids : Iterable[ObjectId]
+        The triples to embed.
+    user_id : ObjectId
+        The owner of the triples.
+    session : AgnosticClientSession, optional
+        The session to read and write the triples in.
+    page_size : int
+        The number of triples embedded at once.
+
+    Returns
+    -------
+    int
+        The number of triples updated.
+
+    Raises
+    ------
+    ValueError
+        If no triples are found or if some are not found. The triples found
+        are still written.
+    """
+    ids = iter(triple_ids)
+    found = 0
+    updated = 0
+    missing = 0
+    while page := list(dict.fromkeys(itertools.islice(ids, page_size))):
+        triples: List[dict[str, Any]] = await db.triple.aggregate(
+            triple_text_pipeline(
+                {
+                    "_id": {"$in": page},
+                    "created_by": ObjectId(user_id),
+                }
+            ),
+            session=session,
+        ).to_list(None)
+        missing += len(page) - len(triples)
+        found += len(triples)
+        if not triples:
+            continue
+
+        texts = [triple_embedding_text(triple) for triple in triples]
+
+        # Embed the triples
+        triple_embeddings = await embed_texts(
+            llm_client=llm_client,
+            texts=texts,
+            dimensions=settings.mongodb.triple_vector_search_embedding_size,
         )
-        for triple in triples
-    ]
+        if len(triple_embeddings) != len(triples):
+            raise ValueError("Triple embedding count does not match.")
+
+        # Update the triples with the embeddings, by ID, skipping those
+        # marked stale again since they were read
+        update_operations = [
+            UpdateOne(
+                {
+                    "_id": triple["_id"],
+                    "created_by": user_id,
+                    "embedding_version": triple.get("embedding_version"),
+                },
+                {
+                    "$set": {
+                        "embedding": encode_vector(
+                            embedding,
+                            settings.mongodb.embedding_storage_format,
+                        ),
+                        "embedding_status": "success",
+                        "embedding_text_hash": triple_text_hash(text),
+                    }
+                },
+            )
+            for triple, text, embedding in zip(
+                triples, texts, triple_embeddings
+            )
+        ]
+        result = await db.triple.bulk_write(
+            update_operations, ordered=False, session=session
+        )
+        skipped = len(update_operations) - result.matched_count
+        if skipped:
+            logger.info(f"Skipped {skipped} triples marked stale")
+        updated += result.matched_count
 
-    # Embed the triples
-    triple_embeddings = await embed_triples(
-        llm_client=llm_client,
-        triples=[triple.model_dump() for triple in triple_embed_objs],
+    if not found:
+        raise ValueError("No triples found.")
+    if missing:
+        raise ValueError(f"{missing} triples not found.")
+    return updated
+
+
+async def mark_triples_stale(
+    db: AsyncIOMotorDatabase,
+    user_id: ObjectId,
+    node_ids: list[ObjectId],
+    session: AgnosticClientSession | None = None,
+) -> int:
+    """Mark the embeddings of the triples connected to nodes as stale.
+
+    Called when the name, type or properties of nodes change, as those are
+    part of the text the triples are embedded from. The embedding version is
+    bumped so that a re-embedding reading the previous node texts does not
+    mark the triples as up to date.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database.
+    user_id : ObjectId
+        The owner of the triples.
+    node_ids : list[ObjectId]
+        The changed nodes.
+    session : AgnosticClientSession, optional
+        The session of the transaction changing the nodes.
+
+    Returns
+    -------
+    int
+        The number of triples marked as stale.
+    """
+    result = await db.triple.update_many(
+        {
+            "created_by": user_id,
+            "$or": [
+                {"head_node": {"$in": node_ids}},
+                {"tail_node": {"$in": node_ids}},
+            ],
+        },
+        {
+            "$set": {"embedding_status": "stale"},
+            "$inc": {"embedding_version": 1},
+        },
+        session=session,
     )
+    logger.info(f"Marked {result.modified_count} triple embeddings as stale")
+    return result.modified_count
 
-    # Update the triples with the embeddings
-    update_operations = [
-        UpdateOne(
-            {"_id": ObjectId(triple_id), "created_by": user_id},
-            {"$set": {"embedding": triple_embeddings[i]}},
-        )
-        for i, triple_id in enumerate(triple_ids)
-    ]
 
-    if update_operations:
-        result = await db.triple.bulk_write(update_operations, session=session)
+async def reembed_stale_triples(
+    db: AsyncIOMotorDatabase,
+    llm_client: LLMClient,
+    user_id: ObjectId,
+    node_ids: list[ObjectId] | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """Re-embed the triples marked as stale.
+
+    Stale triples are paged through by ID. Triples whose text hash still
+    matches the stored one are marked as up to date without being embedded
+    again. Updates only apply to triples whose embedding version did not
+    change since they were read, the others stay stale for the next run, as
+    do the triples that could not be embedded.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database.
+    llm_client : LLMClient
+        The LLM client to embed with.
+    user_id : ObjectId
+        The owner of the triples.
+    node_ids : list[ObjectId], optional
+        Only re-embed the triples connected to these nodes.
+    batch_size : int
+        The number of triples re-embedded at once.
+
+    Returns
+    -------
+    int
+        The number of triples embedded again.
+    """
+    match: dict[str, Any] = {
+        "created_by": user_id,
+        "embedding_status": "stale",
+    }
+    if node_ids is not None:
+        match["$or"] = [
+            {"head_node": {"$in": node_ids}},
+            {"tail_node": {"$in": node_ids}},
+        ]
+
+    dimensions = settings.mongodb.triple_vector_search_embedding_size
+    embedded = 0
+    graph_ids: set[ObjectId] = set()
+    last_id: ObjectId | None = None
+    while True:
+        page_match = (
+            match if last_id is None else {**match, "_id": {"$gt": last_id}}
+        )
+        page = (
+            await db.triple.find(page_match, {"_id": 1, "graph": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(None)
+        )
+        if not page:
+            break
+        last_id = page[-1]["_id"]
+        graph_ids.update(triple["graph"] for triple in page)
+
+        triples: List[dict[str, Any]] = await db.triple.aggregate(
+            triple_text_pipeline(
+                {
+                    "_id": {"$in": [triple["_id"] for triple in page]},
+                    "created_by": user_id,
+                }
+            )
+        ).to_list(None)
+
+        texts = [triple_embedding_text(triple) for triple in triples]
+        hashes = [triple_text_hash(text) for text in texts]
+        updates: List[dict[str, Any] | None] = [
+            {"embedding_status": "success"} for _ in triples
+        ]
+        changed = [
+            i
+            for i, (triple, text_hash) in enumerate(zip(triples, hashes))
+            if triple.get("embedding_text_hash") != text_hash
+        ]
+        if changed:
+            try:
+                embeddings = await embed_texts(
+                    llm_client=llm_client,
+                    texts=[texts[i] for i in changed],
+                    dimensions=dimensions,
+                )
+            except Exception as e:
+                logger.error(f"Failed to re-embed {len(changed)} triples: {e}")
+                # Left stale, so that the next run retries them
+                for i in changed:
+                    updates[i] = None
+            else:
+                embedded += len(changed)
+                for i, embedding in zip(changed, embeddings):
+                    updates[i] = {
+                        "embedding_status": "success",
+                        "embedding": encode_vector(
+                            embedding,
+                            settings.mongodb.embedding_storage_format,
+                        ),
+                        "embedding_text_hash": hashes[i],
+                    }
 
-    if result.matched_count != len(triple_ids):
-        raise ValueError("Triple embedding not updated for all triples.")
+        # Skip triples marked stale again since they were read
+        update_operations = [
+            UpdateOne(
+                {
+                    "_id": triple["_id"],
+                    "embedding_version": triple.get("embedding_version"),
+                },
+                {"$set": update},
+            )
+            for triple, update in zip(triples, updates)
+            if update is not None
+        ]
+        if update_operations:
+            await db.triple.bulk_write(update_operations, ordered=False)
+
+    if embedded:
+        await bump_graph_version(db, {"_id": {"$in": list(graph_ids)}})
+    logger.info(f"Re-embedded {embedded} stale triples")
+    return embedded
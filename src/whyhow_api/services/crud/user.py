@@ -16,6 +16,7 @@ from whyhow_api.schemas.users import (
     UserDocumentModel,
 )
 from whyhow_api.services.crud.base import update_one
+from whyhow_api.services.crud.chunks import delete_chunk_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,9 @@ async def delete_user(
             await db.chunk.delete_many(
                 {"created_by": user_id}, session=session
             )
+            await delete_chunk_embeddings(
+                db, {"created_by": user_id}, session=session
+            )
             # Delete the user's documents
             await db.document.delete_many(
                 {"created_by": user_id}, session=session
@@ -55,6 +59,10 @@ async def delete_user(
             )
             # Delete the user's nodes
             await db.node.delete_many({"created_by": user_id}, session=session)
+            # Delete the user's extraction ledger
+            await db.extraction.delete_many(
+                {"created_by": user_id}, session=session
+            )
             # Delete the user's queries
             await db.query.delete_many(
                 {"created_by": user_id}, session=session
@@ -5,6 +5,7 @@ import logging
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
+from whyhow_api.services.crud.chunks import update_chunk_embeddings
 from whyhow_api.services.crud.graph import delete_graphs
 
 logger = logging.getLogger(__name__)
@@ -65,6 +66,12 @@ async def delete_workspace(
                 },
                 session=session,
             )
+            await update_chunk_embeddings(
+                db,
+                {"workspaces": workspace_id, "created_by": user_id},
+                {"$pull": {"workspaces": workspace_id}},
+                session=session,
+            )
 
             # Finally, delete the workspace itself
             await db.workspace.delete_one(
@@ -1,17 +1,29 @@
 """Graph service."""
 
 import asyncio
+import copy
+import functools
+import itertools
 import json
 import logging
-import time
+import random
 import typing
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from json.decoder import JSONDecodeError
-from typing import Any, DefaultDict, Dict, List, Mapping, Sequence, Set, Tuple
+from typing import (
+    Any,
+    DefaultDict,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import openai
-import tiktoken
 from bson import ObjectId
 from fastapi import BackgroundTasks
 from langchain_core.prompts import ChatPromptTemplate
@@ -25,7 +37,7 @@ from pymongo import UpdateOne
 
 from whyhow_api.config import Settings
 from whyhow_api.dependencies import LLMClient
-from whyhow_api.exceptions import NotFoundException
+from whyhow_api.exceptions import ExtractionError, NotFoundException
 from whyhow_api.models.common import (
     EntityField,
     SchemaEntity,
@@ -35,8 +47,15 @@ from whyhow_api.models.common import (
     StructuredSchemaTriplePattern,
     TriplePattern,
 )
-from whyhow_api.schemas.base import ErrorDetails, get_utc_now
-from whyhow_api.schemas.chunks import ChunkDocumentModel
+from whyhow_api.schemas.base import (
+    AfterAnnotatedObjectId,
+    ErrorDetails,
+    get_utc_now,
+)
+from whyhow_api.schemas.chunks import (
+    ChunkDocumentModel,
+    ChunksOutWithWorkspaceDetails,
+)
 from whyhow_api.schemas.graphs import (
     ChunkFilters,
     CreateGraphBody,
@@ -53,104 +72,67 @@ from whyhow_api.schemas.nodes import (
 from whyhow_api.schemas.queries import QueryDocumentModel, QueryParameters
 from whyhow_api.schemas.rules import RuleOut
 from whyhow_api.schemas.schemas import SchemaCreate, SchemaDocumentModel
-from whyhow_api.schemas.tasks import TaskDocumentModel
-from whyhow_api.schemas.triples import TripleDocumentModel, TripleWithId
+from whyhow_api.schemas.tasks import (
+    TaskDocumentModel,
+    TaskProgress,
+)
+from whyhow_api.schemas.triples import (
+    TripleCreate,
+    TripleDocumentModel,
+    TripleWithId,
+)
 from whyhow_api.services.crud.base import create_one, get_one, update_one
 from whyhow_api.services.crud.chunks import get_chunks
-from whyhow_api.services.crud.graph import list_triples, list_triples_by_ids
+from whyhow_api.services.crud.extraction import (
+    get_extracted_chunk_ids,
+    hash_pattern,
+    record_extractions,
+)
+from whyhow_api.services.crud.graph import (
+    bump_graph_version,
+    list_triples,
+    list_triples_by_ids,
+)
 from whyhow_api.services.crud.rule import apply_rules_to_triples
 from whyhow_api.services.crud.task import create_task
 from whyhow_api.services.crud.triple import (
     convert_triple_to_text,
+    mark_triples_stale,
+    reembed_stale_triples,
+    resolve_triples,
     update_triple_embeddings,
 )
-from whyhow_api.utilities.builders import OpenAIBuilder, SpacyEntityExtractor
+from whyhow_api.utilities.builders import (
+    OpenAIBuilder,
+    SpacyEntityExtractor,
+    group_patterns,
+)
 from whyhow_api.utilities.common import (
-    check_existing,
+    check_existing_in,
     clean_text,
     dict_to_tuple,
+    embed_texts,
+    find_existing_ids,
     tuple_to_dict,
 )
-from whyhow_api.utilities.config import (
-    create_schema_guided_graph_prompt,
-    openai_completions_configs,
+from whyhow_api.utilities.completion_cache import (
+    CompletionCache,
+    MongoCompletionCache,
 )
+from whyhow_api.utilities.concurrency import gather_or_cancel
+from whyhow_api.utilities.config import openai_completions_configs
 from whyhow_api.utilities.cypher_export import generate_cypher_statements
+from whyhow_api.utilities.query_cache import QueryCache
+from whyhow_api.utilities.rate_limiter import RateLimiter, get_rate_limiter
+from whyhow_api.utilities.rerank import mmr_rerank
+from whyhow_api.utilities.tracing import StageTimer
+from whyhow_api.utilities.vectors import encode_vector
 
 logger = logging.getLogger(__name__)
 
 AUTOGEN_DESCRIPTION = "auto-generated"
 
 
-class RateLimiter:
-    """Rate limiter for API requests."""
-
-    def __init__(self, rpm_limit: int, tpm_limit: int):
-        self.rpm_limit = rpm_limit
-        self.tpm_limit = tpm_limit
-        self.requests = 0
-        self.tokens = 0
-        self.last_reset = time.time()
-        self.last_log_time = time.time()  # Track when the last log was printed
-        logger.info(
-            f"RateLimiter initialised with rpm_limit={rpm_limit} and tpm_limit={tpm_limit}"
-        )
-
-    async def wait(self, tokens: int) -> None:
-        """Wait for the rate limiter to allow the request."""
-        current_time = time.time()
-        time_passed = current_time - self.last_reset
-        if time_passed >= 60:
-            logger.info("Resetting rate limiter counters")
-            self.requests = 0
-            self.tokens = 0
-            self.last_reset = current_time
-            time_passed = 0
-
-        while (
-            self.requests >= self.rpm_limit
-            or self.tokens + tokens > self.tpm_limit
-        ):
-            current_time = time.time()
-            if current_time - self.last_log_time >= 1.0:
-                percent_requests_consumed = (
-                    self.requests / self.rpm_limit
-                ) * 100
-                percent_tokens_consumed = (
-                    (self.tokens + tokens) / self.tpm_limit
-                ) * 100
-                percent_time_remaining = (1 - time_passed / 60) * 100
-                logger.info(
-                    f"Rate limit reached: requests={self.requests} ({percent_requests_consumed:.2f}% consumed), "
-                    f"tokens={self.tokens + tokens} ({percent_tokens_consumed:.2f}% consumed), "
-                    f"time until reset={60 - time_passed:.2f}s ({percent_time_remaining:.2f}% remaining)"
-                )
-                self.last_log_time = current_time  # Update the last log time
-
-            await asyncio.sleep(0.1)
-            current_time = time.time()
-            time_passed = current_time - self.last_reset
-            if time_passed >= 60:
-                logger.info(
-                    "Resetting rate limiter counters due to time interval"
-                )
-                self.requests = 0
-                self.tokens = 0
-                self.last_reset = current_time
-                time_passed = (
-                    0  # Reset the timer since we are resetting the counters
-                )
-
-        self.requests += 1
-        self.tokens += tokens
-        percent_requests_consumed = (self.requests / self.rpm_limit) * 100
-        percent_tokens_consumed = (self.tokens / self.tpm_limit) * 100
-        logger.info(
-            f"Request allowed: total requests={self.requests} ({percent_requests_consumed:.2f}% consumed), "
-            f"total tokens={self.tokens} ({percent_tokens_consumed:.2f}% consumed)"
-        )
-
-
 DEFAULT_SEED_ENTITY_EXTRACTOR = SpacyEntityExtractor
 
 template = """
@@ -241,6 +223,25 @@ def triple_key(t: Triple) -> Tuple[str, str, str, str, str]:
     return (t.head, t.head_type, t.relation, t.tail, t.tail_type)
 
 
+def collect_chunk_ids(triples: list[Triple]) -> set[ObjectId]:
+    """Collect the chunk IDs referenced by the head, tail and relation of triples.
+
+    Invalid IDs are skipped here; they are reported when each triple's chunks
+    are checked against the resolved IDs.
+    """
+    chunk_ids: set[ObjectId] = set()
+    for t in triples:
+        for properties in (
+            t.head_properties,
+            t.tail_properties,
+            t.relation_properties,
+        ):
+            for chunk_id in properties.get("chunks", []):
+                if ObjectId.is_valid(chunk_id):
+                    chunk_ids.add(ObjectId(chunk_id))
+    return chunk_ids
+
+
 def merge_dicts(d1: Dict[str, Any], d2: Dict[str, Any]) -> Dict[str, Any]:
     """Merge two dictionaries, combining values of matching keys only if they are different.
 
@@ -294,32 +295,134 @@ def merge_dicts(d1: Dict[str, Any], d2: Dict[str, Any]) -> Dict[str, Any]:
     return d1
 
 
-async def create_node_id_map(
+AggregatedItem = Tuple[Dict[str, Any], List[AfterAnnotatedObjectId]]
+
+
+def _aggregate_item(
+    aggregated: Dict[Any, AggregatedItem],
+    key: Any,
+    properties: Dict[str, Any],
+    existing_chunk_ids: set[ObjectId],
+) -> None:
+    """Merge the properties and chunks of one occurrence into `aggregated`."""
+    properties = copy.deepcopy(properties)
+    chunks = check_existing_in(
+        "chunk", properties.pop("chunks", []), existing_chunk_ids
+    )
+    if key not in aggregated:
+        aggregated[key] = (properties, list(dict.fromkeys(chunks)))
+        return
+
+    aggregated_properties, aggregated_chunks = aggregated[key]
+    merge_dicts(aggregated_properties, properties)
+    for chunk_id in chunks:
+        if chunk_id not in aggregated_chunks:
+            aggregated_chunks.append(chunk_id)
+
+
+def aggregate_nodes(
+    triples: list[Triple], existing_chunk_ids: set[ObjectId]
+) -> Dict[Tuple[str, str], AggregatedItem]:
+    """Aggregate the head and tail nodes of triples by (name, type).
+
+    Properties of repeated nodes are merged with `merge_dicts` and their
+    chunks are unioned, so each unique node is written once per batch.
+
+    Raises
+    ------
+    NotFoundException
+        If a node references a chunk that is not in `existing_chunk_ids`.
+    """
+    aggregated: Dict[Tuple[str, str], AggregatedItem] = {}
+    for t in triples:
+        head_key, tail_key = node_keys(t)
+        _aggregate_item(
+            aggregated, head_key, t.head_properties, existing_chunk_ids
+        )
+        _aggregate_item(
+            aggregated, tail_key, t.tail_properties, existing_chunk_ids
+        )
+    return aggregated
+
+
+def aggregate_triples(
+    triples: list[Triple], existing_chunk_ids: set[ObjectId]
+) -> Dict[Tuple[str, str, str, str, str], AggregatedItem]:
+    """Aggregate triples by (head, head type, relation, tail, tail type).
+
+    Relation properties of repeated triples are merged with `merge_dicts` and
+    their chunks are unioned, so each unique triple is written once per batch.
+
+    Raises
+    ------
+    NotFoundException
+        If a relation references a chunk that is not in `existing_chunk_ids`.
+    """
+    aggregated: Dict[Tuple[str, str, str, str, str], AggregatedItem] = {}
+    for t in triples:
+        _aggregate_item(
+            aggregated, triple_key(t), t.relation_properties, existing_chunk_ids
+        )
+    return aggregated
+
+
+NodeRef = Tuple[ObjectId, List[AfterAnnotatedObjectId]]
+
+
+async def find_node_refs(
     db: AsyncIOMotorDatabase,
-    node_names: set[str],
-    node_types: set[str],
+    node_keys: set[Tuple[str, str]],
     graph_id: ObjectId,
     user_id: ObjectId,
     session: AsyncIOMotorClientSession | None = None,
-) -> dict[tuple[str, str], ObjectId]:
-    """Create a map of node names to node IDs.
+) -> dict[Tuple[str, str], NodeRef]:
+    """Find the IDs and chunks of nodes by (name, type).
 
-    Notes
-    -----
-    - Retrieve all node IDs with a query (assuming name and type combination is unique)
+    A single query matches the full (name, type) key of every node, each
+    served by the `update_one_node_index` index.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database.
+    node_keys : set[Tuple[str, str]]
+        The (name, type) of the nodes to find.
+    graph_id : ObjectId
+        The graph of the nodes.
+    user_id : ObjectId
+        The owner of the nodes.
+    session : AsyncIOMotorClientSession | None, optional
+        The session to read in, by default None.
+
+    Returns
+    -------
+    dict[Tuple[str, str], NodeRef]
+        The ID and chunks of every node found, keyed by (name, type).
     """
-    query = {
-        "graph": graph_id,
-        "created_by": user_id,
-        "name": {"$in": list(node_names)},
-        "type": {"$in": list(node_types)},
-    }
-    cursor = db.node.find(query, session=session)
+    if not node_keys:
+        return {}
+
+    cursor = db.node.find(
+        {
+            "$or": [
+                {
+                    "name": name,
+                    "type": type_,
+                    "created_by": user_id,
+                    "graph": graph_id,
+                }
+                for name, type_ in node_keys
+            ]
+        },
+        {"_id": 1, "name": 1, "type": 1, "chunks": 1},
+        session=session,
+    )
 
-    node_id_map = {}
+    node_refs = {}
     async for node in cursor:
-        node_id_map[(node["name"], node["type"])] = node["_id"]
-    return node_id_map
+        key = (node["name"], node["type"])
+        node_refs[key] = (node["_id"], node.get("chunks", []))
+    return node_refs
 
 
 def extract_properties_from_fields(fields: list[EntityField]) -> str:
@@ -493,259 +596,495 @@ def merge_lists_query(field_name: str, field_value: Any) -> dict[str, Any]:
     }
 
 
-async def build_graph(
-    db: AsyncIOMotorDatabase,
+class TripleEmbeddingStage:
+    """Embed triples outside of the graph build transactions.
+
+    Batches of triple IDs are queued once their structural writes have been
+    committed and are embedded by a bounded pool of workers, so embedding of
+    batch N overlaps the writes of batch N+1. The queue is bounded so the
+    structural stage waits when embedding falls behind.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        llm_client: LLMClient,
+        user_id: ObjectId,
+        concurrency: int,
+        queue_size: int,
+    ):
+        self.db = db
+        self.llm_client = llm_client
+        self.user_id = user_id
+        self.concurrency = max(1, concurrency)
+        self.queue: asyncio.Queue[list[ObjectId] | None] = asyncio.Queue(
+            maxsize=max(1, queue_size)
+        )
+        self.errors: list[Exception] = []
+        self.workers: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        """Start the embedding workers."""
+        self.workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.concurrency)
+        ]
+
+    async def put(self, triple_ids: list[ObjectId]) -> None:
+        """Queue a batch of committed triples for embedding."""
+        if triple_ids:
+            await self.queue.put(triple_ids)
+
+    async def drain(self) -> None:
+        """Wait for all queued batches to be embedded.
+
+        Raises
+        ------
+        ValueError
+            If any batch failed to embed.
+        """
+        for _ in self.workers:
+            await self.queue.put(None)
+        await asyncio.gather(*self.workers)
+        self.workers = []
+
+        if self.errors:
+            raise ValueError(
+                f"Failed to embed {len(self.errors)} triple batch(es)."
+            )
+
+    def cancel(self) -> None:
+        """Cancel any running embedding workers."""
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+
+    async def _worker(self) -> None:
+        """Embed queued batches until a stop sentinel is received."""
+        while True:
+            triple_ids = await self.queue.get()
+            if triple_ids is None:
+                return
+            try:
+                await update_triple_embeddings(
+                    db=self.db,
+                    llm_client=self.llm_client,
+                    triple_ids=triple_ids,
+                    user_id=self.user_id,
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to embed {len(triple_ids)} triples: {e}",
+                    exc_info=True,
+                )
+                self.errors.append(e)
+                try:
+                    # Triples of pages embedded before the failure are kept
+                    await self.db.triple.update_many(
+                        {
+                            "_id": {"$in": triple_ids},
+                            "created_by": self.user_id,
+                            "embedding_status": {"$ne": "success"},
+                        },
+                        {"$set": {"embedding_status": "failed"}},
+                    )
+                except Exception as ue:
+                    logger.error(f"Failed to update embedding status: {ue}")
+
+
+async def run_in_transaction(
     db_client: AsyncIOMotorClient,
-    llm_client: LLMClient,
+    write: typing.Callable[..., typing.Coroutine[Any, Any, Any]],
+) -> Any:
+    """Run `write(session=...)` in a transaction.
+
+    Transient errors such as write conflicts are retried by
+    `with_transaction`.
+    """
+    async with await db_client.start_session() as session:
+        return await session.with_transaction(lambda s: write(session=s))
+
+
+async def fail_task(
+    db: AsyncIOMotorDatabase, task_id: ObjectId | None, result: str
+) -> None:
+    """Mark a task as failed, if any."""
+    if task_id:
+        await db.task.update_one(
+            {"_id": task_id},
+            {
+                "$set": {
+                    "end_time": get_utc_now(),
+                    "status": "failed",
+                    "result": result,
+                }
+            },
+        )
+
+
+async def write_node_batch(
+    db: AsyncIOMotorDatabase,
+    nodes: list[Tuple[Tuple[str, str], AggregatedItem]],
     graph_id: ObjectId,
     user_id: ObjectId,
-    triples: list[Triple],
-    task_id: ObjectId | None = None,
-) -> None:
-    """Build a graph from triples."""
-    try:
-        logger.info(f"Populating graph with ID: {graph_id}")
+    ordered: bool,
+    session: AsyncIOMotorClientSession,
+) -> dict[Tuple[str, str], NodeRef]:
+    """Upsert a batch of aggregated nodes.
 
-        # Split triples into batches of 1000
-        batch_size = 1000
-        triple_chunks = [
-            triples[i : i + batch_size]
-            for i in range(0, len(triples), batch_size)
-        ]
+    The IDs of inserted nodes are taken from the bulk write result, only the
+    nodes that matched existing documents are looked up.
 
-        # Process each chunk one by one
-        for batch_index, chunk in enumerate(triple_chunks):
-            logger.info(
-                f"Processing batch {batch_index + 1}/{len(triple_chunks)}"
+    Returns
+    -------
+    dict[Tuple[str, str], NodeRef]
+        The ID and chunks of every node of the batch, keyed by (name, type).
+    """
+    node_operations = []
+    for (name, type_), (properties, validated_chunks) in nodes:
+        node = NodeDocumentModel(
+            name=name,
+            type=type_,
+            created_by=user_id,
+            graph=graph_id,
+            properties=properties,
+            chunks=validated_chunks,
+        )
+        node_operations.append(
+            UpdateOne(
+                {
+                    "name": node.name,
+                    "type": node.type,
+                    "graph": graph_id,
+                    "created_by": user_id,
+                },
+                [
+                    {
+                        "$set": {
+                            "properties": merge_dicts_query(
+                                "properties", node.properties
+                            ),
+                            "chunks": merge_lists_query("chunks", node.chunks),
+                            "created_at": {
+                                "$ifNull": ["$created_at", node.created_at]
+                            },
+                            "updated_at": node.updated_at,
+                        },
+                    },
+                ],
+                upsert=True,
             )
+        )
 
-            async with await db_client.start_session() as session:
-                async with session.start_transaction():
-                    # -- Create nodes
-                    node_operations = []
-                    node_names = set()
-                    node_types = set()
-
-                    for triple in chunk:  # Process each triple in the chunk
-                        for node, properties in [
-                            (
-                                NodeDocumentModel(
-                                    name=triple.head,
-                                    type=triple.head_type,
-                                    created_by=user_id,
-                                    graph=graph_id,
-                                ),
-                                triple.head_properties,
-                            ),
-                            (
-                                NodeDocumentModel(
-                                    name=triple.tail,
-                                    type=triple.tail_type,
-                                    created_by=user_id,
-                                    graph=graph_id,
-                                ),
-                                triple.tail_properties,
-                            ),
-                        ]:
-                            chunks = properties.pop("chunks", [])
-                            validated_chunks = await check_existing(
-                                db, "chunk", chunks, {"created_by": user_id}
-                            )
-                            node.properties = properties
-                            node.chunks = validated_chunks
-                            node_operations.append(
-                                UpdateOne(
-                                    {
-                                        "name": node.name,
-                                        "type": node.type,
-                                        "graph": graph_id,
-                                        "created_by": user_id,
-                                    },
-                                    [
-                                        {
-                                            "$set": {
-                                                "properties": merge_dicts_query(
-                                                    "properties",
-                                                    node.properties,
-                                                ),
-                                                "chunks": merge_lists_query(
-                                                    "chunks", node.chunks
-                                                ),
-                                                "created_at": {
-                                                    "$ifNull": [
-                                                        "$created_at",
-                                                        node.created_at,
-                                                    ]
-                                                },
-                                                "updated_at": node.updated_at,
-                                            },
-                                        },
-                                    ],
-                                    upsert=True,
-                                )
-                            )
-                            node_names.add(node.name)
-                            node_types.add(node.type)
+    if not node_operations:
+        return {}
 
-                    # Execute bulk insert for nodes
-                    if node_operations:
-                        await db.node.bulk_write(
-                            node_operations, session=session
-                        )
-                    logger.info("Nodes created")
-
-                    node_id_map = await create_node_id_map(
-                        db=db,
-                        node_names=node_names,
-                        node_types=node_types,
-                        graph_id=graph_id,
-                        user_id=user_id,
-                        session=session,
-                    )
+    result = await db.node.bulk_write(
+        node_operations, ordered=ordered, session=session
+    )
+    logger.info(
+        f"{len(node_operations)} nodes written, {result.upserted_count} created"
+    )
 
-                    # Fetch all node chunks
-                    all_nodes = await db.node.find(
-                        {
-                            "_id": {"$in": list(node_id_map.values())},
-                            "graph": graph_id,
-                            "created_by": user_id,
+    node_refs: dict[Tuple[str, str], NodeRef] = {}
+    for index, node_id in (result.upserted_ids or {}).items():
+        key, (_, chunks) = nodes[index]
+        node_refs[key] = (node_id, list(chunks))
+
+    # Matched nodes may hold chunks from previous builds
+    matched_keys = {key for key, _ in nodes if key not in node_refs}
+    node_refs.update(
+        await find_node_refs(db, matched_keys, graph_id, user_id, session)
+    )
+    return node_refs
+
+
+async def write_triple_batch(
+    db: AsyncIOMotorDatabase,
+    triples: list[Tuple[Tuple[str, str, str, str, str], AggregatedItem]],
+    node_refs: Mapping[Tuple[str, str], NodeRef],
+    graph_id: ObjectId,
+    user_id: ObjectId,
+    ordered: bool,
+    session: AsyncIOMotorClientSession,
+) -> list[ObjectId]:
+    """Upsert a batch of aggregated triples between existing nodes.
+
+    Nodes missing from `node_refs` are looked up. The IDs of inserted
+    triples are taken from the bulk write result, only the triples that
+    matched existing documents are looked up, by their full upsert key.
+
+    Returns
+    -------
+    list[ObjectId]
+        The IDs of the upserted triples.
+
+    Raises
+    ------
+    NotFoundException
+        If a head or tail node of a triple does not exist.
+    """
+    batch_node_keys: set[Tuple[str, str]] = set()
+    for head, head_type, _, tail, tail_type in (key for key, _ in triples):
+        batch_node_keys.update(((head, head_type), (tail, tail_type)))
+
+    missing_node_keys = batch_node_keys - node_refs.keys()
+    if missing_node_keys:
+        node_refs = {
+            **node_refs,
+            **await find_node_refs(
+                db, missing_node_keys, graph_id, user_id, session
+            ),
+        }
+
+    # Prepare triple documents using node IDs from the map
+    triple_operations = []
+    triple_filters = []
+    for (head, head_type, relation, tail, tail_type), (
+        properties,
+        validated_chunks,
+    ) in triples:
+        head_ref = node_refs.get((head, head_type))
+        if head_ref is None:
+            raise NotFoundException(f"Failed to find head node: {head}")
+
+        tail_ref = node_refs.get((tail, tail_type))
+        if tail_ref is None:
+            raise NotFoundException(f"Failed to find tail node: {tail}")
+
+        triple_model = TripleDocumentModel(
+            head_node=head_ref[0],
+            tail_node=tail_ref[0],
+            type=relation,
+            properties=properties,
+            chunks=validated_chunks,
+            created_by=user_id,
+            graph=graph_id,
+        )
+        triple_filters.append(
+            {
+                "head_node": triple_model.head_node,
+                "tail_node": triple_model.tail_node,
+                "type": triple_model.type,
+                "graph": triple_model.graph,
+                "created_by": triple_model.created_by,
+            }
+        )
+
+        # Compute intersection of chunks
+        intersected_chunks = list(set(head_ref[1]) & set(tail_ref[1]))
+
+        triple_operations.append(
+            UpdateOne(
+                triple_filters[-1],
+                [
+                    {
+                        "$set": {
+                            "properties": merge_dicts_query(
+                                "properties", triple_model.properties
+                            ),
+                            "chunks": {
+                                "$setUnion": [
+                                    intersected_chunks,
+                                    merge_lists_query(
+                                        "chunks", triple_model.chunks
+                                    ),
+                                ]
+                            },
+                            "created_at": {
+                                "$ifNull": [
+                                    "$created_at",
+                                    triple_model.created_at,
+                                ]
+                            },
+                            "updated_at": triple_model.updated_at,
+                            "embedding_status": "pending",
                         },
-                        {"_id": 1, "chunks": 1},
-                        session=session,
-                    ).to_list(None)
-
-                    # Create a dictionary for quick lookup
-                    node_chunks = {
-                        node["_id"]: node.get("chunks", [])
-                        for node in all_nodes
+                    },
+                ],
+                upsert=True,
+            )
+        )
+
+    if not triple_operations:
+        return []
+
+    result = await db.triple.bulk_write(
+        triple_operations, ordered=ordered, session=session
+    )
+    logger.info(
+        f"{len(triple_operations)} triples written, {result.upserted_count} created"
+    )
+
+    upserted_ids = result.upserted_ids or {}
+    triple_ids = list(upserted_ids.values())
+
+    # Look up the triples that matched existing documents
+    matched_keys = {
+        (f["head_node"], f["tail_node"], f["type"])
+        for index, f in enumerate(triple_filters)
+        if index not in upserted_ids
+    }
+    if matched_keys:
+        # Each clause is served by the `update_one_triple_index` index
+        cursor = db.triple.find(
+            {
+                "$or": [
+                    {
+                        "head_node": head_node,
+                        "tail_node": tail_node,
+                        "type": type_,
+                        "created_by": user_id,
+                        "graph": graph_id,
                     }
+                    for head_node, tail_node, type_ in matched_keys
+                ]
+            },
+            {"_id": 1},
+            session=session,
+        )
+        async for triple in cursor:
+            triple_ids.append(triple["_id"])
+    return triple_ids
 
-                    # Prepare triple documents using node IDs from the map
-                    triple_operations = []
-                    triple_filters = []
-                    for triple in chunk:
-                        properties = triple.relation_properties
-                        chunks = properties.pop("chunks", [])
-                        validated_chunks = await check_existing(
-                            db, "chunk", chunks, {"created_by": user_id}
-                        )
-                        triple_model = TripleDocumentModel(
-                            head_node=node_id_map[
-                                (triple.head, triple.head_type)
-                            ],
-                            tail_node=node_id_map[
-                                (triple.tail, triple.tail_type)
-                            ],
-                            type=triple.relation,
-                            properties=properties,
-                            chunks=validated_chunks,
-                            created_by=user_id,
-                            graph=graph_id,
-                        )
-                        triple_filters.append(
-                            {
-                                "head_node": triple_model.head_node,
-                                "tail_node": triple_model.tail_node,
-                                "type": triple_model.type,
-                                "graph": triple_model.graph,
-                                "created_by": triple_model.created_by,
-                            }
-                        )
 
-                        # Use the pre-fetched node chunks
-                        head_chunks = node_chunks.get(triple_model.head_node)
-                        if head_chunks is None:
-                            raise NotFoundException(
-                                f"Failed to find head node: {triple_model.head_node}"
-                            )
+async def build_graph(
+    db: AsyncIOMotorDatabase,
+    db_client: AsyncIOMotorClient,
+    llm_client: LLMClient,
+    graph_id: ObjectId,
+    user_id: ObjectId,
+    triples: list[Triple],
+    settings: Settings,
+    task_id: ObjectId | None = None,
+) -> None:
+    """Build a graph from triples.
 
-                        tail_chunks = node_chunks.get(triple_model.tail_node)
-                        if tail_chunks is None:
-                            raise NotFoundException(
-                                f"Failed to find tail node: {triple_model.tail_node}"
-                            )
+    Triples are first aggregated into unique nodes and unique triples, which
+    are then upserted in batches of `build_batch_size`. Since every batch
+    holds distinct upsert keys, up to `build_max_concurrent_batches` batches
+    are written in parallel, each in its own transaction. All node batches are
+    committed before the triple batches start, as triples reference nodes.
 
-                        # Compute intersection of chunks
-                        intersected_chunks = list(
-                            set(head_chunks) & set(tail_chunks)
-                        )
+    Committed triples are marked with a pending `embedding_status` and embedded
+    by a `TripleEmbeddingStage` concurrently with the following batches. The
+    graph is only marked as ready once both stages have finished.
+    """
+    embedding_stage = TripleEmbeddingStage(
+        db=db,
+        llm_client=llm_client,
+        user_id=user_id,
+        concurrency=settings.api.build_embedding_concurrency,
+        queue_size=settings.api.build_embedding_queue_size,
+    )
+    try:
+        logger.info(f"Populating graph with ID: {graph_id}")
+        embedding_stage.start()
+
+        batch_size = settings.api.build_batch_size
+        ordered = settings.api.build_ordered_bulk_writes
+
+        # Resolve every referenced chunk with one query per batch of triples
+        existing_chunk_ids: set[ObjectId] = set()
+        for i in range(0, len(triples), batch_size):
+            existing_chunk_ids |= await find_existing_ids(
+                db,
+                "chunk",
+                collect_chunk_ids(triples[i : i + batch_size]),
+                {"created_by": user_id},
+            )
 
-                        triple_operations.append(
-                            UpdateOne(
-                                triple_filters[-1],
-                                [
-                                    {
-                                        "$set": {
-                                            "properties": merge_dicts_query(
-                                                "properties",
-                                                triple_model.properties,
-                                            ),
-                                            "chunks": {
-                                                "$setUnion": [
-                                                    intersected_chunks,
-                                                    merge_lists_query(
-                                                        "chunks",
-                                                        triple_model.chunks,
-                                                    ),
-                                                ]
-                                            },
-                                            "created_at": {
-                                                "$ifNull": [
-                                                    "$created_at",
-                                                    triple_model.created_at,
-                                                ]
-                                            },
-                                            "updated_at": triple_model.updated_at,
-                                        },
-                                    },
-                                ],
-                                upsert=True,
-                            )
-                        )
+        # Aggregate duplicates so that batches hold distinct upsert keys
+        aggregated_nodes = list(
+            aggregate_nodes(triples, existing_chunk_ids).items()
+        )
+        aggregated_triples = list(
+            aggregate_triples(triples, existing_chunk_ids).items()
+        )
+        node_batches = [
+            aggregated_nodes[i : i + batch_size]
+            for i in range(0, len(aggregated_nodes), batch_size)
+        ]
+        triple_batches = [
+            aggregated_triples[i : i + batch_size]
+            for i in range(0, len(aggregated_triples), batch_size)
+        ]
+        total_batches = len(node_batches) + len(triple_batches)
 
-                    # Execute bulk insert for triples
-                    if triple_operations:
-                        await db.triple.bulk_write(
-                            triple_operations, session=session
-                        )
-                    logger.info(f"Triples created for batch {batch_index + 1}")
-
-                    # Embed triples
-                    if triple_filters:
-                        updated_triples = await db.triple.find(
-                            {"$or": triple_filters},
-                            {"_id": 1},
-                            session=session,
-                        ).to_list(None)
-                        await update_triple_embeddings(
-                            db=db,
-                            llm_client=llm_client,
-                            triple_ids=[
-                                ObjectId(t["_id"]) for t in updated_triples
-                            ],
-                            user_id=user_id,
-                            session=session,
-                        )
-                    logger.info(
-                        f"Triple embeddings updated for batch {batch_index + 1}"
-                    )
+        semaphore = asyncio.Semaphore(
+            settings.api.build_max_concurrent_batches
+        )
 
-                    # If task_id is provided, update task status
-                    if task_id:
-                        await db.task.update_one(
-                            {"_id": task_id},
-                            {
-                                "$set": {
-                                    "result": f"Processing batch {batch_index + 1}/{len(triple_chunks)}",
-                                }
+        async def run_batch(
+            batch_index: int,
+            write: typing.Callable[..., typing.Coroutine[Any, Any, Any]],
+        ) -> Any:
+            """Write one batch in a transaction and report its progress."""
+            async with semaphore:
+                result = await run_in_transaction(db_client, write)
+                await bump_graph_version(db, {"_id": graph_id})
+
+                if task_id:
+                    await db.task.update_one(
+                        {"_id": task_id},
+                        {
+                            "$set": {
+                                "result": f"Committed batch {batch_index + 1}/{total_batches}"
                             },
-                            session=session,
-                        )
+                        },
+                    )
+                logger.info(
+                    f"Batch {batch_index + 1}/{total_batches} processed successfully"
+                )
+                return result
+
+        async def run_triple_batch(
+            batch_index: int,
+            batch: list[Tuple[Tuple[str, str, str, str, str], AggregatedItem]],
+        ) -> None:
+            """Write one triple batch and queue its triples for embedding."""
+            triple_ids = await run_batch(
+                batch_index,
+                functools.partial(
+                    write_triple_batch,
+                    db,
+                    batch,
+                    node_refs,
+                    graph_id,
+                    user_id,
+                    ordered,
+                ),
+            )
+            # Embed the committed triples while other batches are written
+            if triple_ids:
+                await embedding_stage.put(triple_ids)
+
+        # Node IDs captured from the node batches, reused by triple batches
+        node_refs: dict[Tuple[str, str], NodeRef] = {}
+        for batch_node_refs in await gather_or_cancel(
+            run_batch(
+                batch_index,
+                functools.partial(
+                    write_node_batch, db, batch, graph_id, user_id, ordered
+                ),
+            )
+            for batch_index, batch in enumerate(node_batches)
+        ):
+            node_refs.update(batch_node_refs or {})
 
-                    # Commit the transaction
-                    await session.commit_transaction()
+        await gather_or_cancel(
+            run_triple_batch(len(node_batches) + batch_index, batch)
+            for batch_index, batch in enumerate(triple_batches)
+        )
 
-                logger.info(f"Chunk {batch_index + 1} processed successfully")
+        if task_id:
+            await db.task.update_one(
+                {"_id": task_id},
+                {"$set": {"result": "Embedding triples"}},
+            )
+        await embedding_stage.drain()
+        logger.info("Triple embeddings updated")
+        await bump_graph_version(db, {"_id": graph_id})
 
         # If task_id is provided, update task status
         if task_id:
@@ -771,6 +1110,7 @@ async def build_graph(
 
         logger.info("Graph constructed'")
     except NotFoundException as e:
+        embedding_stage.cancel()
         logger.error(f"Failed to build/update graph: {e}", exc_info=True)
         if task_id:
             await db.task.update_one(
@@ -782,7 +1122,6 @@ async def build_graph(
                         "result": str(e),
                     }
                 },
-                session=session,
             )
         await update_one(
             collection=db["graph"],
@@ -801,6 +1140,7 @@ async def build_graph(
         )
         raise
     except Exception as e:
+        embedding_stage.cancel()
         logger.error(f"Failed to build/update graph: {e}", exc_info=True)
         if task_id:
             await db.task.update_one(
@@ -812,7 +1152,6 @@ async def build_graph(
                         "result": "Failed to build/update graph",
                     }
                 },
-                session=session,
             )
         await update_one(
             collection=db["graph"],
@@ -832,74 +1171,467 @@ async def build_graph(
         raise
 
 
-async def extract_graph_triples(
-    llm_client: LLMClient,
-    chunks: list[ChunkDocumentModel],
-    tokenizer: tiktoken.core.Encoding,
-    patterns: list[SchemaTriplePattern],
-    rate_limiter: RateLimiter,
-) -> list[Triple]:
-    """Extract triples from chunks."""
-    try:
+class StreamingGraphBuild:
+    """Build a graph from batches of triples as they arrive.
 
-        all_triples: List[Triple] = []
+    Batches are written one after another by a single writer, each with its
+    nodes and triples in one transaction, while the following batches are
+    still being received and resolved. The queue between the two is bounded
+    so memory stays flat regardless of the number of batches. Committed
+    triples are embedded by a `TripleEmbeddingStage`.
+    """
 
-        async def process_chunk(
-            chunk: ChunkDocumentModel,
-        ) -> List[Triple] | None:
-            """Process a chunk."""
-            max_retries = 5
-            for attempt in range(max_retries):
-                try:
-                    # Ensure chunk.content is a string
-                    if isinstance(chunk.content, dict):
-                        content_str = json.dumps(chunk.content)
-                    else:
-                        content_str = chunk.content
-
-                    # Estimate tokens using tiktoken
-                    # Use the first pattern as an estimate
-                    estimated_tokens = len(
-                        tokenizer.encode(
-                            create_schema_guided_graph_prompt(
-                                text=content_str, pattern=patterns[0]
-                            )
-                        )
-                    )
-                    await rate_limiter.wait(estimated_tokens)
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        db_client: AsyncIOMotorClient,
+        llm_client: LLMClient,
+        graph_id: ObjectId,
+        user_id: ObjectId,
+        settings: Settings,
+        task_id: ObjectId | None = None,
+    ):
+        self.db = db
+        self.db_client = db_client
+        self.graph_id = graph_id
+        self.user_id = user_id
+        self.task_id = task_id
+        self.ordered = settings.api.build_ordered_bulk_writes
+        self.queue: asyncio.Queue[list[Triple] | None] = asyncio.Queue(
+            maxsize=max(1, settings.api.build_stream_queue_size)
+        )
+        self.embedding_stage = TripleEmbeddingStage(
+            db=db,
+            llm_client=llm_client,
+            user_id=user_id,
+            concurrency=settings.api.build_embedding_concurrency,
+            queue_size=settings.api.build_embedding_queue_size,
+        )
+        self.error: Exception | None = None
+        self.writer: asyncio.Task[None] | None = None
+        self.triple_count = 0
 
-                    return await OpenAIBuilder.extract_triples(
-                        llm_client=llm_client,
+    def start(self) -> None:
+        """Start the writer and the embedding stage."""
+        self.embedding_stage.start()
+        self.writer = asyncio.create_task(self._write_batches())
+
+    async def put(self, triples: list[Triple]) -> None:
+        """Queue a batch of triples, waiting while the queue is full.
+
+        Raises
+        ------
+        Exception
+            The error of a previous batch, if its write failed.
+        """
+        if self.error is not None:
+            raise self.error
+        if triples:
+            await self.queue.put(triples)
+
+    async def close(self) -> None:
+        """Wait for all queued batches to be written.
+
+        Raises
+        ------
+        Exception
+            The error of the first batch whose write failed.
+        """
+        await self.queue.put(None)
+        if self.writer is not None:
+            await self.writer
+        if self.error is not None:
+            raise self.error
+
+    async def drain(self) -> None:
+        """Wait for the embeddings of the written triples."""
+        if self.task_id:
+            await self.db.task.update_one(
+                {"_id": self.task_id},
+                {"$set": {"result": "Embedding triples"}},
+            )
+        await self.embedding_stage.drain()
+        await bump_graph_version(self.db, {"_id": self.graph_id})
+
+    async def finish(self) -> bool:
+        """Wait for the embeddings and mark the graph as ready.
+
+        Returns whether the graph is ready, the build is marked as failed
+        otherwise.
+        """
+        try:
+            await self.drain()
+
+            if self.task_id:
+                await self.db.task.update_one(
+                    {"_id": self.task_id},
+                    {
+                        "$set": {
+                            "end_time": get_utc_now(),
+                            "status": "success",
+                            "result": "Graph constructed",
+                        }
+                    },
+                )
+            await update_one(
+                collection=self.db["graph"],
+                document_model=GraphDocumentModel,
+                id=self.graph_id,
+                document=GraphStateErrorsUpdate(status="ready"),
+                user_id=self.user_id,
+            )
+            logger.info(f"Graph constructed from {self.triple_count} triples")
+        except Exception as e:
+            await self.fail(e)
+            return False
+        return True
+
+    async def fail(self, error: Exception) -> None:
+        """Stop the build and mark the task and graph as failed."""
+        self.error = error
+        self.cancel()
+        logger.error(f"Failed to build/update graph: {error}", exc_info=True)
+        if self.task_id:
+            await self.db.task.update_one(
+                {"_id": self.task_id},
+                {
+                    "$set": {
+                        "end_time": get_utc_now(),
+                        "status": "failed",
+                        "result": str(error),
+                    }
+                },
+            )
+        await update_one(
+            collection=self.db["graph"],
+            document_model=GraphDocumentModel,
+            id=self.graph_id,
+            document=GraphStateErrorsUpdate(
+                status="failed",
+                errors=[ErrorDetails(message=str(error), level="critical")],
+            ),
+            user_id=self.user_id,
+        )
+
+    def cancel(self) -> None:
+        """Cancel the writer and the embedding stage."""
+        if self.writer is not None:
+            self.writer.cancel()
+        self.embedding_stage.cancel()
+
+    async def _write_batches(self) -> None:
+        while (triples := await self.queue.get()) is not None:
+            # Keep consuming after a failure so that `put` never blocks
+            if self.error is not None:
+                continue
+            try:
+                await self._write_batch(triples)
+            except Exception as e:
+                logger.error(f"Failed to write triple batch: {e}")
+                self.error = e
+
+    async def _write_batch(self, triples: list[Triple]) -> None:
+        existing_chunk_ids = await find_existing_ids(
+            self.db,
+            "chunk",
+            collect_chunk_ids(triples),
+            {"created_by": self.user_id},
+        )
+        nodes = list(aggregate_nodes(triples, existing_chunk_ids).items())
+        aggregated_triples = list(
+            aggregate_triples(triples, existing_chunk_ids).items()
+        )
+
+        async def write(session: AsyncIOMotorClientSession) -> list[ObjectId]:
+            node_refs = await write_node_batch(
+                self.db,
+                nodes,
+                self.graph_id,
+                self.user_id,
+                self.ordered,
+                session=session,
+            )
+            return await write_triple_batch(
+                self.db,
+                aggregated_triples,
+                node_refs,
+                self.graph_id,
+                self.user_id,
+                self.ordered,
+                session=session,
+            )
+
+        triple_ids = await run_in_transaction(self.db_client, write)
+        await bump_graph_version(self.db, {"_id": self.graph_id})
+        await self.embedding_stage.put(triple_ids)
+
+        self.triple_count += len(triples)
+        if self.task_id:
+            await self.db.task.update_one(
+                {"_id": self.task_id},
+                {"$set": {"result": f"Ingested {self.triple_count} triples"}},
+            )
+        logger.info(f"Ingested {self.triple_count} triples")
+
+
+# Consumer of extracted triples, awaited as each extraction completes
+TripleSink = typing.Callable[[list[Triple]], typing.Awaitable[None]]
+
+
+class ExtractionRequest:
+    """Request extracting a group of patterns from a chunk."""
+
+    def __init__(
+        self,
+        chunk: ChunkDocumentModel,
+        patterns: list[SchemaTriplePattern],
+        future: asyncio.Future[list[Triple]],
+        priority: int,
+        sequence: int,
+        sink: TripleSink | None = None,
+    ):
+        self.chunk = chunk
+        self.patterns = patterns
+        self.future = future
+        self.priority = priority
+        self.sequence = sequence
+        self.sink = sink
+        self.attempts = 0
+
+    def __lt__(self, other: "ExtractionRequest") -> bool:
+        """Order requests by priority, then by submission."""
+        return (self.priority, self.sequence) < (
+            other.priority,
+            other.sequence,
+        )
+
+
+class ExtractionScheduler:
+    """Schedule the LLM requests of a triple extraction.
+
+    Every request extracts one group of `pattern_group_size` patterns from one
+    chunk. Requests wait in a priority queue, lowest priority first and then in
+    submission order, and are sent by `max_concurrency` workers once the rate
+    limiter allows them. A failed request is retried on its own after an
+    exponential backoff with full jitter, and given up after `max_retries`
+    retries.
+
+    If a task is provided, the progress counters are written to it every
+    `progress_interval` seconds.
+
+    Requests extracted with a sink pass their triples to it from the worker
+    that sent them, so a sink that waits, such as a full build queue, holds
+    back the following requests.
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        rate_limiter: RateLimiter,
+        max_concurrency: int,
+        max_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        cache: CompletionCache | None = None,
+        pattern_group_size: int = 1,
+        db: AsyncIOMotorDatabase | None = None,
+        task_id: ObjectId | None = None,
+        progress_interval: float = 2.0,
+    ):
+        self.llm_client = llm_client
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.cache = cache
+        self.pattern_group_size = pattern_group_size
+        self.db = db
+        self.task_id = task_id
+        self.progress_interval = progress_interval
+        self.queue: asyncio.PriorityQueue[ExtractionRequest] = (
+            asyncio.PriorityQueue()
+        )
+        self.sequence = itertools.count()
+        self.progress = TaskProgress()
+        self.failed_requests: list[ExtractionRequest] = []
+        self.workers: list[asyncio.Task[None]] = []
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: Settings,
+        llm_client: LLMClient,
+        rate_limiter: RateLimiter,
+        **kwargs: Any,
+    ) -> "ExtractionScheduler":
+        """Create a scheduler configured by the API settings."""
+        return cls(
+            llm_client=llm_client,
+            rate_limiter=rate_limiter,
+            max_concurrency=settings.api.extraction_max_concurrency,
+            max_retries=settings.api.extraction_max_retries,
+            retry_base_delay=settings.api.extraction_retry_base_delay,
+            retry_max_delay=settings.api.extraction_retry_max_delay,
+            progress_interval=settings.api.extraction_progress_interval,
+            **kwargs,
+        )
+
+    def start(self) -> None:
+        """Start the request workers and the progress reporter."""
+        self.workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.max_concurrency)
+        ]
+        if self.db is not None and self.task_id is not None:
+            self.workers.append(asyncio.create_task(self._report_progress()))
+
+    async def extract(
+        self,
+        chunks: list[ChunkDocumentModel],
+        patterns: list[SchemaTriplePattern],
+        priority: int = 0,
+        sink: TripleSink | None = None,
+    ) -> list[Triple]:
+        """Extract the triples of `patterns` from `chunks`.
+
+        Requests given up after their retries contribute no triples and are
+        kept in `failed_requests`. If a `sink` is provided, the triples of each request are passed to it as
+        soon as the request completes and are not returned.
+        """
+        loop = asyncio.get_running_loop()
+        futures: list[asyncio.Future[list[Triple]]] = []
+        for chunk in chunks:
+            for group in group_patterns(patterns, self.pattern_group_size):
+                future = loop.create_future()
+                self.queue.put_nowait(
+                    ExtractionRequest(
                         chunk=chunk,
-                        completions_config=openai_completions_configs.triple,
-                        patterns=patterns,
+                        patterns=group,
+                        future=future,
+                        priority=priority,
+                        sequence=next(self.sequence),
+                        sink=sink,
                     )
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        logger.error(
-                            f"Failed to process chunk after {max_retries} attempts: {e}"
-                        )
-                        raise
-                    await asyncio.sleep(2**attempt)  # Exponential backoff
+                )
+                futures.append(future)
+        self.progress.requests_total += len(futures)
+
+        results = await asyncio.gather(*futures)
+        return [triple for triples in results for triple in triples]
+
+    async def close(self) -> None:
+        """Stop the workers and write the final progress."""
+        self.cancel()
+        if self.db is not None and self.task_id is not None:
+            await self._write_progress()
+
+    def cancel(self) -> None:
+        """Cancel the request workers and the progress reporter."""
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+
+    async def _worker(self) -> None:
+        """Send queued requests, retrying the ones that fail."""
+        while True:
+            request = await self.queue.get()
+            if request.future.done():
+                # The extraction awaiting the request was cancelled
+                continue
 
+            triples = await self._fetch(request)
+            if triples is not None:
+                self.progress.requests_completed += 1
+                self.progress.triples_extracted += len(triples)
+                if request.sink is not None:
+                    try:
+                        if triples:
+                            await request.sink(triples)
+                    except Exception as e:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                        continue
+                    triples = []
+                if not request.future.done():
+                    request.future.set_result(triples)
+            elif request.attempts < self.max_retries:
+                request.attempts += 1
+                self.progress.requests_retried += 1
+                delay = random.uniform(
+                    0,
+                    min(
+                        self.retry_max_delay,
+                        self.retry_base_delay * 2**request.attempts,
+                    ),
+                )
+                asyncio.get_running_loop().call_later(
+                    delay, self.queue.put_nowait, request
+                )
+            else:
+                logger.error(
+                    f"Failed to extract triples from chunk {request.chunk.id} after {request.attempts + 1} attempts"
+                )
+                self.progress.requests_failed += 1
+                self.failed_requests.append(request)
+                if not request.future.done():
+                    request.future.set_result([])
+
+    async def _fetch(self, request: ExtractionRequest) -> list[Triple] | None:
+        """Send a request, returning None if it failed."""
+        chunk, patterns = request.chunk, request.patterns
+        try:
+            if len(patterns) == 1:
+                return await OpenAIBuilder.fetch_triples(
+                    llm_client=self.llm_client,
+                    chunk=chunk,
+                    pattern=patterns[0],
+                    completions_config=openai_completions_configs.triple,
+                    cache=self.cache,
+                    rate_limiter=self.rate_limiter,
+                )
+            return await OpenAIBuilder.fetch_grouped_triples(
+                llm_client=self.llm_client,
+                chunk=chunk,
+                patterns=patterns,
+                completions_config=openai_completions_configs.triple,
+                cache=self.cache,
+                rate_limiter=self.rate_limiter,
+            )
+        except Exception as e:
+            logger.error(f"Failed to extract triples: {e}")
             return None
 
-        tasks = [process_chunk(chunk) for chunk in chunks]
+    async def _report_progress(self) -> None:
+        """Write the progress to the task periodically."""
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            await self._write_progress()
 
-        chunk_results = await asyncio.gather(*tasks)
-
-        for triples in chunk_results:
-            if triples is not None:
-                all_triples.extend(triples)
-
-        semantic_triples = all_triples
-        logger.info(f"Extracted {len(semantic_triples)} semantic triples")
+    async def _write_progress(self) -> None:
+        """Write the progress to the task."""
+        try:
+            await self.db.task.update_one(  # type: ignore[union-attr]
+                {"_id": self.task_id},
+                {"$set": {"progress": self.progress.model_dump()}},
+            )
+        except Exception as e:
+            logger.warning(f"Failed to update extraction progress: {e}")
 
-        return all_triples
 
-    except Exception as e:
-        logger.error(f"Failed to extract triples: {e}")
-        raise
+async def extract_graph_triples(
+    scheduler: ExtractionScheduler,
+    chunks: list[ChunkDocumentModel],
+    patterns: list[SchemaTriplePattern],
+    priority: int = 0,
+    sink: TripleSink | None = None,
+) -> list[Triple]:
+    """Extract triples from chunks with the requests of a scheduler."""
+    triples = await scheduler.extract(
+        chunks=chunks, patterns=patterns, priority=priority, sink=sink
+    )
+    logger.info(f"Extracted {len(triples)} semantic triples")
+    return triples
 
 
 def create_structured_patterns(
@@ -1042,6 +1774,47 @@ async def apply_rules(
     -------
     - list[Triple]: The updated triples.
     """
+    workspace_rules = await get_graph_rules(
+        db=db,
+        workspace_id=workspace_id,
+        graph_id=graph_id,
+        user_id=user_id,
+        errors=errors,
+    )
+
+    # Apply workspace rules to the triples
+    return apply_rules_to_triples(extracted_triples, workspace_rules)
+
+
+async def get_graph_rules(
+    db: AsyncIOMotorDatabase,
+    workspace_id: ObjectId,
+    graph_id: ObjectId,
+    user_id: ObjectId,
+    errors: list[ErrorDetails],
+) -> list[RuleOut]:
+    """
+    Get the workspace rules applied to a graph.
+
+    The rules are recorded on the graph the first time they are applied.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database connection.
+    workspace_id : ObjectId
+        The ID of the workspace.
+    graph_id : ObjectId
+        The ID of the graph.
+    user_id : ObjectId
+        The ID of the user.
+    errors : list[ErrorDetails]
+        The list of errors.
+
+    Returns
+    -------
+    - list[RuleOut]: The workspace rules.
+    """
     # Get workspace rules
     rules = await db.rule.find(
         {"workspace": workspace_id, "created_by": user_id},
@@ -1049,11 +1822,6 @@ async def apply_rules(
 
     workspace_rules = [RuleOut(**rule) for rule in rules]
 
-    # Apply workspace rules to the triples
-    updated_triples = apply_rules_to_triples(
-        extracted_triples, workspace_rules
-    )
-
     # Check that graph `rules` field is not existing
     graph = await db.graph.find_one(
         {
@@ -1086,7 +1854,78 @@ async def apply_rules(
             )
             raise
 
-    return updated_triples
+    return workspace_rules
+
+
+class ExtractionLedger:
+    """Track the chunks extracted for each pattern of a graph.
+
+    Extractions are recorded per (chunk, pattern hash, model), so updating a
+    graph only extracts chunks that are new to a pattern. Changing a pattern
+    or the model invalidates its previous extractions. Chunks are recorded
+    once `commit` is called, i.e. after the graph was built successfully.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        graph_id: ObjectId,
+        user_id: ObjectId,
+        model: str,
+        incremental: bool = True,
+    ):
+        self.db = db
+        self.graph_id = graph_id
+        self.user_id = user_id
+        self.model = model
+        self.incremental = incremental
+        self.extracted: DefaultDict[str, set[ObjectId]] = defaultdict(set)
+
+    async def filter_chunk_ids(
+        self, pattern: SchemaTriplePattern, chunk_ids: list[ObjectId]
+    ) -> list[ObjectId]:
+        """Remove the chunks already extracted for a pattern.
+
+        All chunks are kept if the ledger is not incremental.
+        """
+        if not self.incremental:
+            return chunk_ids
+
+        extracted_chunk_ids = await get_extracted_chunk_ids(
+            db=self.db,
+            graph_id=self.graph_id,
+            user_id=self.user_id,
+            pattern_hash=hash_pattern(pattern),
+            model=self.model,
+            chunk_ids=chunk_ids,
+        )
+        logger.info(
+            f"Skipping {len(extracted_chunk_ids)} chunks already extracted for pattern: {convert_pattern_to_text(pattern)}"
+        )
+        return [c for c in chunk_ids if c not in extracted_chunk_ids]
+
+    def add(
+        self, pattern: SchemaTriplePattern, chunk_ids: Iterable[ObjectId]
+    ) -> None:
+        """Add chunks extracted for a pattern."""
+        self.extracted[hash_pattern(pattern)].update(chunk_ids)
+
+    def discard(
+        self, pattern: SchemaTriplePattern, chunk_ids: Iterable[ObjectId]
+    ) -> None:
+        """Remove chunks whose extraction failed for a pattern."""
+        self.extracted[hash_pattern(pattern)].difference_update(chunk_ids)
+
+    async def commit(self) -> None:
+        """Record the added chunks as extracted."""
+        await record_extractions(
+            db=self.db,
+            graph_id=self.graph_id,
+            user_id=self.user_id,
+            model=self.model,
+            extractions=self.extracted,
+        )
+        self.extracted = defaultdict(set)
 
 
 async def chunk_filters_to_triples(
@@ -1097,11 +1936,29 @@ async def chunk_filters_to_triples(
     workspace_id: ObjectId,
     max_chunks: int,
     settings: Settings,
-    tiktoken_encoder: tiktoken.core.Encoding,
-    rate_limiter: RateLimiter,
     patterns: list[SchemaTriplePattern],
+    scheduler: ExtractionScheduler,
+    ledger: ExtractionLedger | None = None,
+    sink: TripleSink | None = None,
 ) -> list[Triple]:
-    """Convert chunk filters to triples."""
+    """Convert chunk filters to triples.
+
+    String chunks are extracted with the requests of `scheduler`, prioritised
+    in schema pattern order. Chunk retrieval runs for at most
+    `extraction_max_concurrency` patterns at a time.
+
+    If a `ledger` is provided, chunks it already holds for a pattern are
+    skipped and the extracted chunks are added to it. Chunks whose requests
+    were given up are left out, so they are extracted again next time.
+
+    If the scheduler's `pattern_group_size` is greater than 1, string chunks
+    are extracted once per group of the patterns that retrieved them rather
+    than once per pattern.
+
+    If a `sink` is provided, triples are passed to it as soon as they are
+    extracted, one chunk at a time for string chunks, instead of being
+    returned.
+    """
     logger.info(f"All chunk filters: {filters}")
     _chunks = await db.chunk.find(filters, {"_id": 1}).to_list(None)
     chunk_ids = [c["_id"] for c in _chunks]
@@ -1109,15 +1966,42 @@ async def chunk_filters_to_triples(
 
     extracted_triples: list[Triple] = []
 
+    pattern_group_size = scheduler.pattern_group_size
+    retrieval_semaphore = asyncio.Semaphore(
+        settings.api.extraction_max_concurrency
+    )
+
+    async def get_pattern_chunks(
+        **kwargs: Any,
+    ) -> list[ChunksOutWithWorkspaceDetails] | list[ChunkDocumentModel]:
+        async with retrieval_semaphore:
+            return await get_chunks(**kwargs)
+
+    # Chunks to extract with all the patterns that retrieved them
+    grouped_chunks: dict[ObjectId, ChunkDocumentModel] = {}
+    grouped_pattern_indices: defaultdict[ObjectId, set[int]] = defaultdict(
+        set
+    )
+
     async def process_pattern(
+        index: int,
         pattern: SchemaTriplePattern,
     ) -> List[Triple]:
         full_pattern = convert_pattern_to_text(pattern)
         logger.info(f"Processing pattern: {full_pattern}")
 
+        pattern_chunk_ids = chunk_ids
+        if ledger is not None:
+            pattern_chunk_ids = await ledger.filter_chunk_ids(
+                pattern, chunk_ids
+            )
+            if not pattern_chunk_ids:
+                logger.info(f"No new chunks for pattern: {full_pattern}")
+                return []
+
         # ONLY STRINGS ARE RETRIEVED BY VECTOR SEARCH AS THIS HAS OVERHEAD
         # OBJECTS ARE NOT AS THERE IS NO LLM OVERHEAD
-        string_chunk_models = await get_chunks(
+        string_chunk_models = await get_pattern_chunks(
             collection=db["chunk"],
             llm_client=llm_client,
             user_id=user_id,
@@ -1126,7 +2010,7 @@ async def chunk_filters_to_triples(
                 "workspaces": {"$in": [workspace_id]},
                 "seed_concept": full_pattern,
                 "data_type": "string",
-                "_id": {"$in": chunk_ids},
+                "_id": {"$in": pattern_chunk_ids},
             },
             limit=max_chunks,
             populate=False,
@@ -1138,14 +2022,14 @@ async def chunk_filters_to_triples(
             f"Found {len(string_chunk_models)} string chunks for pattern: {full_pattern}"
         )
 
-        object_chunk_models = await get_chunks(
+        object_chunk_models = await get_pattern_chunks(
             collection=db["chunk"],
             llm_client=llm_client,
             user_id=user_id,
             include_embeddings=False,
             filters={
                 "data_type": "object",
-                "_id": {"$in": chunk_ids},
+                "_id": {"$in": pattern_chunk_ids},
             },
             limit=(
                 max_chunks
@@ -1185,13 +2069,17 @@ async def chunk_filters_to_triples(
         )
 
         unstructured_triples = []
-        if string_chunks:
+        if string_chunks and pattern_group_size > 1:
+            for chunk in string_chunks:
+                grouped_chunks[ObjectId(chunk.id)] = chunk
+                grouped_pattern_indices[ObjectId(chunk.id)].add(index)
+        elif string_chunks:
             unstructured_triples = await extract_graph_triples(
-                llm_client=llm_client,
+                scheduler=scheduler,
                 patterns=[pattern],
                 chunks=string_chunks,
-                tokenizer=tiktoken_encoder,
-                rate_limiter=rate_limiter,
+                priority=index,
+                sink=sink,
             )
             logger.info(
                 f"Extracted {len(unstructured_triples)} unstructured triples for pattern: {pattern}"
@@ -1206,14 +2094,48 @@ async def chunk_filters_to_triples(
             logger.info(
                 f"Extracted {len(structured_triples)} structured triples for pattern: {pattern}"
             )
+            if sink is not None:
+                await sink(structured_triples)
+                structured_triples = []
+
+        if ledger is not None:
+            ledger.add(pattern, [ObjectId(c.id) for c in chunk_models])
 
         return [*structured_triples, *unstructured_triples]
 
     # Process patterns concurrently using asyncio.gather
     pattern_results = await asyncio.gather(
-        *[process_pattern(pattern) for pattern in patterns]
+        *[
+            process_pattern(index, pattern)
+            for index, pattern in enumerate(patterns)
+        ]
     )
 
+    if grouped_chunks:
+        # Patterns keep the schema order so identical requests are cached
+        pattern_results += await asyncio.gather(
+            *[
+                extract_graph_triples(
+                    scheduler=scheduler,
+                    patterns=[
+                        patterns[i]
+                        for i in sorted(grouped_pattern_indices[chunk_id])
+                    ],
+                    chunks=[chunk],
+                    sink=sink,
+                )
+                for chunk_id, chunk in grouped_chunks.items()
+            ]
+        )
+        logger.info(
+            f"Extracted triples from {len(grouped_chunks)} string chunks in pattern groups of {pattern_group_size}"
+        )
+
+    if ledger is not None:
+        for request in scheduler.failed_requests:
+            for pattern in request.patterns:
+                ledger.discard(pattern, [ObjectId(request.chunk.id)])
+
     # Flatten the results and extend extracted_triples
     for triples in pattern_results:
         extracted_triples.extend(triples)
@@ -1233,6 +2155,9 @@ async def create_or_update_graph(
     schema_id: ObjectId,
     settings: Settings,
     filters: ChunkFilters | None = None,
+    incremental: bool = True,
+    pattern_group_size: int = 1,
+    task_id: ObjectId | None = None,
 ) -> None:
     """
     Create or update a graph.
@@ -1255,6 +2180,13 @@ async def create_or_update_graph(
         Filters to apply for chunk retrieval when creating the graph.
     settings : Settings
         The settings for the API.
+    incremental : bool, optional
+        Only extract the chunks not yet extracted for each pattern with the
+        current model, by default True.
+    pattern_group_size : int, optional
+        The number of schema patterns extracted per LLM request, by default 1.
+    task_id : ObjectId | None, optional
+        The task tracking the extraction progress and the graph build.
 
     Returns
     -------
@@ -1292,13 +2224,41 @@ async def create_or_update_graph(
     MAX_CHUNKS = settings.api.max_chunk_pattern_product // len(patterns)
     logger.info(f"Maximum chunks per pattern: {MAX_CHUNKS}")
 
-    tiktoken_encoder = tiktoken.encoding_for_model(
-        settings.generative.openai.model
-    )
-    rate_limiter = RateLimiter(
+    rate_limiter = get_rate_limiter(
+        f"{llm_client.client.base_url}:{llm_client.client.api_key}",
         settings.generative.openai.rpm_limit,
         settings.generative.openai.tpm_limit,
     )
+    ledger = ExtractionLedger(
+        db=db,
+        graph_id=graph_id,
+        user_id=user_id,
+        model=(
+            llm_client.metadata.language_model_name
+            or openai_completions_configs.triple.model
+        ),
+        incremental=incremental,
+    )
+    completion_cache = (
+        MongoCompletionCache(
+            collection=db["completion_cache"],
+            ttl_seconds=settings.api.completion_cache_ttl_seconds,
+            max_entries=settings.api.completion_cache_max_entries,
+            evict_interval=settings.api.completion_cache_evict_interval,
+            cache_nonzero_temperature=settings.api.completion_cache_nonzero_temperature,
+        )
+        if settings.api.completion_cache_enabled
+        else None
+    )
+    scheduler = ExtractionScheduler.from_settings(
+        settings=settings,
+        llm_client=llm_client,
+        rate_limiter=rate_limiter,
+        cache=completion_cache,
+        pattern_group_size=pattern_group_size,
+        db=db,
+        task_id=task_id,
+    )
     try:
 
         # Find all the possible chunks based on the provided filters
@@ -1307,37 +2267,106 @@ async def create_or_update_graph(
             "workspaces": workspace_id,
             **(filters.mql_filter if filters else {}),
         }
-        extracted_triples = await chunk_filters_to_triples(
-            db=db,
-            filters=all_chunk_filters,
-            llm_client=llm_client,
-            user_id=user_id,
-            workspace_id=workspace_id,
-            max_chunks=MAX_CHUNKS,
-            settings=settings,
-            tiktoken_encoder=tiktoken_encoder,
-            rate_limiter=rate_limiter,
-            patterns=patterns,
-        )
 
-        updated_triples = await apply_rules(
-            db=db,
-            extracted_triples=extracted_triples,
-            workspace_id=workspace_id,
-            graph_id=graph_id,
-            user_id=user_id,
-            errors=errors,
-        )
+        build: StreamingGraphBuild | None = None
+        sink: TripleSink | None = None
+        if settings.api.build_streaming:
+            # Extracted triples go through the rules into batched writes
+            # while the extraction is still running
+            workspace_rules = await get_graph_rules(
+                db=db,
+                workspace_id=workspace_id,
+                graph_id=graph_id,
+                user_id=user_id,
+                errors=errors,
+            )
+            streaming_build = StreamingGraphBuild(
+                db=db,
+                db_client=db_client,
+                llm_client=llm_client,
+                graph_id=graph_id,
+                user_id=user_id,
+                settings=settings,
+                task_id=task_id,
+            )
+            batch: list[Triple] = []
 
-        # Create graph from triples in the database
-        await build_graph(
-            db=db,
-            db_client=db_client,
-            llm_client=llm_client,
-            graph_id=graph_id,
-            triples=updated_triples,
-            user_id=user_id,
-        )
+            async def queue_triples(triples: list[Triple]) -> None:
+                nonlocal batch
+                batch.extend(apply_rules_to_triples(triples, workspace_rules))
+                if len(batch) >= settings.api.build_batch_size:
+                    full_batch, batch = batch, []
+                    await streaming_build.put(full_batch)
+
+            build, sink = streaming_build, queue_triples
+            build.start()
+
+        scheduler.start()
+        try:
+            extracted_triples = await chunk_filters_to_triples(
+                db=db,
+                filters=all_chunk_filters,
+                llm_client=llm_client,
+                user_id=user_id,
+                workspace_id=workspace_id,
+                max_chunks=MAX_CHUNKS,
+                settings=settings,
+                patterns=patterns,
+                scheduler=scheduler,
+                ledger=ledger,
+                sink=sink,
+            )
+            if build is not None:
+                await build.put(batch)
+                await build.close()
+                if scheduler.progress.requests_failed:
+                    await build.drain()
+        except Exception:
+            if build is not None:
+                build.cancel()
+            raise
+        finally:
+            await scheduler.close()
+        if completion_cache is not None:
+            logger.info(
+                f"Completion cache hits: {completion_cache.hits}, misses: {completion_cache.misses}"
+            )
+        if scheduler.progress.requests_failed:
+            message = f"Failed to extract triples for {scheduler.progress.requests_failed} of {scheduler.progress.requests_total} extraction requests"
+            if build is not None:
+                # The triples of the other requests are written, so record
+                # their chunks for an update to extract only the failed ones
+                await ledger.commit()
+                message += ", the triples of the other requests were kept"
+            raise ExtractionError(message)
+
+        if build is not None:
+            if not await build.finish():
+                # Marked as failed by the build, raised as by build_graph
+                raise build.error or ValueError("Failed to finish the build")
+            await ledger.commit()
+        else:
+            updated_triples = await apply_rules(
+                db=db,
+                extracted_triples=extracted_triples,
+                workspace_id=workspace_id,
+                graph_id=graph_id,
+                user_id=user_id,
+                errors=errors,
+            )
+
+            # Create graph from triples in the database
+            await build_graph(
+                db=db,
+                db_client=db_client,
+                llm_client=llm_client,
+                graph_id=graph_id,
+                triples=updated_triples,
+                user_id=user_id,
+                settings=settings,
+                task_id=task_id,
+            )
+            await ledger.commit()
         logger.info(
             f"Graph created/updated successfully with graph_id: {graph_id}"
         )
@@ -1353,6 +2382,19 @@ async def create_or_update_graph(
                 level="critical",
             )
         )
+        await fail_task(db, task_id, "Failed to build/update graph")
+        await update_one(
+            collection=db["graph"],
+            document_model=GraphDocumentModel,
+            id=ObjectId(graph_id),
+            document=GraphStateErrorsUpdate(status="failed", errors=errors),
+            user_id=user_id,
+        )
+        raise
+    except ExtractionError as e:
+        logger.error(f"{e}. Updating graph status.")
+        errors.append(ErrorDetails(message=str(e), level="critical"))
+        await fail_task(db, task_id, str(e))
         await update_one(
             collection=db["graph"],
             document_model=GraphDocumentModel,
@@ -1372,6 +2414,7 @@ async def create_or_update_graph(
                 level="critical",
             )
         )
+        await fail_task(db, task_id, "Failed to build/update graph")
         await update_one(
             collection=db["graph"],
             document_model=GraphDocumentModel,
@@ -1392,6 +2435,7 @@ async def create_or_update_graph(
                 level="critical",
             )
         )
+        await fail_task(db, task_id, "Failed to build/update graph")
         await update_one(
             collection=db["graph"],
             document_model=GraphDocumentModel,
@@ -1402,12 +2446,21 @@ async def create_or_update_graph(
         raise
 
 
+# Events of a streamed query, as `(event, data)` tuples
+QueryEvent = Tuple[typing.Literal["triples", "token", "done"], Any]
+
+# Queries being written, referenced until they are done
+_closing_queries: set[asyncio.Future[None]] = set()
+
+
 class QueryProcessor(ABC):
     """Query processor interface."""
 
     @abstractmethod
     async def query(
-        self, request: QueryGraphRequest
+        self,
+        request: QueryGraphRequest,
+        background_tasks: BackgroundTasks | None = None,
     ) -> QueryDocumentModel | None:
         """Perform a query."""
         pass
@@ -1433,6 +2486,37 @@ class MixedQueryProcessor(QueryProcessor):
         self.schema_id = schema_id
         self.llm_client = llm_client
         self.settings = settings
+        self.query_cache = (
+            QueryCache(
+                collection=db["query_cache"],
+                ttl_seconds=settings.api.query_cache_ttl_seconds,
+                similarity_threshold=settings.api.query_cache_similarity_threshold,
+                similarity_candidates=settings.api.query_cache_similarity_candidates,
+            )
+            if settings.api.query_cache_enabled
+            else None
+        )
+
+    async def _graph_version(self) -> int:
+        """Get the content version of the graph."""
+        graph = await self.db.graph.find_one(
+            {"_id": self.graph_id}, {"content_version": 1}
+        )
+        return graph.get("content_version", 0) if graph else 0
+
+    async def _embed_query(self, query: str) -> list[float]:
+        """Embed a query like the triples of the graph."""
+        # TODO: ENSURE THIS IS **EXACTLY** THE SAME AS THE TRIPLE EMBEDDING MODEL
+        query_vector = (
+            await embed_texts(
+                llm_client=self.llm_client,
+                texts=[query],
+                # ONLY WORKS FOR TEXT-EMBEDDING-3-* models
+                dimensions=self.settings.mongodb.triple_vector_search_embedding_size,
+            )
+        )[0]
+        logger.info(f"query embedded with {len(query_vector)} dimensions")
+        return query_vector
 
     async def _retrieve_entities_and_relation_types(
         self,
@@ -1540,21 +2624,80 @@ class MixedQueryProcessor(QueryProcessor):
                 {"tail_node": {"$in": matched_node_ids}},
             ],
         }
-        matched_triples = await self.db.triple.find(triple_query).to_list(None)
+        matched_triples = await self.db.triple.find(
+            triple_query, {"_id": 1}
+        ).to_list(None)
         matched_triple_ids = [triple["_id"] for triple in matched_triples]
 
         return matched_node_ids, matched_triple_ids
 
+    async def _plan_triple_filter(
+        self,
+        entities: list[str],
+        relations: list[str],
+        values: list[str] | None = None,
+    ) -> dict[str, Any] | None:
+        """Plan the predicate restricting a query to the filtered triples.
+
+        Filters covering every node or relation type of the graph, e.g. the
+        types of its schema, are dropped, so queries over the whole graph
+        skip the pre-filter. A relation filter alone is pushed down as a
+        predicate on the `type` of triples, if it is a filter field of the
+        vector search index. Other filters pre-filter the triples by ID,
+        with `_retrieve_filtered_triple_and_node_ids`.
+
+        Parameters
+        ----------
+        entities
+            A list of entity types.
+        relations
+            A list of relation types.
+        values
+            A list of entity values e.g. the `name` of entities.
+
+        Returns
+        -------
+        dict[str, Any] | None
+            The predicate on triples, empty for the whole graph, or None if
+            the pre-filter matches no triples.
+        """
+        graph_query = {"graph": self.graph_id, "created_by": self.user_id}
+        node_types, relation_types = await asyncio.gather(
+            self.db.node.distinct("type", graph_query),
+            self.db.triple.distinct("type", graph_query),
+        )
+        all_nodes = not values and set(node_types) <= set(entities)
+        all_relations = set(relation_types) <= set(relations)
+
+        if all_nodes and all_relations:
+            logger.info("Query filters cover the whole graph")
+            return {}
+        if all_nodes and self.settings.mongodb.triple_vector_index_type_filter:
+            logger.info("Query filters cover all nodes")
+            return {"type": {"$in": relations}}
+
+        node_ids, triple_ids = (
+            await self._retrieve_filtered_triple_and_node_ids(
+                entities=entities, relations=relations, values=values
+            )
+        )
+        logger.info(
+            f"node_ids: {len(node_ids)}, triple_ids: {len(triple_ids)}"
+        )
+        if not triple_ids:
+            return None
+        return {"_id": {"$in": triple_ids}}
+
     async def _retrieve_triples(
         self,
-        triple_ids: list[ObjectId],
+        triple_filter: dict[str, Any],
     ) -> tuple[list[NodeWithId], list[TripleWithId]]:
-        """Retrieve triples and associated nodes based on triple IDs.
+        """Retrieve triples and associated nodes based on a triple filter.
 
         Parameters
         ----------
-        triple_ids
-            A list of triple IDs.
+        triple_filter
+            The predicate on triples, see `_plan_triple_filter`.
 
         Returns
         -------
@@ -1566,7 +2709,7 @@ class MixedQueryProcessor(QueryProcessor):
                 "$match": {
                     "graph": self.graph_id,
                     "created_by": self.user_id,
-                    "_id": {"$in": triple_ids},
+                    **triple_filter,
                 }
             },
             {
@@ -1648,7 +2791,12 @@ class MixedQueryProcessor(QueryProcessor):
         return unique_nodes, triples
 
     async def _sim_search(
-        self, query: str, include_chunks: bool, triple_ids: list[ObjectId]
+        self,
+        query: str,
+        include_chunks: bool,
+        triple_filter: dict[str, Any],
+        query_vector: list[float] | None = None,
+        include_embeddings: bool = False,
     ) -> list[dict[str, Any]]:
         """Perform a similarity search.
 
@@ -1658,31 +2806,20 @@ class MixedQueryProcessor(QueryProcessor):
             The query to search for.
         include_chunks
             Whether to include chunks in the search.
-        triple_ids
-            The list of triple IDs to limit the search for, e.g. for structured subgraph filtering.
+        triple_filter
+            The predicate on triples to limit the search to, e.g. for structured subgraph filtering, see `_plan_triple_filter`.
+        query_vector
+            The embedding of the query, embedded if not provided.
+        include_embeddings
+            Whether to return the embeddings of the triples, e.g. for reranking.
 
         Returns
         -------
         list
             A list of similar triples.
         """
-        # Embed query
-        # TODO: ENSURE THIS IS **EXACTLY** THE SAME AS THE TRIPLE EMBEDDING MODEL
-        response = await self.llm_client.client.embeddings.create(
-            input=[query],
-            model=(
-                self.llm_client.metadata.embedding_name
-                if self.llm_client.metadata.embedding_name
-                else "text-embedding-3-small"
-            ),
-            dimensions=1024,  # ONLY WORKS FOR TEXT-EMBEDDING-3-* models
-        )
-        query_vector = response.data[0].embedding
-        logger.info(f"query embedded with {len(query_vector)} dimensions")
-
-        # if len(triple_ids) == 0:
-        #     print("triple ids == 0")
-        #     return []
+        if query_vector is None:
+            query_vector = await self._embed_query(query)
 
         # Find semantically similar triples
         pipeline: list[dict[str, Any]] = [
@@ -1693,18 +2830,26 @@ class MixedQueryProcessor(QueryProcessor):
                     "filter": {
                         "created_by": {"$eq": self.user_id},
                         "graph": {"$eq": self.graph_id},
+                        **triple_filter,
                     },
-                    "queryVector": query_vector,
+                    "queryVector": encode_vector(
+                        query_vector,
+                        self.settings.mongodb.embedding_storage_format,
+                    ),
                     "numCandidates": self.settings.api.query_sim_triple_candidates,
                     "limit": self.settings.api.query_sim_triple_limit,
                 }
             },
-            {
-                "$project": {
-                    "embedding": 0,
-                    "score": {"$meta": "vectorSearchScore"},
+            (
+                {"$addFields": {"score": {"$meta": "vectorSearchScore"}}}
+                if include_embeddings
+                else {
+                    "$project": {
+                        "embedding": 0,
+                        "score": {"$meta": "vectorSearchScore"},
+                    }
                 }
-            },
+            ),
             {
                 "$lookup": {
                     "from": "node",
@@ -1723,9 +2868,6 @@ class MixedQueryProcessor(QueryProcessor):
             },
         ]
 
-        if len(triple_ids) > 0:
-            pipeline[0]["$vectorSearch"]["filter"]["_id"] = {"$in": triple_ids}
-
         if include_chunks:
             pipeline.append(
                 {
@@ -1733,6 +2875,7 @@ class MixedQueryProcessor(QueryProcessor):
                         "from": "chunk",
                         "localField": "chunks",
                         "foreignField": "_id",
+                        "pipeline": [{"$project": {"embedding": 0}}],
                         "as": "chunks",
                     }
                 }
@@ -1770,6 +2913,7 @@ class MixedQueryProcessor(QueryProcessor):
                         if include_chunks
                         else {}
                     ),
+                    **({"embedding": 1} if include_embeddings else {}),
                 }
             }
         )
@@ -1839,12 +2983,105 @@ class MixedQueryProcessor(QueryProcessor):
             logger.error(f"Failed to process relevance check: {e}")
             return None
 
-        return relevant_triples if relevant_triples else None
+        return relevant_triples if relevant_triples else None
+
+    def _local_rerank_settings(self) -> Tuple[float, float]:
+        """Get the minimum score and MMR lambda of the local reranker.
+
+        Bit vectors are indexed by euclidean (hamming) distance, so their
+        search scores and similarities are not cosine ones and triples are
+        ranked by score alone.
+        """
+        if self.settings.mongodb.embedding_storage_format == "bit":
+            return 0.0, 1.0
+        return (
+            self.settings.api.query_rerank_min_score,
+            self.settings.api.query_rerank_mmr_lambda,
+        )
+
+    def _local_relevance_check(
+        self, triples: list[dict[str, Any]]
+    ) -> list[dict[str, Any]] | None:
+        """Select the relevant triples by similarity score, without an LLM.
+
+        Triples are reranked with maximal marginal relevance over their
+        similarity search scores and embeddings, see `mmr_rerank` and
+        `_local_rerank_settings`.
+
+        Parameters
+        ----------
+        triples
+            The similar triples, with their scores and optionally embeddings.
+
+        Returns
+        -------
+        list
+            The relevant triples, without embeddings, if any are found, otherwise None.
+        """
+        min_score, mmr_lambda = self._local_rerank_settings()
+        relevant_triples = mmr_rerank(
+            triples,
+            min_score=min_score,
+            top_k=self.settings.api.query_rerank_top_k,
+            mmr_lambda=mmr_lambda,
+        )
+        logger.info(
+            f"relevance check kept {len(relevant_triples)} of {len(triples)} triples"
+        )
+        for triple in relevant_triples:
+            triple.pop("embedding", None)
+        return relevant_triples if relevant_triples else None
+
+    async def _summarise(
+        self, query: str, triples: list[dict[str, Any]], include_chunks: bool
+    ) -> str | None:
+        """Summarise the relevant triples and the query.
+
+        Parameters
+        ----------
+        query
+            the query that was asked.
+        triples
+            list of triples that are relevant to the query.
+        include_chunks
+            whether to include the associated chunks of text in the summarisation.
+
+        Returns
+        -------
+        str | None
+            An optional concise answer based on the facts and the query if any are found.
+        """
+        triples_str = " ".join(
+            [
+                convert_triple_to_text(t, include_chunks=include_chunks)
+                for t in triples
+            ]
+        )
+        summarisation_prompt = (
+            "Provide a concise answer based on these facts"
+            + (
+                f" and associated chunks of text: {triples_str}. "
+                if include_chunks
+                else f": {triples_str}. "
+            )
+            + f"Question: '{query}'. Answer explicitly, using minimal words and without any additional commentary or prose."
+        )
+
+        response = await self.llm_client.client.chat.completions.create(
+            messages=[{"role": "system", "content": summarisation_prompt}],
+            model="gpt-4o",
+            temperature=0.1,
+            max_tokens=2000,
+        )
+        response_content = response.choices[0].message.content
+        if response_content is None:
+            return None
+        return response_content.strip()
 
-    async def _summarise(
+    async def _summarise_stream(
         self, query: str, triples: list[dict[str, Any]], include_chunks: bool
-    ) -> str | None:
-        """Summarise the relevant triples and the query.
+    ) -> typing.AsyncIterator[str]:
+        """Summarise the relevant triples and the query, streaming tokens.
 
         Parameters
         ----------
@@ -1855,10 +3092,10 @@ class MixedQueryProcessor(QueryProcessor):
         include_chunks
             whether to include the associated chunks of text in the summarisation.
 
-        Returns
-        -------
-        str | None
-            An optional concise answer based on the facts and the query if any are found.
+        Yields
+        ------
+        str
+            The tokens of the answer as they are generated.
         """
         triples_str = " ".join(
             [
@@ -1876,38 +3113,126 @@ class MixedQueryProcessor(QueryProcessor):
             + f"Question: '{query}'. Answer explicitly, using minimal words and without any additional commentary or prose."
         )
 
-        response = await self.llm_client.client.chat.completions.create(
+        stream = await self.llm_client.client.chat.completions.create(
             messages=[{"role": "system", "content": summarisation_prompt}],
             model="gpt-4o",
             temperature=0.1,
             max_tokens=2000,
+            stream=True,
         )
-        response_content = response.choices[0].message.content
-        if response_content is None:
-            return None
-        return response_content.strip()
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _write_query(self, query: QueryDocumentModel) -> None:
+        """Write a query document, logging any error."""
+        # Note: Cannot use `create_one` as query content needs to be set to None
+        #       which is dropped in this function due to `exclude_none=True`.
+        try:
+            await self.db.query.insert_one(query.model_dump(by_alias=True))
+        except Exception as e:
+            logger.error(f"Failed to write query {query.id}: {e}")
 
     async def query(
-        self, request: QueryGraphRequest
+        self,
+        request: QueryGraphRequest,
+        background_tasks: BackgroundTasks | None = None,
     ) -> QueryDocumentModel | None:
         """Perform query.
 
+        Stages that do not depend on each other run concurrently: the query
+        is embedded while the schema, the graph version and the filtered
+        triples are retrieved. The query document is written once the query
+        is answered or has failed, in `background_tasks` if given, so that
+        the write does not delay the response.
+
         Parameters
         ----------
         request
             The query request.
+        background_tasks
+            The background tasks to write the query document in.
 
         Returns
         -------
         QueryDocumentModel | None
             An optional query document model.
+        """
+        query_model = None
+        async for event, data in self._run_query(
+            request, stream_answer=False, background_tasks=background_tasks
+        ):
+            if event == "done":
+                query_model = data
+        return query_model
 
-        Raises
-        ------
-        ValueError
-            If the query creation fails for any reason.
+    def stream_query(
+        self, request: QueryGraphRequest
+    ) -> typing.AsyncIterator[QueryEvent]:
+        """Perform query, streaming its results as they are retrieved.
+
+        Yields a `triples` event with the relevant triples and their nodes
+        as soon as they are retrieved, then a `token` event per token of the
+        answer as it is generated, then a `done` event with the query
+        document. The query document is written when the stream closes,
+        as `failed` if it is closed before the query is answered.
+
+        Parameters
+        ----------
+        request
+            The query request.
+
+        Returns
+        -------
+        AsyncIterator[QueryEvent]
+            The events of the query, as `(event, data)` tuples.
         """
+        return self._run_query(request, stream_answer=True)
+
+    async def _run_query(
+        self,
+        request: QueryGraphRequest,
+        stream_answer: bool,
+        background_tasks: BackgroundTasks | None = None,
+    ) -> typing.AsyncIterator[QueryEvent]:
+        """Perform query, yielding its events.
+
+        The answer is yielded as `token` events if `stream_answer` is set,
+        and only as part of the query document otherwise.
+        """
+        timer = StageTimer()
+        query = request.query
+        return_answer = request.return_answer
+        include_chunks = request.include_chunks
+        reranker = request.reranker or self.settings.api.query_reranker
+        query_model = QueryDocumentModel(
+            id=ObjectId(),
+            created_by=str(self.user_id),
+            query=QueryParameters(
+                content=query,
+                return_answer=return_answer,
+                include_chunks=include_chunks,
+                reranker=reranker if query is not None else None,
+                values=request.values if request.values else [],
+                entities=request.entities or [],
+                relations=request.relations or [],
+            ),
+            graph=self.graph_id,
+            status="pending",
+        )
+
+        # Read the graph version, and embed the query unless it is looked up
+        # in the cache first, while the schema is read
+        embedding: asyncio.Future[list[float]] | None = None
+        version: asyncio.Future[int] | None = None
         try:
+            if query is not None and (
+                self.query_cache is None or self.query_cache.similarity_enabled
+            ):
+                embedding = asyncio.ensure_future(self._embed_query(query))
+            if self.query_cache is not None:
+                version = asyncio.ensure_future(self._graph_version())
+
             # Check whether the user has explicitly sent filters
             entities = request.entities
             relations = request.relations
@@ -1915,18 +3240,18 @@ class MixedQueryProcessor(QueryProcessor):
             if entities is None or relations is None:
                 logger.info("Retrieving entities and relations from schema")
                 # These have not been provided, so get them from the associated schema
-                entities, relations = (
-                    await self._retrieve_entities_and_relation_types(
-                        entities=entities, relations=relations
+                with timer.stage("schema"):
+                    entities, relations = (
+                        await self._retrieve_entities_and_relation_types(
+                            entities=entities, relations=relations
+                        )
                     )
-                )
             logger.info(
                 f"Using entities: {entities}, relations: {relations}, values: {request.values} for query."
             )
+            query_model.query.entities = entities
+            query_model.query.relations = relations
 
-            query = request.query
-            return_answer = request.return_answer
-            include_chunks = request.include_chunks
             response = (
                 "Unfortunately, we couldn’t find an answer this time. Feel free to ask another question or provide additional context!"
                 if return_answer
@@ -1934,142 +3259,243 @@ class MixedQueryProcessor(QueryProcessor):
             )
             output_triples: list[TripleWithId] = []
             output_nodes: list[NodeWithId] = []
+            triples_sent = False
+            answer_streamed = False
+
+            # Answers are cached per graph version and query parameters
+            cache_parameters = {
+                "query": query,
+                "entities": sorted(entities),
+                "relations": sorted(relations),
+                "values": sorted(request.values or []),
+                "include_chunks": include_chunks,
+                "return_answer": return_answer,
+                "reranker": query_model.query.reranker,
+            }
+            graph_version = 0
+            query_vector = None
+            cached = None
+            if self.query_cache is not None and version is not None:
+                with timer.stage("cache"):
+                    graph_version = await version
+                    if (
+                        embedding is not None
+                        and self.query_cache.similarity_enabled
+                    ):
+                        query_vector = await embedding
+                    cached = await self.query_cache.get(
+                        graph_id=self.graph_id,
+                        version=graph_version,
+                        user_id=self.user_id,
+                        parameters=cache_parameters,
+                        embedding=query_vector,
+                    )
 
-            # Prepare the query document model
-            query_model = QueryDocumentModel(
-                id=ObjectId(),
-                created_by=str(self.user_id),
-                query=QueryParameters(
-                    content=query,
-                    return_answer=return_answer,
-                    include_chunks=include_chunks,
-                    values=request.values if request.values else [],
-                    entities=entities,
-                    relations=relations,
-                ),
-                graph=self.graph_id,
-                status="pending",
-            )
-
-            # Create query document in the database
-            # Note: Cannot use `create_one` as query content needs to be set to None
-            #       which is dropped in this function due to `exclude_none=True`.
-            db_created_query = await self.db.query.insert_one(
-                query_model.model_dump(by_alias=True)
-            )
-            db_query = await self.db.query.find_one(
-                {
-                    "_id": db_created_query.inserted_id,
-                    "graph": self.graph_id,
-                    "created_by": self.user_id,
-                }
-            )
-            if db_query is None:
-                raise ValueError("Failed to create query")
-            created_query = QueryDocumentModel(**db_query)
-
-            logger.info(f"created query: {created_query.id}")
-
-            node_ids, triple_ids = (
-                await self._retrieve_filtered_triple_and_node_ids(
-                    entities=entities,
-                    relations=relations,
-                    values=request.values,
-                )
-            )
-
-            logger.info(
-                f"node_ids: {len(node_ids)}, triple_ids: {len(triple_ids)}"
-            )
-
-            if query is None:
-                output_nodes, output_triples = await self._retrieve_triples(
-                    triple_ids=triple_ids
-                )
+            if cached is not None:
+                logger.info("Serving cached query answer")
+                response = cached["response"]
+                output_triples = [TripleWithId(**t) for t in cached["triples"]]
+                output_nodes = [NodeWithId(**n) for n in cached["nodes"]]
             else:
-                # Perform semantic search
-                similar_triples = await self._sim_search(
-                    query=query,
-                    include_chunks=include_chunks,
-                    triple_ids=triple_ids,
-                )
-
-                if similar_triples:
-                    logger.info(
-                        f"similar triples found: {len(similar_triples)}"
+                if query is not None and embedding is None:
+                    embedding = asyncio.ensure_future(self._embed_query(query))
+
+                with timer.stage("filter"):
+                    triple_filter = await self._plan_triple_filter(
+                        entities=entities,
+                        relations=relations,
+                        values=request.values,
                     )
 
-                    # Perform relevance check
-                    relevant_triples = await self._relevance_check(
-                        query=query,
-                        triples=similar_triples,
-                    )
-                    if relevant_triples:
-                        logger.info(
-                            f"relevant triples found: {len(relevant_triples)}"
+                if query is None:
+                    if triple_filter is not None:
+                        with timer.stage("triples"):
+                            output_nodes, output_triples = (
+                                await self._retrieve_triples(
+                                    triple_filter=triple_filter
+                                )
+                            )
+                else:
+                    # Embedded while the triples were filtered
+                    if embedding is not None:
+                        with timer.stage("embedding"):
+                            query_vector = await embedding
+
+                    # Perform semantic search
+                    with timer.stage("search"):
+                        similar_triples = await self._sim_search(
+                            query=query,
+                            include_chunks=include_chunks,
+                            # Filters matching no triples search the graph
+                            triple_filter=triple_filter or {},
+                            query_vector=query_vector,
+                            include_embeddings=(
+                                reranker == "local"
+                                and self._local_rerank_settings()[1] < 1
+                            ),
                         )
 
-                        if return_answer:
+                    if similar_triples:
+                        logger.info(
+                            f"similar triples found: {len(similar_triples)}"
+                        )
 
-                            # Summarise the relevant triples
-                            summary = await self._summarise(
-                                query=query,
-                                triples=relevant_triples,
-                                include_chunks=include_chunks,
+                        # Perform relevance check
+                        with timer.stage("rerank"):
+                            if reranker == "llm":
+                                relevant_triples = await self._relevance_check(
+                                    query=query,
+                                    triples=similar_triples,
+                                )
+                            else:
+                                relevant_triples = self._local_relevance_check(
+                                    triples=similar_triples
+                                )
+                        if relevant_triples:
+                            logger.info(
+                                f"relevant triples found: {len(relevant_triples)}"
                             )
 
-                            if summary is not None:
-                                response = summary
+                            # Populate the triples and nodes for query creation
+                            with timer.stage("triples"):
+                                output_triples = await list_triples_by_ids(
+                                    db=self.db,
+                                    user_id=self.user_id,
+                                    graph_id=self.graph_id,
+                                    triple_ids=[
+                                        t["_id"] for t in relevant_triples
+                                    ],
+                                )
+                            output_nodes = []
+                            output_node_ids = set()
+                            for triple in output_triples:
+                                head_node = triple.head_node
+                                tail_node = triple.tail_node
+
+                                if head_node.id not in output_node_ids:
+                                    output_nodes.append(head_node)
+                                    output_node_ids.add(head_node.id)
+
+                                if tail_node.id not in output_node_ids:
+                                    output_nodes.append(tail_node)
+                                    output_node_ids.add(tail_node.id)
+
+                            # Sent before the answer is generated
+                            yield "triples", {
+                                "triples": output_triples,
+                                "nodes": output_nodes,
+                            }
+                            triples_sent = True
+
+                            if return_answer:
+
+                                # Summarise the relevant triples
+                                if stream_answer:
+                                    tokens = []
+                                    with timer.stage("answer"):
+                                        async for (
+                                            token
+                                        ) in self._summarise_stream(
+                                            query=query,
+                                            triples=relevant_triples,
+                                            include_chunks=include_chunks,
+                                        ):
+                                            tokens.append(token)
+                                            yield "token", token
+                                    summary = "".join(tokens).strip() or None
+                                else:
+                                    with timer.stage("answer"):
+                                        summary = await self._summarise(
+                                            query=query,
+                                            triples=relevant_triples,
+                                            include_chunks=include_chunks,
+                                        )
+
+                                if summary is not None:
+                                    response = summary
+                                    answer_streamed = stream_answer
+
+                # Queries without an answer are not cached, to be retried
+                if self.query_cache is not None and output_triples:
+                    await self.query_cache.set(
+                        graph_id=self.graph_id,
+                        version=graph_version,
+                        user_id=self.user_id,
+                        parameters=cache_parameters,
+                        result={
+                            "response": response,
+                            "triples": [
+                                t.model_dump(by_alias=True)
+                                for t in output_triples
+                            ],
+                            "nodes": [
+                                n.model_dump(by_alias=True)
+                                for n in output_nodes
+                            ],
+                        },
+                        embedding=(
+                            query_vector
+                            if self.query_cache.similarity_enabled
+                            else None
+                        ),
+                    )
 
-                        # Populate the triples and nodes for query creation
-                        output_triples = await list_triples_by_ids(
-                            db=self.db,
-                            user_id=self.user_id,
-                            graph_id=self.graph_id,
-                            triple_ids=[t["_id"] for t in relevant_triples],
-                        )
-                        output_nodes = []
-                        output_node_ids = set()
-                        for triple in output_triples:
-                            head_node = triple.head_node
-                            tail_node = triple.tail_node
-
-                            if head_node.id not in output_node_ids:
-                                output_nodes.append(head_node)
-                                output_node_ids.add(head_node.id)
-
-                            if tail_node.id not in output_node_ids:
-                                output_nodes.append(tail_node)
-                                output_node_ids.add(tail_node.id)
-
-            # Prepare the query document model
-            created_query.status = "success"
-            created_query.response = response
-            created_query.triples = output_triples
-            created_query.nodes = output_nodes
-
-            await self.db.query.update_one(
-                {"_id": ObjectId(created_query.id)},
-                {"$set": created_query.model_dump(by_alias=True)},
-            )
+            if not triples_sent:
+                yield "triples", {
+                    "triples": output_triples,
+                    "nodes": output_nodes,
+                }
+            # Answers not generated, e.g. cached ones, are streamed whole
+            if stream_answer and response is not None and not answer_streamed:
+                yield "token", response
 
-            if created_query is None or created_query.id is None:
-                raise ValueError("Failed to create query")
-            return created_query
+            query_model.status = "success"
+            query_model.response = response
+            query_model.triples = output_triples
+            query_model.nodes = output_nodes
+            query_model.timings = timer.total()
+            yield "done", query_model
 
         except Exception as e:
             logger.error(f"Failed to perform query: {e}", exc_info=True)
-            created_query = QueryDocumentModel.model_validate(created_query)
-            await self.db.query.update_one(
-                {"_id": ObjectId(created_query.id)},
-                {
-                    "$set": {
-                        "status": "failed",
-                    }
-                },
-            )
+            query_model.status = "failed"
+            raise
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # The stream was closed before the query was answered
+            if query_model.status == "pending":
+                query_model.status = "failed"
             raise
 
+        finally:
+            # Cancel stages left unused, e.g. the embedding of a cached query
+            tasks = [task for task in (embedding, version) if task is not None]
+            for task in tasks:
+                task.cancel()
+            if query_model.status != "success":
+                query_model.timings = timer.total()
+            # Shielded, as a closed stream cancels the awaits of its request
+            closing = asyncio.ensure_future(
+                self._close_query(tasks, query_model, background_tasks)
+            )
+            _closing_queries.add(closing)
+            closing.add_done_callback(_closing_queries.discard)
+            await asyncio.shield(closing)
+
+    async def _close_query(
+        self,
+        tasks: list[asyncio.Future[Any]],
+        query: QueryDocumentModel,
+        background_tasks: BackgroundTasks | None,
+    ) -> None:
+        """Wait for the cancelled stages of a query and write it."""
+        # Retrieve the errors of the stages not awaited
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if background_tasks is None:
+            await self._write_query(query)
+        else:
+            background_tasks.add_task(self._write_query, query)
+
 
 async def merge_nodes(
     db: AsyncIOMotorDatabase,
@@ -2077,10 +3503,14 @@ async def merge_nodes(
     user_id: ObjectId,
     from_nodes: List[ObjectId],
     to_node: ObjectId,
+    llm_client: LLMClient | None = None,
+    background_tasks: BackgroundTasks | None = None,
 ) -> NodeWithId:
     """Merge nodes.
 
-    Merge two nodes in the graph.
+    Merge two nodes in the graph. The triples of the merged node are marked
+    as stale and, given an LLM client, re-embedded in `background_tasks` or
+    before returning if none are given.
 
     Parameters
     ----------
@@ -2092,6 +3522,10 @@ async def merge_nodes(
         The IDs of the nodes to merge.
     to_node : ObjectId
         The ID of the node to merge to.
+    llm_client : LLMClient, optional
+        The LLM client to re-embed the triples of the merged node with.
+    background_tasks : BackgroundTasks, optional
+        The background tasks to re-embed the triples in.
 
     Returns
     -------
@@ -2163,9 +3597,28 @@ async def merge_nodes(
                 session=session,
             )
 
+            # The triples now point to the merged node
+            stale_count = await mark_triples_stale(
+                db=db, user_id=user_id, node_ids=[to_node], session=session
+            )
+
             # Commit the transaction
             await session.commit_transaction()
 
+    await bump_graph_version(db, {"_id": graph_id})
+    if stale_count and llm_client is not None:
+        reembed = functools.partial(
+            reembed_stale_triples,
+            db=db,
+            llm_client=llm_client,
+            user_id=user_id,
+            node_ids=[to_node],
+        )
+        if background_tasks is None:
+            await reembed()
+        else:
+            background_tasks.add_task(reembed)
+
     merged_node = await db.node.find_one(
         {"_id": to_node, "graph": graph_id, "created_by": user_id}
     )
@@ -2763,48 +4216,18 @@ async def extend_schema(
     )
 
 
-async def create_or_update_graph_from_triples(
-    background_tasks: BackgroundTasks,
-    triples: list[Triple],
+async def prepare_graph_triples(
     db: AsyncIOMotorDatabase,
-    db_client: AsyncIOMotorClient,
+    triples: list[Triple],
+    graph_id: ObjectId,
     user_id: ObjectId,
-    llm_client: LLMClient,
-    graph_name: str | None = None,
-    graph_id: ObjectId | None = None,
-    workspace_id: ObjectId | None = None,
-    schema_id: ObjectId | None = None,
     strict_mode: bool = True,
-) -> TaskDocumentModel:
-    """Create or update a graph from triples.
+) -> list[Triple]:
+    """Prepare triples to be added to a graph.
 
-    Either populates an existing graph or creates a new graph and populates with triples.
+    Validates the triples against the graph schema, creating the schema from
+    the triples if the graph has none, and applies the workspace rules.
     """
-    # Check that workspace exists for the user
-    if workspace_id:
-        workspace_exists = await db.workspace.find_one(
-            {"_id": workspace_id, "created_by": user_id}
-        )
-        if workspace_exists is None:
-            raise NotFoundException("Workspace not found.")
-
-    if graph_id is None:
-        if workspace_id is None:
-            raise ValueError("No graph provided and no workspace provided.")
-
-        if graph_name is None:
-            raise ValueError("No graph provided and no graph name provided.")
-
-        logger.info(f'Creating base graph "{graph_name}"')
-        graph = await create_base_graph(
-            name=graph_name,
-            user_id=user_id,
-            workspace_id=workspace_id,
-            schema_id=schema_id,
-            db=db,
-        )
-        graph_id = ObjectId(graph.id) if graph.id else None
-
     # Get graph details
     db_graph = await db.graph.find_one(
         {"_id": graph_id, "created_by": user_id},
@@ -2867,10 +4290,63 @@ async def create_or_update_graph_from_triples(
         db=db,
         extracted_triples=triples,
         workspace_id=db_workspace_id,
-        graph_id=graph_id,  # type: ignore
+        graph_id=graph_id,
         user_id=user_id,
         errors=[],
     )
+    return updated_triples
+
+
+async def create_or_update_graph_from_triples(
+    background_tasks: BackgroundTasks,
+    triples: list[Triple],
+    db: AsyncIOMotorDatabase,
+    db_client: AsyncIOMotorClient,
+    user_id: ObjectId,
+    llm_client: LLMClient,
+    settings: Settings,
+    graph_name: str | None = None,
+    graph_id: ObjectId | None = None,
+    workspace_id: ObjectId | None = None,
+    schema_id: ObjectId | None = None,
+    strict_mode: bool = True,
+) -> TaskDocumentModel:
+    """Create or update a graph from triples.
+
+    Either populates an existing graph or creates a new graph and populates with triples.
+    """
+    # Check that workspace exists for the user
+    if workspace_id:
+        workspace_exists = await db.workspace.find_one(
+            {"_id": workspace_id, "created_by": user_id}
+        )
+        if workspace_exists is None:
+            raise NotFoundException("Workspace not found.")
+
+    if graph_id is None:
+        if workspace_id is None:
+            raise ValueError("No graph provided and no workspace provided.")
+
+        if graph_name is None:
+            raise ValueError("No graph provided and no graph name provided.")
+
+        logger.info(f'Creating base graph "{graph_name}"')
+        graph = await create_base_graph(
+            name=graph_name,
+            user_id=user_id,
+            workspace_id=workspace_id,
+            schema_id=schema_id,
+            db=db,
+        )
+        graph_id = ObjectId(graph.id) if graph.id else None
+
+    updated_triples = await prepare_graph_triples(
+        db=db,
+        triples=triples,
+        graph_id=graph_id,  # type: ignore
+        user_id=user_id,
+        strict_mode=strict_mode,
+    )
 
     task = await create_task(
         _db=db,
@@ -2883,6 +4359,83 @@ async def create_or_update_graph_from_triples(
         graph_id=graph_id,
         user_id=user_id,
         triples=updated_triples,
+        settings=settings,
+    )
+
+    return task
+
+
+async def create_or_update_graph_from_triple_stream(
+    background_tasks: BackgroundTasks,
+    batches: typing.AsyncIterator[list[TripleCreate]],
+    db: AsyncIOMotorDatabase,
+    db_client: AsyncIOMotorClient,
+    user_id: ObjectId,
+    llm_client: LLMClient,
+    settings: Settings,
+    graph_id: ObjectId,
+    strict_mode: bool = True,
+) -> TaskDocumentModel:
+    """Populate a graph from a stream of triple batches.
+
+    Each batch is resolved, validated and queued to a `StreamingGraphBuild`
+    while the next batch is received, so the stream is never held in memory.
+    Returns once every batch is written; the triples are embedded and the
+    graph marked as ready by a background task.
+
+    If the graph has no schema, one is created from the first batch and
+    extended by the following batches.
+    """
+    db_graph = await db.graph.find_one(
+        {"_id": graph_id, "created_by": user_id}, {"schema_id": 1}
+    )
+    if db_graph is None:
+        raise NotFoundException("Graph not found.")
+    schema_from_triples = db_graph.get("schema_id") is None
+
+    task = TaskDocumentModel(created_by=user_id, status="pending")
+    result = await db.task.insert_one(
+        task.model_dump(by_alias=True, exclude_none=True)
+    )
+    task.id = ObjectId(result.inserted_id)
+
+    await update_one(
+        collection=db["graph"],
+        document_model=GraphDocumentModel,
+        id=graph_id,
+        document=GraphStateErrorsUpdate(status="updating"),
+        user_id=user_id,
+    )
+
+    build = StreamingGraphBuild(
+        db=db,
+        db_client=db_client,
+        llm_client=llm_client,
+        graph_id=graph_id,
+        user_id=user_id,
+        settings=settings,
+        task_id=task.id,
     )
+    build.start()
+    try:
+        async for batch in batches:
+            triples = await resolve_triples(
+                db=db, triples=batch, graph_id=graph_id, user_id=user_id
+            )
+            triples = await prepare_graph_triples(
+                db=db,
+                triples=triples,
+                graph_id=graph_id,
+                user_id=user_id,
+                strict_mode=strict_mode,
+            )
+            if schema_from_triples:
+                strict_mode = False
+            await build.put(triples)
+        await build.close()
+    except Exception as e:
+        await build.fail(e)
+        raise
 
+    background_tasks.add_task(build.finish)
     return task
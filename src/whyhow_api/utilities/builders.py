@@ -11,9 +11,9 @@ from typing import Any, List, Optional, Tuple
 
 # import backoff
 # import openai
-import logfire
 import spacy
 import spacy.cli
+from openai import APIStatusError
 from openai.types.chat import ChatCompletion
 
 from whyhow_api.dependencies import LLMClient
@@ -31,10 +31,13 @@ from whyhow_api.models.common import (
 from whyhow_api.schemas.base import ErrorDetails
 from whyhow_api.schemas.chunks import ChunkDocumentModel
 from whyhow_api.schemas.schemas import GeneratedSchema
+from whyhow_api.utilities.completion_cache import CompletionCache
 from whyhow_api.utilities.config import (
+    create_multi_pattern_graph_prompt,
     create_schema_guided_graph_prompt,
     create_zeroshot_graph_prompt,
 )
+from whyhow_api.utilities.rate_limiter import RateLimiter, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -113,6 +116,17 @@ class SpacyEntityExtractor(TextEntityExtractor):
         return TextWithEntities(text=text, entities=entities)
 
 
+def group_patterns(
+    patterns: List[SchemaTriplePattern], group_size: int
+) -> List[List[SchemaTriplePattern]]:
+    """Split patterns into groups of at most `group_size` patterns."""
+    group_size = max(group_size, 1)
+    return [
+        patterns[i : i + group_size]
+        for i in range(0, len(patterns), group_size)
+    ]
+
+
 class OpenAIBuilder:
     """OpenAI API builder."""
 
@@ -124,54 +138,73 @@ class OpenAIBuilder:
         self.llm_client = llm_client
         self.seed_entity_extractor = seed_entity_extractor()
 
-    # @backoff.on_exception(
-    #     backoff.expo, openai.RateLimitError, max_time=60, max_tries=5
-    # )
     @staticmethod
-    async def fetch_triples(
+    async def fetch_json_completion(
         llm_client: LLMClient,
-        chunk: ChunkDocumentModel,
-        pattern: SchemaTriplePattern,
+        prompt: str,
         completions_config: OpenAICompletionsConfig,
-        # **kwargs,
-    ) -> List[Triple] | None:
-        """Fetch triples based on a schema pattern using the OpenAI API."""
-        _content_str = create_schema_guided_graph_prompt(
-            text=chunk.content, pattern=pattern
-        )
+        cache: CompletionCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ) -> Any | None:
+        """Fetch a completion and parse its content as JSON.
 
-        # Logfire trace of LLM client
-        logfire.instrument_openai(llm_client.client)
+        If a `cache` is provided, identical requests are served from it. Only
+        completions that parse are cached. If a `rate_limiter` is provided,
+        requests not served from the cache wait for it, and it is reconciled
+        with the rate limit headers of the response.
 
-        response = None
-        try:
-            if llm_client.metadata.language_model_name:
-                completions_config.model = (
-                    llm_client.metadata.language_model_name
-                )
-            response = await llm_client.client.chat.completions.create(
-                messages=[{"role": "system", "content": _content_str}],
-                **completions_config.model_dump(),
-                # **kwargs,
-            )
-        except Exception as e:
-            logger.error(f"Failed to fetch triple: {e}")
+        Returns
+        -------
+        Any | None
+            The parsed content, an empty list if it could not be parsed,
+            or None if the request failed.
+        """
+        if llm_client.metadata.language_model_name:
+            completions_config.model = llm_client.metadata.language_model_name
+        request = {
+            "messages": [{"role": "system", "content": prompt}],
+            **completions_config.model_dump(),
+        }
 
-        if response is not None:
-            message_content = response.choices[0].message.content
-        else:
-            return None
+        message_content = (
+            await cache.get(request) if cache is not None else None
+        )
+        is_cached = message_content is not None
+        if message_content is None:
+            if rate_limiter is not None:
+                await rate_limiter.wait(estimate_tokens(prompt))
+            response = None
+            try:
+                raw_response = await llm_client.client.chat.completions.with_raw_response.create(
+                    **request,
+                )
+                if rate_limiter is not None:
+                    rate_limiter.update_from_headers(raw_response.headers)
+                response = raw_response.parse()
+            except Exception as e:
+                if isinstance(e, APIStatusError) and rate_limiter is not None:
+                    rate_limiter.update_from_headers(e.response.headers)
+                logger.error(f"Failed to fetch triple: {e}")
+
+            if response is not None:
+                message_content = response.choices[0].message.content
+            else:
+                return None
 
-        res_entities = []
         try:
-            response_text = response.choices[0].message.content.strip()
+            response_text = message_content.strip()
 
             if response_text.startswith("```") and response_text.endswith(
                 "```"
             ):
                 response_text = response_text[7:-3].strip()
 
-            res_entities = json.loads(response_text)
+            content = json.loads(response_text)
+
+            if cache is not None and not is_cached:
+                await cache.set(request, message_content)
+
+            return content
 
         except JSONDecodeError as je:
             logger.error(
@@ -179,23 +212,115 @@ class OpenAIBuilder:
             )
         except Exception as e:
             logger.error(f"Unexpected error parsing message content: {e}")
+        return []
 
-        if isinstance(res_entities, list):
-            triples = []
-            for entities in res_entities:
-                head, tail = entities
-                triples.append(
-                    Triple(
-                        head=head,
-                        head_type=pattern.head.name,
-                        head_properties={"chunks": [chunk.id]},
-                        relation=pattern.relation.name,
-                        relation_properties={"chunks": [chunk.id]},
-                        tail=tail,
-                        tail_type=pattern.tail.name,
-                        tail_properties={"chunks": [chunk.id]},
-                    )
+    @staticmethod
+    def pattern_pairs_to_triples(
+        pairs: Any,
+        chunk: ChunkDocumentModel,
+        pattern: SchemaTriplePattern,
+    ) -> List[Triple]:
+        """Convert extracted [head, tail] pairs of a pattern to triples.
+
+        Pairs that are not two strings are skipped.
+        """
+        if not isinstance(pairs, list):
+            return []
+
+        triples = []
+        for pair in pairs:
+            if not (
+                isinstance(pair, list)
+                and len(pair) == 2
+                and all(isinstance(e, str) for e in pair)
+            ):
+                logger.warning(f"Skipping malformed pair: {pair}")
+                continue
+            head, tail = pair
+            triples.append(
+                Triple(
+                    head=head,
+                    head_type=pattern.head.name,
+                    head_properties={"chunks": [chunk.id]},
+                    relation=pattern.relation.name,
+                    relation_properties={"chunks": [chunk.id]},
+                    tail=tail,
+                    tail_type=pattern.tail.name,
+                    tail_properties={"chunks": [chunk.id]},
                 )
+            )
+        return triples
+
+    # @backoff.on_exception(
+    #     backoff.expo, openai.RateLimitError, max_time=60, max_tries=5
+    # )
+    @staticmethod
+    async def fetch_triples(
+        llm_client: LLMClient,
+        chunk: ChunkDocumentModel,
+        pattern: SchemaTriplePattern,
+        completions_config: OpenAICompletionsConfig,
+        cache: CompletionCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ) -> List[Triple] | None:
+        """Fetch triples based on a schema pattern using the OpenAI API.
+
+        If a `cache` is provided, identical requests are served from it.
+        """
+        content = await OpenAIBuilder.fetch_json_completion(
+            llm_client=llm_client,
+            prompt=create_schema_guided_graph_prompt(
+                text=chunk.content, pattern=pattern
+            ),
+            completions_config=completions_config,
+            cache=cache,
+            rate_limiter=rate_limiter,
+        )
+        if content is None:
+            return None
+        return OpenAIBuilder.pattern_pairs_to_triples(content, chunk, pattern)
+
+    @staticmethod
+    async def fetch_grouped_triples(
+        llm_client: LLMClient,
+        chunk: ChunkDocumentModel,
+        patterns: List[SchemaTriplePattern],
+        completions_config: OpenAICompletionsConfig,
+        cache: CompletionCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ) -> List[Triple] | None:
+        """Fetch triples of several schema patterns with a single request.
+
+        The chunk is sent once with all `patterns`, and the pairs are returned
+        keyed by pattern number. Unknown pattern numbers are ignored.
+
+        If a `cache` is provided, identical requests are served from it.
+        """
+        content = await OpenAIBuilder.fetch_json_completion(
+            llm_client=llm_client,
+            prompt=create_multi_pattern_graph_prompt(
+                text=chunk.content, patterns=patterns
+            ),
+            completions_config=completions_config,
+            cache=cache,
+            rate_limiter=rate_limiter,
+        )
+        if content is None:
+            return None
+        if not isinstance(content, dict):
+            logger.error(f"Expected pairs keyed by pattern, got: {content}")
+            return []
+
+        triples = []
+        for key, pairs in content.items():
+            try:
+                pattern = patterns[int(key)]
+            except (ValueError, IndexError):
+                logger.warning(f"Skipping unknown pattern: {key}")
+                continue
+            triples.extend(
+                OpenAIBuilder.pattern_pairs_to_triples(pairs, chunk, pattern)
+            )
         return triples
 
     @staticmethod
@@ -241,9 +366,6 @@ class OpenAIBuilder:
         completions_config: OpenAICompletionsConfig,
     ) -> List[Triple] | None:
         """Extract triples using zero-shot prompts."""
-        # Logfire trace of LLM client
-        logfire.instrument_openai(llm_client.client)
-
         if llm_client.metadata.language_model_name:
             completions_config.model = llm_client.metadata.language_model_name
         extract_triples_response = (
@@ -270,11 +392,16 @@ class OpenAIBuilder:
         chunk: ChunkDocumentModel,
         completions_config: OpenAICompletionsConfig,
         patterns: List[SchemaTriplePattern],
+        cache: CompletionCache | None = None,
+        pattern_group_size: int = 1,
+        rate_limiter: RateLimiter | None = None,
     ) -> Optional[list[Triple]]:
         """
         Extract triples.
 
         Extracts triples from a text chunk using patterns, processing them in parallel.
+        Patterns are sent in groups of `pattern_group_size` per request, so the
+        chunk text is sent once per group instead of once per pattern.
 
         Parameters
         ----------
@@ -287,6 +414,14 @@ class OpenAIBuilder:
         patterns : List[SchemaTriplePattern] | None, optional
             A list of schema triple patterns for guided triple
             extraction, defaults to None.
+        cache : CompletionCache | None, optional
+            A cache of completions to serve identical requests from,
+            defaults to None.
+        pattern_group_size : int, optional
+            The number of patterns extracted per request, defaults to 1.
+        rate_limiter : RateLimiter | None, optional
+            A rate limiter to reconcile with the response rate limit headers,
+            defaults to None.
 
         Returns
         -------
@@ -301,26 +436,31 @@ class OpenAIBuilder:
             that the necessary parameters for extraction are missing.
         """
         try:
-
-            # Logfire trace of LLM client
-            logfire.instrument_openai(llm_client.client)
-
             task_list = []
 
-            if patterns:
-                task_source: List[SchemaTriplePattern] = patterns
-                extractor = OpenAIBuilder.fetch_triples
-            else:
+            if not patterns:
                 raise ValueError("Patterns must be provided for extraction")
 
             # Generate tasks
-            for item in task_source:
-                task = extractor(
-                    llm_client,
-                    chunk,
-                    item,
-                    completions_config,
-                )
+            for group in group_patterns(patterns, pattern_group_size):
+                if len(group) == 1:
+                    task = OpenAIBuilder.fetch_triples(
+                        llm_client,
+                        chunk,
+                        group[0],
+                        completions_config,
+                        cache,
+                        rate_limiter,
+                    )
+                else:
+                    task = OpenAIBuilder.fetch_grouped_triples(
+                        llm_client,
+                        chunk,
+                        group,
+                        completions_config,
+                        cache,
+                        rate_limiter,
+                    )
                 task_list.append(task)
 
             # Gather tasks and aggregate results
@@ -587,7 +727,6 @@ class OpenAIBuilder:
         """
         try:
             service_start_time = time.time()
-            logfire.instrument_openai(llm_client.client)
             errors: list[ErrorDetails] = []
 
             async def execute_prompt(
@@ -3,9 +3,8 @@
 import logging
 import string
 from collections import defaultdict
-from typing import Any, DefaultDict, Dict, List, Set, Tuple
+from typing import Any, DefaultDict, Dict, Iterable, List, Set, Tuple
 
-import logfire
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
@@ -13,37 +12,57 @@ from whyhow_api.exceptions import NotFoundException
 from whyhow_api.models.common import LLMClient
 from whyhow_api.schemas.base import AfterAnnotatedObjectId
 from whyhow_api.schemas.graphs import Triple
+from whyhow_api.utilities.embedding_batcher import EmbeddingBatcher
 
 logger = logging.getLogger(__name__)
 
 
 async def embed_texts(
-    llm_client: LLMClient, texts: list[str], batch_size: int = 2048
+    llm_client: LLMClient,
+    texts: list[str],
+    batch_size: int = 2048,
+    dimensions: int = 1536,
 ) -> List[Any]:
-    """Embed a list of texts using the OpenAI API."""
-    # Logfire trace of LLM client
-    logfire.instrument_openai(llm_client.client)
-
-    all_embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i : i + batch_size]
-        logger.info(f"Processing batch from {i} to {i + batch_size}")
-
-        if len(batch) > 2048:
-            raise RuntimeError("Texts must be 2048 items or less.")
-
-        # Get embeddings for the batch of texts
-        response = await llm_client.client.embeddings.create(
-            input=batch,
-            model=(
-                llm_client.metadata.embedding_name
-                if llm_client.metadata.embedding_name
-                else "text-embedding-3-small"
-            ),
-            dimensions=1536,
+    """Embed a list of texts using the OpenAI API.
+
+    If the LLM client has an embedding cache, only the texts missing from
+    it are sent to the API, and their embeddings are then cached. Requests
+    are packed and sent concurrently by the LLM client's embedding batcher,
+    or one batch at a time if it has none.
+    """
+    model = (
+        llm_client.metadata.embedding_name
+        if llm_client.metadata.embedding_name
+        else "text-embedding-3-small"
+    )
+    cache = llm_client.embedding_cache
+    all_embeddings: List[Any] = (
+        [None] * len(texts)
+        if cache is None
+        else await cache.get_many(model, dimensions, texts)
+    )
+    missing = [i for i, e in enumerate(all_embeddings) if e is None]
+    if cache is not None:
+        logger.info(
+            f"Embedding cache hits: {len(texts) - len(missing)}, misses: {len(missing)}"
+        )
+
+    missing_texts = [texts[i] for i in missing]
+    batcher = llm_client.embedding_batcher or EmbeddingBatcher()
+    missing_embeddings = await batcher.embed(
+        client=llm_client.client,
+        texts=missing_texts,
+        model=model,
+        dimensions=dimensions,
+        batch_size=batch_size,
+    )
+
+    for i, embedding in zip(missing, missing_embeddings):
+        all_embeddings[i] = embedding
+    if cache is not None and missing_texts:
+        await cache.set_many(
+            model, dimensions, missing_texts, missing_embeddings
         )
-        batch_embeddings = [d.embedding for d in response.data]
-        all_embeddings.extend(batch_embeddings)
 
     logger.info(f"Finished processing {len(texts)} texts.")
     return all_embeddings
@@ -287,21 +306,108 @@ async def check_existing(
     casted_ids: list[AfterAnnotatedObjectId] = []
 
     if ids:
-        # Convert the IDs to a list of ObjectIds
-        try:
-            casted_ids = [ObjectId(id_) for id_ in ids]
-        except Exception as e:
-            raise NotFoundException(
-                f"Invalid {collection.capitalize()} ID: {str(e)}"
-            )
+        casted_ids = cast_object_ids(collection, ids)
+        found_ids = await find_existing_ids(
+            db, collection, casted_ids, additional_query
+        )
+        check_existing_in(collection, casted_ids, found_ids)
+
+    return casted_ids
+
+
+def cast_object_ids(
+    collection: str, ids: Iterable[Any]
+) -> list[AfterAnnotatedObjectId]:
+    """
+    Cast the provided IDs to ObjectIds.
 
-        # Get the list of IDs that do not exist in the collection
-        found_ids = (
-            await db[collection]
-            .find({"_id": {"$in": casted_ids}, **additional_query}, {"_id": 1})
-            .distinct("_id")
+    Parameters
+    ----------
+    collection : str
+        The collection the IDs belong to, used in the error message.
+    ids : Iterable[Any]
+        The IDs to cast.
+
+    Raises
+    ------
+    NotFoundException
+        If any of the IDs is not a valid ObjectId.
+    """
+    try:
+        return [ObjectId(id_) for id_ in ids]
+    except Exception as e:
+        raise NotFoundException(
+            f"Invalid {collection.capitalize()} ID: {str(e)}"
         )
-        missing_ids = set(casted_ids) - set(found_ids)
+
+
+async def find_existing_ids(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    ids: Iterable[AfterAnnotatedObjectId],
+    additional_query: dict[str, Any] = {},
+) -> set[ObjectId]:
+    """
+    Find which of the provided IDs exist in the collection.
+
+    Resolves all IDs with a single query so that callers validating many
+    documents (e.g. a batch of triples) avoid a round-trip per document.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database to check the IDs against.
+    collection : str
+        The collection to check the IDs against.
+    ids : Iterable[AfterAnnotatedObjectId]
+        The IDs to look up.
+    additional_query : dict[str, Any], optional
+        Additional query to filter the IDs, by default {}.
+
+    Returns
+    -------
+    set[ObjectId]
+        The subset of IDs that exist in the collection.
+    """
+    unique_ids = list(set(ids))
+    if not unique_ids:
+        return set()
+
+    found_ids = (
+        await db[collection]
+        .find({"_id": {"$in": unique_ids}, **additional_query}, {"_id": 1})
+        .distinct("_id")
+    )
+    return set(found_ids)
+
+
+def check_existing_in(
+    collection: str,
+    ids: Any,
+    found_ids: set[ObjectId],
+) -> list[AfterAnnotatedObjectId]:
+    """
+    Check the provided IDs against a set of IDs known to exist.
+
+    Parameters
+    ----------
+    collection : str
+        The collection the IDs belong to, used in the error message.
+    ids : list[ObjectId]
+        The list of IDs to check.
+    found_ids : set[ObjectId]
+        The IDs known to exist, e.g. from `find_existing_ids`.
+
+    Raises
+    ------
+    NotFoundException
+        If any of the IDs is invalid or not in `found_ids`.
+    """
+    casted_ids: list[AfterAnnotatedObjectId] = []
+
+    if ids:
+        casted_ids = cast_object_ids(collection, ids)
+        missing_ids = set(casted_ids) - found_ids
 
         if missing_ids:
             raise NotFoundException(
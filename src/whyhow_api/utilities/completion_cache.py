@@ -0,0 +1,186 @@
+"""LLM completion caches."""
+
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from whyhow_api.schemas.base import get_utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache(ABC):
+    """Completion cache interface.
+
+    Completions are keyed by a hash of the full request, i.e. the messages
+    and every completion parameter. Requests sampled with a temperature above
+    zero are not deterministic, so they bypass the cache unless
+    `cache_nonzero_temperature` is set.
+    """
+
+    def __init__(self, cache_nonzero_temperature: bool = False):
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def _get(self, key: str) -> str | None:
+        """Get a cached completion by key."""
+
+    @abstractmethod
+    async def _set(self, key: str, content: str) -> None:
+        """Cache a completion by key."""
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Hash a completion request."""
+        return hashlib.sha256(
+            json.dumps(request, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def is_cacheable(self, request: Dict[str, Any]) -> bool:
+        """Check whether a completion request can be cached."""
+        temperature = request.get("temperature") or 0
+        return temperature <= 0 or self.cache_nonzero_temperature
+
+    async def get(self, request: Dict[str, Any]) -> str | None:
+        """Get the cached completion of a request.
+
+        Cache errors are logged and treated as misses.
+        """
+        if not self.is_cacheable(request):
+            return None
+
+        try:
+            content = await self._get(self.make_key(request))
+        except Exception as e:
+            logger.warning(f"Failed to read completion cache: {e}")
+            content = None
+
+        if content is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return content
+
+    async def set(self, request: Dict[str, Any], content: str) -> None:
+        """Cache the completion of a request.
+
+        Cache errors are logged and ignored.
+        """
+        if not self.is_cacheable(request):
+            return
+
+        try:
+            await self._set(self.make_key(request), content)
+        except Exception as e:
+            logger.warning(f"Failed to write completion cache: {e}")
+
+
+class InMemoryCompletionCache(CompletionCache):
+    """Completion cache held in process memory, evicting least recently used."""
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int,
+        cache_nonzero_temperature: bool = False,
+    ):
+        super().__init__(cache_nonzero_temperature=cache_nonzero_temperature)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+    async def _get(self, key: str) -> str | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, content = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return content
+
+    async def _set(self, key: str, content: str) -> None:
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, content)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class MongoCompletionCache(CompletionCache):
+    """Completion cache persisted in a MongoDB collection.
+
+    Entries expire through a TTL index on `expires_at`. The collection size
+    is checked on the first write and then every `evict_interval` writes, and
+    once it grows beyond `max_entries` the least recently used entries are
+    evicted.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        ttl_seconds: int,
+        max_entries: int,
+        cache_nonzero_temperature: bool = False,
+        evict_interval: int = 100,
+    ):
+        super().__init__(cache_nonzero_temperature=cache_nonzero_temperature)
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_interval = max(1, evict_interval)
+        self.writes = 0
+
+    async def _get(self, key: str) -> str | None:
+        now = get_utc_now()
+        # The TTL monitor runs periodically, so expired entries are filtered
+        entry = await self.collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used_at": now}},
+            projection={"content": 1},
+        )
+        return None if entry is None else entry["content"]
+
+    async def _set(self, key: str, content: str) -> None:
+        now = get_utc_now()
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "content": content,
+                    "last_used_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                },
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )
+        if self.writes % self.evict_interval == 0:
+            await self._evict()
+        self.writes += 1
+
+    async def _evict(self) -> None:
+        """Evict the least recently used entries beyond `max_entries`."""
+        count = await self.collection.estimated_document_count()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+
+        evicted = await self.collection.find(
+            {}, {"_id": 1}, sort=[("last_used_at", 1)], limit=excess
+        ).to_list(None)
+        await self.collection.delete_many(
+            {"_id": {"$in": [e["_id"] for e in evicted]}}
+        )
+        logger.info(f"Evicted {len(evicted)} completion cache entries")
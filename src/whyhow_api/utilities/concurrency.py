@@ -0,0 +1,16 @@
+"""Concurrency utilities."""
+
+import asyncio
+from typing import Any, Iterable
+
+
+async def gather_or_cancel(aws: Iterable[Any]) -> list[Any]:
+    """Run awaitables concurrently, cancelling the others if one fails."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -247,6 +247,33 @@ create_schema_guided_graph_prompt = (
     """
 )
 
+create_multi_pattern_graph_prompt = (
+    lambda text, patterns: f"""
+    ### Instructions for Triple Extraction
+
+    **Context**: You are given a narrative text containing information to be structured into semantic triples. Your task is to analyze the text and identify specific relationships as defined by each of the numbered patterns provided. This involves identifying the subject of the relationship (Head) and the object of the relationship (Tail) for every pattern.
+
+    **Triple Patterns**:
+    {"".join(f'''
+    {i}.
+    - **Head**: {pattern.head.name} ({pattern.head.description})
+    - **Relation**: {pattern.relation.name} ({pattern.relation.description})
+    - **Tail**: {pattern.tail.name} ({pattern.tail.description})
+    ''' for i, pattern in enumerate(patterns))}
+    **Expected Output Format**:
+    - Return a JSON object whose keys are the pattern numbers and whose values are JSON-formatted lists of lists, where each inner list represents a triple of that pattern and contains exactly two elements: the head and the tail.
+    - The output should be of the form: {{"0": [["head", "tail"]], "1": []}}.
+    - Ensure that the output strictly follows this format and directly relates to the given narrative without adding extraneous details or deviating from the specified patterns.
+    - If no relevant entities are found for a pattern, return an empty JSON list for it: [].
+
+    ### Text to Analyze:
+    {text}
+
+
+    Please proceed with the analysis and provide the output in the specified JSON format according to the given instructions.
+    """
+)
+
 create_zeroshot_graph_prompt = (
     lambda text, context: f"""
     ### Instructions for Triple Extraction
@@ -0,0 +1,160 @@
+"""Batching of embedding requests."""
+
+import asyncio
+import logging
+from functools import cache
+from typing import Any, List, Sequence
+
+import tiktoken
+from openai import APIStatusError, AsyncAzureOpenAI, AsyncOpenAI
+
+from whyhow_api.utilities.concurrency import gather_or_cancel
+from whyhow_api.utilities.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 2048  # max number of inputs per embeddings request
+# Statuses of requests rejected for their inputs, e.g. too many tokens
+REJECTED_STATUS_CODES = (400, 413)
+
+
+@cache
+def get_embedding_tokenizer() -> tiktoken.Encoding | None:
+    """Get the tokenizer of the OpenAI embedding models, if available."""
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(
+            f"Failed to load embedding tokenizer, estimating tokens: {e}"
+        )
+        return None
+
+
+class EmbeddingBatcher:
+    """Embed texts in concurrent batches packed by size and tokens.
+
+    Batches hold at most `batch_size` texts and `max_batch_tokens` estimated
+    tokens, and up to `max_concurrency` of them are sent at once, each
+    waiting on the rate limiter if any. A batch rejected for its inputs,
+    e.g. too large, is split in halves which are retried, so a single
+    rejected text does not fail the others of its batch before it is
+    isolated. Other errors, such as authentication or rate limit errors
+    left after the client's own retries, are raised.
+    """
+
+    def __init__(
+        self,
+        max_batch_tokens: int = 250_000,
+        max_concurrency: int = 1,
+        rate_limiter: RateLimiter | None = None,
+        tokenizer: tiktoken.Encoding | None = None,
+    ):
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.tokenizer = tokenizer
+
+    def count_tokens(self, text: str) -> int:
+        """Count, or estimate without a tokenizer, the tokens of a text."""
+        if self.tokenizer is None:
+            # Conservative estimate of ~3 characters per token
+            return len(text) // 3 + 1
+        return len(self.tokenizer.encode(text, disallowed_special=()))
+
+    def pack(self, tokens: Sequence[int], batch_size: int) -> List[range]:
+        """Pack texts, by their token counts, into ranges of batches."""
+        batches = []
+        start = 0
+        batch_tokens = 0
+        for i, count in enumerate(tokens):
+            if i > start and (
+                i - start >= batch_size
+                or batch_tokens + count > self.max_batch_tokens
+            ):
+                batches.append(range(start, i))
+                start = i
+                batch_tokens = 0
+            batch_tokens += count
+        if start < len(tokens):
+            batches.append(range(start, len(tokens)))
+        return batches
+
+    async def embed(
+        self,
+        client: AsyncOpenAI | AsyncAzureOpenAI,
+        texts: Sequence[str],
+        model: str,
+        dimensions: int,
+        batch_size: int = MAX_BATCH_SIZE,
+    ) -> List[Any]:
+        """Embed texts, returning their embeddings in order."""
+        if min(batch_size, len(texts)) > MAX_BATCH_SIZE:
+            raise RuntimeError("Texts must be 2048 items or less.")
+
+        tokens = [self.count_tokens(text) for text in texts]
+        batches = self.pack(tokens, batch_size)
+        logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await gather_or_cancel(
+            self._embed_batch(
+                client,
+                [texts[i] for i in batch],
+                [tokens[i] for i in batch],
+                model,
+                dimensions,
+                semaphore,
+            )
+            for batch in batches
+        )
+        return [embedding for result in results for embedding in result]
+
+    async def _embed_batch(
+        self,
+        client: AsyncOpenAI | AsyncAzureOpenAI,
+        texts: List[str],
+        tokens: List[int],
+        model: str,
+        dimensions: int,
+        semaphore: asyncio.Semaphore,
+    ) -> List[Any]:
+        """Embed a batch, splitting it in halves if it is rejected."""
+        try:
+            async with semaphore:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.wait(sum(tokens))
+                response = await client.embeddings.create(
+                    input=texts,
+                    model=model,
+                    dimensions=dimensions,
+                )
+            return [d.embedding for d in response.data]
+        except APIStatusError as e:
+            if len(texts) == 1 or e.status_code not in REJECTED_STATUS_CODES:
+                raise
+            logger.warning(
+                f"Embedding batch of {len(texts)} texts rejected, splitting: {e}"
+            )
+
+        half = len(texts) // 2
+        first, second = await gather_or_cancel(
+            [
+                self._embed_batch(
+                    client,
+                    texts[:half],
+                    tokens[:half],
+                    model,
+                    dimensions,
+                    semaphore,
+                ),
+                self._embed_batch(
+                    client,
+                    texts[half:],
+                    tokens[half:],
+                    model,
+                    dimensions,
+                    semaphore,
+                ),
+            ]
+        )
+        return first + second
@@ -0,0 +1,203 @@
+"""Embedding caches."""
+
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+from datetime import timedelta
+from functools import cache
+from typing import List, Sequence, Tuple
+
+import logfire
+from motor.motor_asyncio import AsyncIOMotorCollection
+from opentelemetry.metrics import Counter
+from pymongo import UpdateOne
+
+from whyhow_api.schemas.base import get_utc_now
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def get_lookup_counters() -> Tuple[Counter, Counter]:
+    """Get the hit and miss metric counters of the embedding caches.
+
+    Created on first use, once Logfire is configured.
+    """
+    return (
+        logfire.metric_counter(
+            "embedding_cache_hits",
+            unit="1",
+            description="Embedding cache hits",
+        ),
+        logfire.metric_counter(
+            "embedding_cache_misses",
+            unit="1",
+            description="Embedding cache misses",
+        ),
+    )
+
+
+class EmbeddingLRU:
+    """Embeddings held in process memory, evicting least recently used.
+
+    Embeddings are stored as float32 arrays, the precision they are returned
+    with, to keep each entry small.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, array[float]] = OrderedDict()
+
+    def get(self, key: str) -> List[float] | None:
+        """Get an embedding by key."""
+        embedding = self.entries.get(key)
+        if embedding is None:
+            return None
+        self.entries.move_to_end(key)
+        return embedding.tolist()
+
+    def set(self, key: str, embedding: Sequence[float]) -> None:
+        """Store an embedding by key."""
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = array("f", embedding)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+_embedding_lru: EmbeddingLRU | None = None
+
+
+def get_embedding_lru(max_entries: int) -> EmbeddingLRU:
+    """Get the in-memory embedding cache of the process."""
+    global _embedding_lru
+    if _embedding_lru is None:
+        _embedding_lru = EmbeddingLRU(max_entries)
+    else:
+        _embedding_lru.max_entries = max_entries
+    return _embedding_lru
+
+
+class EmbeddingCache:
+    """Embedding cache persisted in a MongoDB collection.
+
+    Embeddings are keyed by the model, the dimensions and a hash of the
+    provider endpoint and the text, so the same text embedded for chunks,
+    triples or queries is only sent to the provider once. The endpoint keeps
+    apart deployments sharing a name, e.g. Azure OpenAI deployments of
+    different resources. Lookups go through an in-process LRU first. Entries
+    expire through a TTL index on `expires_at`.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        lru: EmbeddingLRU,
+        ttl_seconds: int,
+        endpoint: str,
+    ):
+        self.collection = collection
+        self.lru = lru
+        self.ttl_seconds = ttl_seconds
+        self.endpoint = endpoint
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(endpoint: str, model: str, dimensions: int, text: str) -> str:
+        """Key the embedding of a text by a provider endpoint."""
+        text_hash = hashlib.sha256(
+            f"{endpoint}\n{text}".encode("utf-8")
+        ).hexdigest()
+        return f"{model}:{dimensions}:{text_hash}"
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def get_many(
+        self, model: str, dimensions: int, texts: Sequence[str]
+    ) -> List[List[float] | None]:
+        """Get the cached embeddings of texts, None for the misses.
+
+        Cache errors are logged and treated as misses.
+        """
+        keys = [
+            self.make_key(self.endpoint, model, dimensions, text)
+            for text in texts
+        ]
+        embeddings = [self.lru.get(key) for key in keys]
+
+        missing_keys = {
+            key
+            for key, embedding in zip(keys, embeddings)
+            if embedding is None
+        }
+        if missing_keys:
+            try:
+                entries = await self.collection.find(
+                    {"_id": {"$in": list(missing_keys)}},
+                    {"embedding": 1},
+                ).to_list(None)
+            except Exception as e:
+                logger.warning(f"Failed to read embedding cache: {e}")
+                entries = []
+
+            found = {entry["_id"]: entry["embedding"] for entry in entries}
+            for key, embedding in found.items():
+                self.lru.set(key, embedding)
+            embeddings = [
+                found.get(key) if embedding is None else embedding
+                for key, embedding in zip(keys, embeddings)
+            ]
+
+        hits = sum(embedding is not None for embedding in embeddings)
+        self.hits += hits
+        self.misses += len(embeddings) - hits
+        hits_counter, misses_counter = get_lookup_counters()
+        hits_counter.add(hits)
+        misses_counter.add(len(embeddings) - hits)
+        return embeddings
+
+    async def set_many(
+        self,
+        model: str,
+        dimensions: int,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+    ) -> None:
+        """Cache the embeddings of texts.
+
+        Cache errors are logged and ignored.
+        """
+        now = get_utc_now()
+        operations = []
+        for text, embedding in zip(texts, embeddings):
+            key = self.make_key(self.endpoint, model, dimensions, text)
+            self.lru.set(key, embedding)
+            operations.append(
+                UpdateOne(
+                    {"_id": key},
+                    {
+                        "$set": {
+                            "embedding": list(embedding),
+                            "expires_at": (
+                                now + timedelta(seconds=self.ttl_seconds)
+                            ),
+                        },
+                        "$setOnInsert": {"created_at": now},
+                    },
+                    upsert=True,
+                )
+            )
+        if not operations:
+            return
+
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Failed to write embedding cache: {e}")
@@ -0,0 +1,147 @@
+"""Pooling of LLM provider clients."""
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from importlib.util import find_spec
+from typing import Callable, Dict
+
+import httpx
+from openai import DEFAULT_TIMEOUT, AsyncAzureOpenAI, AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+LLMProviderClient = AsyncOpenAI | AsyncAzureOpenAI
+
+# HTTP/2 needs the optional `h2` package (`httpx[http2]`)
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+
+class LLMClientPool:
+    """Process-wide pool of LLM clients, evicting least recently used.
+
+    Clients are keyed by a hash of their provider config so requests sharing
+    a config reuse one client, and its connection pool, instead of paying
+    connection setup again. Evicted clients may still be in use by
+    background tasks, so their transport is closed after `close_delay`.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        close_delay: float = 60.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+    ):
+        self.max_size = max(max_size, 1)
+        self.close_delay = close_delay
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.clients: OrderedDict[str, LLMProviderClient] = OrderedDict()
+        self.closing: Dict[asyncio.Task[None], LLMProviderClient] = {}
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        api_key: str,
+        endpoint: str | None = None,
+        api_version: str | None = None,
+    ) -> str:
+        """Hash a provider config."""
+        return hashlib.sha256(
+            json.dumps([provider, api_key, endpoint, api_version]).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+
+    def make_http_client(self) -> httpx.AsyncClient:
+        """Create the HTTP client of a pooled LLM client."""
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits,
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True,
+        )
+
+    def get(
+        self,
+        key: str,
+        create: Callable[[httpx.AsyncClient], LLMProviderClient],
+    ) -> LLMProviderClient:
+        """Get the client of a key, creating it with `create` if needed."""
+        client = self.clients.get(key)
+        if client is not None and not client.is_closed():
+            self.clients.move_to_end(key)
+            return client
+
+        client = self.clients[key] = create(self.make_http_client())
+        self.clients.move_to_end(key)
+        while len(self.clients) > self.max_size:
+            _, evicted = self.clients.popitem(last=False)
+            self._close_later(evicted)
+        return client
+
+    def _close_later(self, client: LLMProviderClient) -> None:
+        """Close an evicted client once in-flight requests had time to end."""
+
+        async def close() -> None:
+            await asyncio.sleep(self.close_delay)
+            await client.close()
+
+        task = asyncio.get_running_loop().create_task(close())
+        self.closing[task] = client
+        task.add_done_callback(lambda t: self.closing.pop(t, None))
+        logger.info("Evicted LLM client from pool")
+
+    async def close(self) -> None:
+        """Close all the clients, including those pending closure."""
+        for task in self.closing:
+            task.cancel()
+        clients = [*self.closing.values(), *self.clients.values()]
+        self.closing.clear()
+        self.clients.clear()
+        await asyncio.gather(
+            *(client.close() for client in clients), return_exceptions=True
+        )
+        logger.info(f"Closed {len(clients)} pooled LLM clients")
+
+
+_llm_client_pool: LLMClientPool | None = None
+
+
+def get_llm_client_pool(
+    max_size: int,
+    close_delay: float,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    http2: bool,
+) -> LLMClientPool:
+    """Get the LLM client pool of the process."""
+    global _llm_client_pool
+    if _llm_client_pool is None:
+        _llm_client_pool = LLMClientPool(
+            max_size=max_size,
+            close_delay=close_delay,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2,
+        )
+    return _llm_client_pool
+
+
+async def close_llm_client_pool() -> None:
+    """Close the LLM client pool of the process."""
+    global _llm_client_pool
+    if _llm_client_pool is not None:
+        await _llm_client_pool.close()
+        _llm_client_pool = None
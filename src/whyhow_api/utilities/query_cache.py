@@ -0,0 +1,176 @@
+"""Query answer caches."""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Sequence, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from whyhow_api.schemas.base import get_utc_now
+from whyhow_api.utilities.vectors import cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """Answers of graph queries cached in a MongoDB collection.
+
+    Answers are keyed by the graph, its content version, the user and the
+    query parameters, with the query text normalized. The version of a graph
+    is incremented whenever its nodes or triples change, so answers cached
+    for a previous version are never served again. Entries expire through a
+    TTL index on `expires_at`.
+
+    If `similarity_threshold` is set, a query without an exact hit is served
+    the answer of the most similar query cached with the same graph version
+    and other parameters, if the cosine similarity of their embeddings
+    reaches the threshold. Only the `similarity_candidates` most recent
+    entries are compared.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        ttl_seconds: int,
+        similarity_threshold: float | None = None,
+        similarity_candidates: int = 100,
+    ):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.similarity_candidates = similarity_candidates
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_query(query: str | None) -> str | None:
+        """Normalize the case, whitespace and final punctuation of a query."""
+        if query is None:
+            return None
+        return " ".join(query.casefold().split()).rstrip("?!. ")
+
+    @classmethod
+    def make_keys(
+        cls,
+        graph_id: ObjectId,
+        version: int,
+        user_id: ObjectId,
+        parameters: Dict[str, Any],
+    ) -> Tuple[str, str]:
+        """Key a query, and the query parameters other than its text."""
+        scope = {
+            "graph": str(graph_id),
+            "version": version,
+            "user": str(user_id),
+            **{k: v for k, v in parameters.items() if k != "query"},
+        }
+        query = cls.normalize_query(parameters.get("query"))
+        return cls._hash({**scope, "query": query}), cls._hash(scope)
+
+    @staticmethod
+    def _hash(value: Dict[str, Any]) -> str:
+        return hashlib.sha256(
+            json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    @property
+    def similarity_enabled(self) -> bool:
+        """Whether near-duplicate queries are served cached answers."""
+        return self.similarity_threshold is not None
+
+    async def get(
+        self,
+        graph_id: ObjectId,
+        version: int,
+        user_id: ObjectId,
+        parameters: Dict[str, Any],
+        embedding: Sequence[float] | None = None,
+    ) -> Dict[str, Any] | None:
+        """Get the cached answer of a query.
+
+        Cache errors are logged and treated as misses.
+        """
+        key, scope_key = self.make_keys(graph_id, version, user_id, parameters)
+        now = get_utc_now()
+        try:
+            # The TTL monitor runs periodically, so expired entries are filtered
+            entry = await self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": now}}, {"result": 1}
+            )
+            if entry is None and embedding is not None:
+                entry = await self._get_similar(scope_key, embedding, now)
+        except Exception as e:
+            logger.warning(f"Failed to read query cache: {e}")
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["result"]
+
+    async def _get_similar(
+        self, scope_key: str, embedding: Sequence[float], now: datetime
+    ) -> Dict[str, Any] | None:
+        """Get the entry of the most similar query above the threshold."""
+        if self.similarity_threshold is None:
+            return None
+
+        entries = (
+            await self.collection.find(
+                {
+                    "scope": scope_key,
+                    "expires_at": {"$gt": now},
+                    "embedding": {"$exists": True},
+                },
+                {"embedding": 1, "result": 1},
+            )
+            .sort("created_at", -1)
+            .limit(self.similarity_candidates)
+            .to_list(None)
+        )
+        best, best_similarity = None, self.similarity_threshold
+        for entry in entries:
+            similarity = cosine_similarity(embedding, entry["embedding"])
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+        if best is not None:
+            logger.info(
+                f"Query cache near-duplicate hit with similarity {best_similarity:.3f}"
+            )
+        return best
+
+    async def set(
+        self,
+        graph_id: ObjectId,
+        version: int,
+        user_id: ObjectId,
+        parameters: Dict[str, Any],
+        result: Dict[str, Any],
+        embedding: Sequence[float] | None = None,
+    ) -> None:
+        """Cache the answer of a query.
+
+        Cache errors are logged and ignored.
+        """
+        key, scope_key = self.make_keys(graph_id, version, user_id, parameters)
+        now = get_utc_now()
+        entry: Dict[str, Any] = {
+            "scope": scope_key,
+            "result": result,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        if embedding is not None:
+            entry["embedding"] = list(embedding)
+
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": entry, "$setOnInsert": {"created_at": now}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to write query cache: {e}")
@@ -0,0 +1,184 @@
+"""Rate limiting of LLM provider requests."""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Mapping, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of a text without tokenizing it.
+
+    Three characters per token overestimates most text, so that the tokens
+    per minute budget is not exceeded.
+    """
+    return len(text) // 3 + 1
+
+
+class TokenBucket:
+    """Token bucket refilling continuously up to its capacity per period."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.period = period
+        self.capacity = max(capacity, 1)
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second."""
+        return self.capacity / self.period
+
+    def refill(self) -> None:
+        """Add the tokens accrued since the last refill."""
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def resize(self, capacity: float) -> None:
+        """Change the capacity, keeping the level within it."""
+        self.refill()
+        self.capacity = max(capacity, 1)
+        self.level = min(self.level, self.capacity)
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available."""
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def reconcile(self, remaining: float) -> None:
+        """Lower the level to a remaining budget reported by the provider."""
+        self.refill()
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Rate limiter for requests and tokens per minute.
+
+    Both budgets are token buckets refilling continuously. Callers are served
+    in arrival order: waiters sleep on a future that a single timer resolves
+    once the budgets allow the request at the head of the queue.
+    """
+
+    def __init__(self, rpm_limit: int, tpm_limit: int):
+        self.requests = TokenBucket(rpm_limit)
+        self.tokens = TokenBucket(tpm_limit)
+        self.waiters: Deque[Tuple[asyncio.Future[None], float]] = deque()
+        self.timer: asyncio.TimerHandle | None = None
+        logger.info(
+            f"RateLimiter initialised with rpm_limit={rpm_limit} and tpm_limit={tpm_limit}"
+        )
+
+    def set_limits(self, rpm_limit: int, tpm_limit: int) -> None:
+        """Change the requests and tokens per minute limits."""
+        self.requests.resize(rpm_limit)
+        self.tokens.resize(tpm_limit)
+
+    async def wait(self, tokens: int) -> None:
+        """Wait for the rate limiter to allow the request."""
+        # A request larger than the bucket would never be served
+        amount = min(tokens, self.tokens.capacity)
+        if not self.waiters and self._acquire(amount):
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append((future, amount))
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._schedule()
+            raise
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Reconcile the budgets with the provider's rate limit headers.
+
+        The provider counts every request made with the API key, including
+        those of other processes, so its remaining budget caps ours.
+        """
+        for bucket, header in [
+            (self.requests, "x-ratelimit-remaining-requests"),
+            (self.tokens, "x-ratelimit-remaining-tokens"),
+        ]:
+            try:
+                remaining = float(headers[header])
+            except (KeyError, TypeError, ValueError):
+                continue
+            bucket.reconcile(remaining)
+
+    def _acquire(self, amount: float) -> bool:
+        """Take one request and `amount` tokens if both are available."""
+        self.requests.refill()
+        self.tokens.refill()
+        if self.requests.level < 1 or self.tokens.level < amount:
+            return False
+        self.requests.level -= 1
+        self.tokens.level -= amount
+        return True
+
+    def _release(self) -> None:
+        """Serve the waiters the budgets allow, in order."""
+        self.timer = None
+        while self.waiters:
+            future, amount = self.waiters[0]
+            if future.done():
+                self.waiters.popleft()
+            elif self._acquire(amount):
+                self.waiters.popleft()
+                future.set_result(None)
+            else:
+                break
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Schedule the release of the first waiter."""
+        # The first waiter may have changed, e.g. on cancellation
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.waiters and self.waiters[0][0].done():
+            self.waiters.popleft()
+        if not self.waiters:
+            return
+
+        self.requests.refill()
+        self.tokens.refill()
+        delay = max(
+            self.requests.delay(1), self.tokens.delay(self.waiters[0][1])
+        )
+        logger.debug(
+            f"Rate limit reached, {len(self.waiters)} waiting, next in {delay:.2f}s"
+        )
+        self.timer = asyncio.get_running_loop().call_later(
+            delay, self._release
+        )
+
+
+# Rate limiters by API key hash, least recently used first
+_rate_limiters: OrderedDict[str, RateLimiter] = OrderedDict()
+MAX_RATE_LIMITERS = 256
+
+
+def get_rate_limiter(
+    api_key: str, rpm_limit: int, tpm_limit: int
+) -> RateLimiter:
+    """Get the rate limiter shared by all the requests of an API key.
+
+    At most `MAX_RATE_LIMITERS` rate limiters are kept, evicting the least
+    recently used.
+    """
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    rate_limiter = _rate_limiters.get(key)
+    if rate_limiter is None:
+        rate_limiter = _rate_limiters[key] = RateLimiter(rpm_limit, tpm_limit)
+        while len(_rate_limiters) > MAX_RATE_LIMITERS:
+            _rate_limiters.popitem(last=False)
+    else:
+        rate_limiter.set_limits(rpm_limit, tpm_limit)
+        _rate_limiters.move_to_end(key)
+    return rate_limiter
@@ -0,0 +1,76 @@
+"""Reranking of similarity search results."""
+
+import math
+import operator
+from typing import Any, Dict, List, Sequence
+
+from whyhow_api.utilities.vectors import decode_vector
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    """Scale a vector to unit length, unless it is zero."""
+    norm = math.sqrt(math.fsum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+
+def mmr_rerank(
+    results: Sequence[Dict[str, Any]],
+    min_score: float,
+    top_k: int,
+    mmr_lambda: float,
+) -> List[Dict[str, Any]]:
+    """Rerank similarity search results with maximal marginal relevance.
+
+    Results scoring below `min_score` are dropped and up to `top_k` of the
+    others are selected, each next one maximizing `mmr_lambda` times its
+    score minus `1 - mmr_lambda` times its highest similarity to the
+    results already selected, so near duplicates give way to results
+    adding new facts. Similarities are cosine similarities of the
+    `embedding` of the results, rescaled to [0, 1] like vector search
+    scores. Without embeddings, or with an `mmr_lambda` of 1, results are
+    ranked by score alone.
+
+    Parameters
+    ----------
+    results : Sequence[Dict[str, Any]]
+        The results, with a `score` and optionally an `embedding`.
+    min_score : float
+        The minimum score of the results kept.
+    top_k : int
+        The maximum number of results kept.
+    mmr_lambda : float
+        The weight of relevance over diversity, between 0 and 1.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        The selected results, in order of selection.
+    """
+    candidates = sorted(
+        (r for r in results if r.get("score", 0.0) >= min_score),
+        key=lambda r: r["score"],
+        reverse=True,
+    )
+    if mmr_lambda >= 1 or any("embedding" not in r for r in candidates):
+        return candidates[:top_k]
+
+    embeddings = [
+        _normalize(decode_vector(r["embedding"])) for r in candidates
+    ]
+    redundancy = [0.0] * len(candidates)
+    remaining = list(range(len(candidates)))
+    selected: List[int] = []
+    while remaining and len(selected) < top_k:
+        best = max(
+            remaining,
+            key=lambda i: mmr_lambda * candidates[i]["score"]
+            - (1 - mmr_lambda) * redundancy[i],
+        )
+        remaining.remove(best)
+        selected.append(best)
+        for i in remaining:
+            similarity = sum(
+                map(operator.mul, embeddings[i], embeddings[best])
+            )
+            redundancy[i] = max(redundancy[i], (1 + similarity) / 2)
+    return [candidates[i] for i in selected]
@@ -1,8 +1,9 @@
 """Routers utilities."""
 
+import json
 import logging
 import re
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List
 
 from bson import ObjectId
 from fastapi import Query
@@ -88,3 +89,61 @@ def order_query(
 ) -> int:
     """Convert order to 1 or -1."""
     return 1 if order == "ascending" else -1
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format an event of a Server-Sent Events stream, with JSON data."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _parse_ndjson_line(line: bytes, line_number: int) -> Any:
+    """Parse one line of a newline-delimited JSON stream."""
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+
+
+async def iter_ndjson_batches(
+    stream: AsyncIterator[bytes], batch_size: int
+) -> AsyncIterator[List[Any]]:
+    """Parse a newline-delimited JSON stream into batches of records.
+
+    Only the current batch and the incomplete trailing line are held in
+    memory, so the stream can be arbitrarily large.
+
+    Parameters
+    ----------
+    stream : AsyncIterator[bytes]
+        The stream, e.g. `Request.stream()`.
+    batch_size : int
+        The maximum number of records per batch.
+
+    Yields
+    ------
+    List[Any]
+        The parsed records. Blank lines are skipped.
+
+    Raises
+    ------
+    ValueError
+        If a line is not valid JSON.
+    """
+    buffer = b""
+    batch: List[Any] = []
+    line_number = 0
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                batch.append(_parse_ndjson_line(line, line_number))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if buffer.strip():
+        batch.append(_parse_ndjson_line(buffer, line_number + 1))
+    if batch:
+        yield batch
@@ -0,0 +1,91 @@
+"""Tracing utilities."""
+
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_ON,
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+)
+from opentelemetry.trace import Link, SpanKind
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util.types import Attributes
+
+# Logfire tags the spans of instrumented LLM clients with "LLM"
+LLM_SPAN_TAG = "LLM"
+
+
+class LLMSpanSampler(Sampler):
+    """Sampler keeping a fraction of the LLM spans and every other span.
+
+    Each LLM span is sampled on its own, rather than per trace, so a graph
+    build issuing thousands of requests still reports a share of them.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.parent_based = ParentBased(ALWAYS_ON)
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: Optional[Sequence[Link]] = None,
+        trace_state: Optional[TraceState] = None,
+    ) -> SamplingResult:
+        """Sample a span, dropping LLM spans beyond the sampling rate."""
+        result = self.parent_based.should_sample(
+            parent_context,
+            trace_id,
+            name,
+            kind=kind,
+            attributes=attributes,
+            links=links,
+            trace_state=trace_state,
+        )
+        tags = (attributes or {}).get("logfire.tags") or ()
+        if (
+            result.decision == Decision.RECORD_AND_SAMPLE
+            and LLM_SPAN_TAG in tags  # type: ignore[operator]
+            and random.random() >= self.rate
+        ):
+            return SamplingResult(Decision.DROP)
+        return result
+
+    def get_description(self) -> str:
+        """Describe the sampler."""
+        return f"LLMSpanSampler{{{self.rate}}}"
+
+
+class StageTimer:
+    """Wall-clock durations of the stages of an operation, in milliseconds."""
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage, adding to its duration if it is timed again."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = round(
+                self.timings.get(name, 0.0) + elapsed, 3
+            )
+
+    def total(self) -> Dict[str, float]:
+        """Get the timings, with the `total` duration so far."""
+        elapsed = (time.perf_counter() - self.started_at) * 1000
+        return {**self.timings, "total": round(elapsed, 3)}
@@ -0,0 +1,102 @@
+"""Storage formats of embedding vectors."""
+
+import math
+import struct
+from typing import Any, List, Sequence
+
+from bson.binary import Binary
+
+from whyhow_api.config import EMBEDDING_STORAGE_FORMATS
+
+# BSON binary subtype of vectors
+VECTOR_SUBTYPE = 9
+
+# Dtype byte of each binary vector format, as defined by the BSON spec
+VECTOR_DTYPES = {
+    "int8": 0x03,
+    "float32": 0x27,
+    "bit": 0x10,
+}
+
+
+def encode_vector(
+    embedding: Sequence[float], storage_format: EMBEDDING_STORAGE_FORMATS
+) -> List[float] | Binary:
+    """Encode an embedding in a storage format.
+
+    `array` keeps the embedding as an array of doubles. The other formats
+    are BSON binary vectors: `float32` halves the size of an array, `int8`
+    scales each vector by its largest component into signed bytes, which
+    keeps its direction for cosine similarity, and `bit` keeps the sign of
+    each component only, to be compared with euclidean (hamming) distance.
+
+    Parameters
+    ----------
+    embedding : Sequence[float]
+        The embedding.
+    storage_format : EMBEDDING_STORAGE_FORMATS
+        The storage format.
+
+    Returns
+    -------
+    List[float] | Binary
+        The encoded embedding.
+    """
+    if storage_format == "array":
+        return list(embedding)
+
+    if storage_format == "float32":
+        data = struct.pack(f"<{len(embedding)}f", *embedding)
+        padding = 0
+    elif storage_format == "int8":
+        scale = max((abs(x) for x in embedding), default=0.0) or 1.0
+        data = struct.pack(
+            f"<{len(embedding)}b",
+            *(round(x / scale * 127) for x in embedding),
+        )
+        padding = 0
+    elif storage_format == "bit":
+        padding = -len(embedding) % 8
+        bits = [1 if x > 0 else 0 for x in embedding] + [0] * padding
+        data = bytes(
+            int("".join(map(str, bits[i : i + 8])), 2)
+            for i in range(0, len(bits), 8)
+        )
+    else:
+        raise ValueError(f"Unknown embedding storage format: {storage_format}")
+
+    return Binary(
+        bytes([VECTOR_DTYPES[storage_format], padding]) + data,
+        VECTOR_SUBTYPE,
+    )
+
+
+def decode_vector(value: Any) -> Any:
+    """Decode an embedding stored as a BSON binary vector.
+
+    `int8` vectors are returned scaled to [-1, 1] and `bit` vectors as 0s
+    and 1s. Values that are not binary vectors are returned unchanged.
+    """
+    if not isinstance(value, Binary) or value.subtype != VECTOR_SUBTYPE:
+        return value
+
+    dtype, padding = value[0], value[1]
+    data = bytes(value[2:])
+    if dtype == VECTOR_DTYPES["float32"]:
+        return list(struct.unpack(f"<{len(data) // 4}f", data))
+    if dtype == VECTOR_DTYPES["int8"]:
+        return [x / 127 for x in struct.unpack(f"<{len(data)}b", data)]
+    if dtype == VECTOR_DTYPES["bit"]:
+        bits = [float(byte >> (7 - i) & 1) for byte in data for i in range(8)]
+        return bits[: len(bits) - padding]
+    raise ValueError(f"Unknown binary vector dtype: {dtype:#04x}")
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Compute the cosine similarity of two vectors, 0 if either is zero."""
+    norm = math.sqrt(math.fsum(x * x for x in a)) * math.sqrt(
+        math.fsum(y * y for y in b)
+    )
+    if norm == 0:
+        return 0.0
+    return math.fsum(x * y for x, y in zip(a, b)) / norm
@@ -0,0 +1,89 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from whyhow_api.cli.admin import move_chunk_embeddings, vector_index_fields
+from whyhow_api.config import SettingsMongoDB
+
+SEARCH_INDEX = {
+    "name": "triple_vector_index",
+    "type": "vectorSearch",
+    "dimensions_setting": "triple_vector_search_embedding_size",
+    "fields": [
+        {
+            "numDimensions": 1024,
+            "path": "embedding",
+            "similarity": "cosine",
+            "type": "vector",
+        },
+        {"path": "graph", "type": "filter"},
+    ],
+}
+
+
+def test_vector_index_fields_default():
+    fields = vector_index_fields(SEARCH_INDEX, SettingsMongoDB())
+
+    assert fields == SEARCH_INDEX["fields"]
+
+
+def test_vector_index_fields_dimensions():
+    settings = SettingsMongoDB(triple_vector_search_embedding_size=256)
+
+    fields = vector_index_fields(SEARCH_INDEX, settings)
+
+    assert fields[0]["numDimensions"] == 256
+    assert fields[1] == {"path": "graph", "type": "filter"}
+    # The configuration is not modified
+    assert SEARCH_INDEX["fields"][0]["numDimensions"] == 1024
+
+
+def test_vector_index_fields_quantization():
+    settings = SettingsMongoDB(
+        embedding_storage_format="float32", vector_index_quantization="scalar"
+    )
+
+    fields = vector_index_fields(SEARCH_INDEX, settings)
+
+    assert fields[0]["quantization"] == "scalar"
+    assert fields[0]["similarity"] == "cosine"
+
+
+def test_vector_index_fields_bit():
+    settings = SettingsMongoDB(
+        embedding_storage_format="bit", vector_index_quantization="scalar"
+    )
+
+    fields = vector_index_fields(SEARCH_INDEX, settings)
+
+    # Bit vectors are compared by hamming distance and are not quantized
+    assert fields[0]["similarity"] == "euclidean"
+    assert "quantization" not in fields[0]
+
+
+@pytest.mark.asyncio
+async def test_move_chunk_embeddings():
+    chunks = [
+        {"_id": ObjectId(), "created_by": ObjectId(), "embedding": [0.1]},
+        {"_id": ObjectId(), "created_by": ObjectId(), "embedding": [0.2]},
+    ]
+    db = MagicMock()
+    db.chunk.find.return_value.limit.return_value.to_list = AsyncMock(
+        side_effect=[chunks, []]
+    )
+    db.chunk_embedding.bulk_write = AsyncMock()
+    db.chunk.update_many = AsyncMock()
+
+    moved = await move_chunk_embeddings(db, batch_size=2)
+
+    assert moved == 2
+    operations = db.chunk_embedding.bulk_write.call_args.args[0]
+    assert [op._filter for op in operations] == [
+        {"_id": chunk["_id"]} for chunk in chunks
+    ]
+    assert operations[0]._doc["$set"]["embedding"] == [0.1]
+    db.chunk.update_many.assert_awaited_once_with(
+        {"_id": {"$in": [chunk["_id"] for chunk in chunks]}},
+        {"$unset": {"embedding": ""}},
+    )
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -15,6 +16,7 @@ from whyhow_api.dependencies import (
 from whyhow_api.routers.graphs import order_query
 from whyhow_api.schemas.graphs import DetailedGraphDocumentModel
 from whyhow_api.schemas.nodes import NodeWithId
+from whyhow_api.schemas.queries import QueryDocumentModel
 from whyhow_api.schemas.rules import MergeNodesRule, RuleOut
 from whyhow_api.schemas.triples import RelationOut, TripleWithId
 from whyhow_api.schemas.workspaces import WorkspaceDocumentModel
@@ -486,6 +488,7 @@ class TestGraphsMergeNodes:
         )
         client.app.dependency_overrides[get_db] = lambda: AsyncMock()
         client.app.dependency_overrides[get_user] = lambda: ObjectId()
+        client.app.dependency_overrides[get_llm_client] = lambda: AsyncMock()
         response = client.post(
             f"/graphs/{graph_id_mock}/merge_nodes",
             json={
@@ -523,6 +526,7 @@ class TestGraphsMergeNodes:
         )
         client.app.dependency_overrides[get_db] = lambda: AsyncMock()
         client.app.dependency_overrides[get_user] = lambda: ObjectId()
+        client.app.dependency_overrides[get_llm_client] = lambda: AsyncMock()
 
         response = client.post(
             f"/graphs/{graph_id_mock}/merge_nodes",
@@ -596,6 +600,7 @@ class TestGraphsMergeNodes:
         )
         client.app.dependency_overrides[get_db] = lambda: AsyncMock()
         client.app.dependency_overrides[get_user] = lambda: ObjectId()
+        client.app.dependency_overrides[get_llm_client] = lambda: AsyncMock()
 
         response = client.post(
             f"/graphs/{graph_id_mock}/merge_nodes",
@@ -624,6 +629,114 @@ class TestGraphsMergeNodes:
         fake_get_nodes_by_ids.assert_called()
 
 
+class TestGraphsQueryStream:
+
+    @pytest.fixture
+    def graph_object_mock(self):
+        return DetailedGraphDocumentModel(
+            _id=ObjectId(),
+            name="test graph",
+            workspace={"_id": ObjectId(), "name": "workspace"},
+            schema_={"_id": ObjectId(), "name": "workspace"},
+            status="ready",
+            public=False,
+            created_by=ObjectId(),
+        )
+
+    def _post(self, client, monkeypatch, graph_object_mock, events):
+        async def stream_query(request):
+            for event in events:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+
+        processor_mock = MagicMock()
+        processor_mock.return_value.stream_query = stream_query
+        monkeypatch.setattr(
+            "whyhow_api.routers.graphs.MixedQueryProcessor", processor_mock
+        )
+        client.app.dependency_overrides[valid_graph_id] = (
+            lambda: graph_object_mock
+        )
+        client.app.dependency_overrides[get_db] = lambda: AsyncMock()
+        client.app.dependency_overrides[get_user] = lambda: ObjectId()
+        client.app.dependency_overrides[get_llm_client] = lambda: AsyncMock()
+
+        return client.post(
+            f"/graphs/{graph_object_mock.id}/query/stream",
+            json={"query": "Who is Harry's friend?", "return_answer": True},
+        )
+
+    def test_query_stream_successful(
+        self, client, monkeypatch, graph_object_mock
+    ):
+        node = NodeWithId(_id=str(ObjectId()), name="Ron", label="person")
+        triple = TripleWithId(
+            _id=str(ObjectId()),
+            head_node=node,
+            relation=RelationOut(name="friends with"),
+            tail_node=node,
+        )
+        query = QueryDocumentModel(
+            _id=ObjectId(),
+            created_by=graph_object_mock.created_by,
+            graph=ObjectId(graph_object_mock.id),
+            query={"content": "Who is Harry's friend?"},
+            response="Ron",
+            triples=[triple],
+            nodes=[node],
+            status="success",
+        )
+
+        response = self._post(
+            client,
+            monkeypatch,
+            graph_object_mock,
+            [
+                ("triples", {"triples": [triple], "nodes": [node]}),
+                ("token", "Ro"),
+                ("token", "n"),
+                ("done", query),
+            ],
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = [
+            (lines[0].removeprefix("event: "), lines[1][len("data: ") :])
+            for lines in (
+                message.split("\n")
+                for message in response.text.strip().split("\n\n")
+            )
+        ]
+        assert [event for event, _ in events] == [
+            "triples",
+            "token",
+            "token",
+            "done",
+        ]
+        assert json.loads(events[0][1])["triples"][0]["_id"] == triple.id
+        assert "".join(json.loads(data) for _, data in events[1:3]) == "Ron"
+        done = json.loads(events[3][1])
+        assert done["_id"] == str(query.id)
+        assert done["response"] == "Ron"
+
+    def test_query_stream_failure(
+        self, client, monkeypatch, graph_object_mock
+    ):
+        response = self._post(
+            client,
+            monkeypatch,
+            graph_object_mock,
+            [("token", "Ro"), ValueError()],
+        )
+        assert response.status_code == 200
+        assert response.text.endswith(
+            'event: error\ndata: {"detail": "Failed to perform graph query."}'
+            "\n\n"
+        )
+
+
 class TestGraphsSimilarNodes:
 
     @pytest.fixture
@@ -1,4 +1,5 @@
-from unittest.mock import AsyncMock
+import json
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from bson import ObjectId
@@ -14,6 +15,7 @@ from whyhow_api.routers.graphs import order_query
 from whyhow_api.schemas.base import get_utc_now
 from whyhow_api.schemas.chunks import ChunksOutWithWorkspaceDetails
 from whyhow_api.schemas.graphs import DetailedGraphDocumentModel
+from whyhow_api.schemas.tasks import TaskDocumentModel
 from whyhow_api.schemas.triples import TripleDocumentModel, TripleOut
 
 
@@ -405,7 +407,9 @@ class TestTriplesCreate:
         self, client, create_triple_body
     ):
         fake_db = AsyncMock()
-        fake_db.node.find_one.return_value = None
+        mock_cursor = AsyncMock()
+        mock_cursor.__aiter__.return_value = iter([])
+        fake_db.node.find = MagicMock(return_value=mock_cursor)
 
         client.app.dependency_overrides[get_db] = lambda: fake_db
         client.app.dependency_overrides[get_db_client] = lambda: AsyncMock()
@@ -419,6 +423,85 @@ class TestTriplesCreate:
         assert data["detail"] == "Node not found."
 
 
+class TestTriplesCreateStream:
+
+    @pytest.fixture
+    def stream_body(self):
+        triple = {
+            "head_node": {"name": "Harry", "type": "Person"},
+            "tail_node": {"name": "Ron", "type": "Person"},
+            "type": "friends with",
+        }
+        return "\n".join(json.dumps(triple) for _ in range(3)) + "\n"
+
+    @pytest.fixture(autouse=True)
+    def dependencies(self, client):
+        client.app.dependency_overrides[get_db] = lambda: AsyncMock()
+        client.app.dependency_overrides[get_db_client] = lambda: AsyncMock()
+        client.app.dependency_overrides[get_user] = lambda: ObjectId()
+        client.app.dependency_overrides[get_llm_client] = lambda: AsyncMock()
+
+    def test_create_triples_stream_successful(
+        self, client, monkeypatch, stream_body
+    ):
+        received = []
+
+        async def fake_stream(**kwargs):
+            async for batch in kwargs["batches"]:
+                received.append(batch)
+            return TaskDocumentModel(
+                _id=ObjectId(), created_by=ObjectId(), status="pending"
+            )
+
+        monkeypatch.setattr(
+            "whyhow_api.routers.triples.graph_service."
+            "create_or_update_graph_from_triple_stream",
+            fake_stream,
+        )
+
+        response = client.post(
+            f"/triples/stream?graph={ObjectId()}",
+            content=stream_body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["task"]["status"] == "pending"
+        assert [len(batch) for batch in received] == [3]
+        assert received[0][0].head_node.name == "Harry"
+
+    def test_create_triples_stream_invalid_line(self, client, monkeypatch):
+        async def fake_stream(**kwargs):
+            async for _ in kwargs["batches"]:
+                pass
+
+        monkeypatch.setattr(
+            "whyhow_api.routers.triples.graph_service."
+            "create_or_update_graph_from_triple_stream",
+            fake_stream,
+        )
+
+        response = client.post(
+            f"/triples/stream?graph={ObjectId()}",
+            content='{"head_node": "not an id"\n',
+        )
+
+        assert response.status_code == 400
+        assert "line 1" in response.json()["detail"]
+
+    def test_create_triples_stream_graph_not_found(self, client):
+        fake_db = AsyncMock()
+        fake_db.graph.find_one.return_value = None
+        client.app.dependency_overrides[get_db] = lambda: fake_db
+
+        response = client.post(
+            f"/triples/stream?graph={ObjectId()}", content=""
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Graph not found."
+
+
 class TestTriplesDelete:
 
     def test_delete_tripple_not_found(self, client, monkeypatch):
@@ -20,10 +20,13 @@ from whyhow_api.services.crud.chunks import (
     create_structured_chunks,
     create_unstructured_chunks,
     delete_chunk,
+    get_chunks,
+    get_chunks_with_ws_and_doc_details,
     perform_node_chunk_unassignment,
     perform_triple_chunk_unassignment,
     prepare_chunks,
     process_structured_chunks,
+    split_chunk_embeddings,
     split_text_into_chunks,
     update_chunk,
     validate_and_convert,
@@ -77,8 +80,12 @@ async def test_delete_chunk_success():
     )
     db.chunk.find_one = AsyncMock(return_value=fake_chunk.model_dump())
     db.chunk.delete_one = AsyncMock(return_value=None)
+    graph_id = ObjectId()
+    db.node.distinct = AsyncMock(return_value=[graph_id])
     db.node.update_many = AsyncMock(return_value=None)
+    db.triple.distinct = AsyncMock(return_value=[graph_id])
     db.triple.update_many = AsyncMock(return_value=None)
+    db.graph.update_many = AsyncMock(return_value=None)
 
     session = MagicMock()
     session.start_transaction.return_value = AsyncMock()
@@ -99,6 +106,12 @@ async def test_delete_chunk_success():
     db.chunk.delete_one.assert_awaited_once_with(
         {"_id": fake_chunk_id, "created_by": user_id}, session=session
     )
+    # The graphs of the nodes and triples of the chunk are changed
+    db.graph.update_many.assert_awaited_with(
+        {"_id": {"$in": [graph_id]}},
+        {"$inc": {"content_version": 1}},
+        session=session,
+    )
     session.commit_transaction.assert_awaited_once()
 
 
@@ -112,7 +125,9 @@ async def test_delete_chunk_not_found():
     db.triple.aggregate.return_value.to_list = AsyncMock(return_value=[])
     db.chunk.find_one = AsyncMock(return_value=None)
     db.chunk.delete_one = AsyncMock(return_value=None)
+    db.node.distinct = AsyncMock(return_value=[])
     db.node.update_many = AsyncMock(return_value=None)
+    db.triple.distinct = AsyncMock(return_value=[])
     db.triple.update_many = AsyncMock(return_value=None)
 
     session = MagicMock()
@@ -746,6 +761,7 @@ async def test_perform_node_chunk_unassignment_success():
 
     # Assign the mock collection to the 'node' attribute of the mock database
     mock_db.node = mock_collection
+    mock_db.node.distinct = AsyncMock(return_value=[])
     mock_db.node.update_many = AsyncMock(return_value=None)
 
     # Call the function
@@ -778,7 +794,10 @@ async def test_perform_node_triple_unassignment_success():
 
     mock_collection = MagicMock()
     mock_db.triple = mock_collection
+    graph_id = ObjectId()
+    mock_db.triple.distinct = AsyncMock(return_value=[graph_id])
     mock_db.triple.update_many = AsyncMock(return_value=None)
+    mock_db.graph = MagicMock(update_many=AsyncMock(return_value=None))
 
     # Call the function
     await perform_triple_chunk_unassignment(
@@ -793,6 +812,12 @@ async def test_perform_node_triple_unassignment_success():
         {"$pull": {"chunks": {"$in": mock_chunk_ids_to_delete}}},
         session=mock_session,
     )
+    # Answers cached with the chunks of the triples are no longer served
+    mock_db.graph.update_many.assert_awaited_once_with(
+        {"_id": {"$in": [graph_id]}},
+        {"$inc": {"content_version": 1}},
+        session=mock_session,
+    )
 
 
 @pytest.mark.asyncio
@@ -985,6 +1010,184 @@ async def test_add_chunks(monkeypatch):
     mock_db.chunk.bulk_write.assert_called_once_with(expected_operations)
 
 
+@pytest.fixture
+def chunk_embedding_settings(monkeypatch):
+    mock_settings = MagicMock()
+    mock_settings.mongodb.chunk_embedding_collection = True
+    mock_settings.mongodb.embedding_storage_format = "array"
+    monkeypatch.setattr(
+        "whyhow_api.services.crud.chunks.settings", mock_settings
+    )
+    return mock_settings
+
+
+def test_split_chunk_embeddings(chunk_embedding_settings):
+    user_id, document_id, workspace_id = ObjectId(), ObjectId(), ObjectId()
+    documents = [
+        {
+            "_id": ObjectId(),
+            "created_by": user_id,
+            "document": document_id,
+            "workspaces": [workspace_id],
+            "data_type": "string",
+            "embedding": [0.1],
+        },
+        {"_id": ObjectId(), "created_by": user_id},
+    ]
+
+    embedding_documents = split_chunk_embeddings(documents)
+
+    assert embedding_documents == [
+        {
+            "_id": documents[0]["_id"],
+            "created_by": user_id,
+            "document": document_id,
+            "workspaces": [workspace_id],
+            "data_type": "string",
+            "embedding": [0.1],
+        }
+    ]
+    assert "embedding" not in documents[0]
+
+
+def test_split_chunk_embeddings_disabled():
+    documents = [{"_id": ObjectId(), "embedding": [0.1]}]
+
+    assert split_chunk_embeddings(documents) == []
+    assert documents[0]["embedding"] == [0.1]
+
+
+@pytest.mark.asyncio
+async def test_add_chunks_embedding_collection(
+    monkeypatch, chunk_embedding_settings
+):
+    monkeypatch.setattr(
+        "whyhow_api.services.crud.chunks.embed_texts",
+        AsyncMock(return_value=[[0.1, 0.1]]),
+    )
+    chunk = ChunkDocumentModel(
+        content="Test content",
+        data_type="string",
+        created_by=ObjectId(),
+        metadata=ChunkMetadata(
+            language="en", size=10, data_source_type="manual"
+        ),
+        workspaces=[ObjectId()],
+    )
+
+    mock_db = MagicMock()
+    mock_db.chunk.bulk_write = AsyncMock()
+    mock_db.chunk.find.return_value.to_list = AsyncMock(return_value=[])
+    mock_db["chunk_embedding"].insert_many = AsyncMock()
+
+    await add_chunks(db=mock_db, llm_client=AsyncMock(), chunks=[chunk])
+
+    embedding_documents = mock_db["chunk_embedding"].insert_many.call_args
+    assert embedding_documents.args[0] == [
+        {
+            "_id": chunk.id,
+            "created_by": chunk.created_by,
+            "document": None,
+            "workspaces": chunk.workspaces,
+            "data_type": "string",
+            "embedding": [0.1, 0.1],
+        }
+    ]
+    operations = mock_db.chunk.bulk_write.call_args.args[0]
+    assert "embedding" not in operations[0]._doc
+
+
+@pytest.mark.asyncio
+async def test_get_chunks_seed_concept_embedding_collection(
+    monkeypatch, chunk_embedding_settings
+):
+    monkeypatch.setattr(
+        "whyhow_api.services.crud.chunks.embed_texts",
+        AsyncMock(return_value=[[0.1, 0.1]]),
+    )
+    user_id, workspace_id, similar_id = ObjectId(), ObjectId(), ObjectId()
+
+    collection = MagicMock()
+    embeddings = collection.database["chunk_embedding"]
+    embeddings.aggregate.return_value.to_list = AsyncMock(
+        return_value=[{"_id": similar_id}]
+    )
+    collection.aggregate.return_value.to_list = AsyncMock(return_value=[])
+
+    await get_chunks(
+        collection=collection,
+        user_id=user_id,
+        llm_client=MagicMock(),
+        filters={
+            "workspaces": workspace_id,
+            "data_type": "string",
+            "seed_concept": "magic",
+        },
+        populate=False,
+    )
+
+    # The vector search is filtered in the index, without loading chunks
+    collection.find.assert_not_called()
+    vector_search = embeddings.aggregate.call_args.args[0][0]["$vectorSearch"]
+    assert vector_search["index"] == "chunk_embedding_vector_index"
+    assert vector_search["filter"] == {
+        "created_by": {"$eq": user_id},
+        "workspaces": workspace_id,
+        "data_type": "string",
+    }
+    pipeline = collection.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$match": {"_id": {"$in": [similar_id]}}}
+
+
+@pytest.mark.asyncio
+async def test_get_chunks_with_details_embedding_collection(
+    chunk_embedding_settings,
+):
+    db = MagicMock()
+    db["chunk"].aggregate.return_value.to_list = AsyncMock(
+        return_value=[{"chunks": [], "totalCount": 0}]
+    )
+
+    await get_chunks_with_ws_and_doc_details(
+        db=db, user_id=ObjectId(), include_embeddings=True
+    )
+
+    pipeline = db["chunk"].aggregate.call_args.args[0]
+    chunk_stages = next(
+        stage["$facet"]["chunks"] for stage in pipeline if "$facet" in stage
+    )
+    # Embeddings are looked up for the returned page of chunks only
+    assert chunk_stages[3]["$lookup"]["from"] == "chunk_embedding"
+    assert chunk_stages[4] == {
+        "$set": {"embedding": {"$first": "$embedding.embedding"}}
+    }
+
+
+@pytest.mark.asyncio
+async def test_assign_chunks_embedding_collection(chunk_embedding_settings):
+    user_id, workspace_id, chunk_id = ObjectId(), ObjectId(), ObjectId()
+    db = MagicMock()
+    db.chunk.find.return_value.to_list = AsyncMock(
+        return_value=[{"_id": chunk_id, "workspaces": []}]
+    )
+    db.chunk.bulk_write = AsyncMock()
+    db["chunk_embedding"].update_many = AsyncMock()
+
+    await assign_chunks_to_workspace(
+        db=db,
+        chunk_ids=[chunk_id],
+        workspace_id=workspace_id,
+        user_id=user_id,
+    )
+
+    # The workspaces filtering the vector search follow the chunks
+    db["chunk_embedding"].update_many.assert_awaited_once_with(
+        {"_id": {"$in": [chunk_id]}, "created_by": user_id},
+        {"$push": {"workspaces": workspace_id}},
+        session=None,
+    )
+
+
 @pytest.mark.asyncio
 async def test_add_chunks_bulk_write_error():
     pass
@@ -0,0 +1,102 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from whyhow_api.models.common import (
+    SchemaEntity,
+    SchemaRelation,
+    SchemaTriplePattern,
+)
+from whyhow_api.services.crud.extraction import (
+    get_extracted_chunk_ids,
+    hash_pattern,
+    record_extractions,
+)
+
+
+def make_pattern(
+    description: str = "A person runs a company",
+) -> SchemaTriplePattern:
+    return SchemaTriplePattern(
+        head=SchemaEntity(name="person", description="A person"),
+        relation=SchemaRelation(name="runs", description="Runs"),
+        tail=SchemaEntity(name="company", description="A company"),
+        description=description,
+    )
+
+
+def test_hash_pattern():
+    assert hash_pattern(make_pattern()) == hash_pattern(make_pattern())
+    assert hash_pattern(make_pattern()) != hash_pattern(
+        make_pattern("A person manages a company")
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_extracted_chunk_ids():
+    graph_id, user_id = ObjectId(), ObjectId()
+    chunk_1, chunk_2 = ObjectId(), ObjectId()
+    db = MagicMock()
+    db.extraction.find.return_value.distinct = AsyncMock(
+        return_value=[chunk_1]
+    )
+
+    result = await get_extracted_chunk_ids(
+        db, graph_id, user_id, "hash", "gpt-4o", [chunk_1, chunk_2, chunk_2]
+    )
+
+    assert result == {chunk_1}
+    query = db.extraction.find.call_args.args[0]
+    assert query["pattern_hash"] == "hash"
+    assert query["model"] == "gpt-4o"
+    assert sorted(query["chunk"]["$in"]) == sorted([chunk_1, chunk_2])
+
+
+@pytest.mark.asyncio
+async def test_get_extracted_chunk_ids_empty():
+    db = MagicMock()
+
+    result = await get_extracted_chunk_ids(
+        db, ObjectId(), ObjectId(), "hash", "gpt-4o", []
+    )
+
+    assert result == set()
+    db.extraction.find.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_record_extractions():
+    graph_id, user_id = ObjectId(), ObjectId()
+    chunk_1, chunk_2 = ObjectId(), ObjectId()
+    db = MagicMock()
+    db.extraction.bulk_write = AsyncMock()
+
+    await record_extractions(
+        db,
+        graph_id,
+        user_id,
+        "gpt-4o",
+        {"hash_1": [chunk_1, chunk_2], "hash_2": [chunk_1]},
+    )
+
+    operations = db.extraction.bulk_write.call_args.args[0]
+    assert len(operations) == 3
+    assert {
+        (o._filter["pattern_hash"], o._filter["chunk"]) for o in operations
+    } == {
+        ("hash_1", chunk_1),
+        ("hash_1", chunk_2),
+        ("hash_2", chunk_1),
+    }
+    assert all(o._upsert for o in operations)
+
+
+@pytest.mark.asyncio
+async def test_record_extractions_empty():
+    db = MagicMock()
+    db.extraction.bulk_write = AsyncMock()
+
+    await record_extractions(db, ObjectId(), ObjectId(), "gpt-4o", {})
+
+    db.extraction.bulk_write.assert_not_awaited()
@@ -141,11 +141,16 @@ async def test_get_nodes_by_ids():
 @pytest.mark.asyncio
 @patch("whyhow_api.services.crud.node.update_one", new_callable=AsyncMock)
 @patch(
-    "whyhow_api.services.crud.node.update_triple_embeddings",
+    "whyhow_api.services.crud.node.mark_triples_stale",
+    new_callable=AsyncMock,
+    return_value=1,
+)
+@patch(
+    "whyhow_api.services.crud.node.reembed_stale_triples",
     new_callable=AsyncMock,
 )
 async def test_update_node_success(
-    mock_update_triple_embeddings, mock_update_one
+    mock_reembed_stale_triples, mock_mark_triples_stale, mock_update_one
 ):
     fake_node_id = ObjectId()
     user_id = ObjectId()
@@ -166,14 +171,12 @@ async def test_update_node_success(
     llm_client = MagicMock(spec=LLMClient)
 
     db = MagicMock()
-    db.triple.find.return_value.to_list = AsyncMock(
-        return_value=[{"_id": ObjectId()}]
-    )
     update_one_return = MagicMock()
     fake_updated_node = fake_node.copy()
     fake_updated_node.update(updated_node_data)
     update_one_return.model_dump.return_value = fake_updated_node
     mock_update_one.return_value = update_one_return
+    db.graph.update_many = AsyncMock()
 
     session = MagicMock()
     session.start_transaction.return_value = AsyncMock()
@@ -201,8 +204,20 @@ async def test_update_node_success(
         user_id=user_id,
         session=session,
     )
-    db.triple.find.assert_called_once()
-    mock_update_triple_embeddings.assert_called_once()
+    mock_mark_triples_stale.assert_awaited_once_with(
+        db=db, user_id=user_id, node_ids=[fake_node_id], session=session
+    )
+    mock_reembed_stale_triples.assert_awaited_once_with(
+        db=db,
+        llm_client=llm_client,
+        user_id=user_id,
+        node_ids=[fake_node_id],
+    )
+    db.graph.update_many.assert_awaited_once_with(
+        {"_id": {"$in": [fake_node["graph"]]}},
+        {"$inc": {"content_version": 1}},
+        session=None,
+    )
 
     assert result.name == updated_node_data["name"]
     assert result.type == updated_node_data["type"]
@@ -214,11 +229,16 @@ async def test_update_node_success(
 @pytest.mark.asyncio
 @patch("whyhow_api.services.crud.node.update_one", new_callable=AsyncMock)
 @patch(
-    "whyhow_api.services.crud.node.update_triple_embeddings",
+    "whyhow_api.services.crud.node.mark_triples_stale",
+    new_callable=AsyncMock,
+    return_value=1,
+)
+@patch(
+    "whyhow_api.services.crud.node.reembed_stale_triples",
     new_callable=AsyncMock,
 )
 async def test_update_node_not_found(
-    mock_update_triple_embeddings, mock_update_one
+    mock_reembed_stale_triples, mock_mark_triples_stale, mock_update_one
 ):
     fake_node_id = ObjectId()
     user_id = ObjectId()
@@ -241,7 +261,6 @@ async def test_update_node_not_found(
 
     db = MagicMock()
     mock_update_one.return_value = None
-    db.triple.find.return_value.to_list = AsyncMock(return_value=[])
 
     session = MagicMock()
     session.start_transaction.return_value = AsyncMock()
@@ -258,18 +277,24 @@ async def test_update_node_not_found(
         )
 
     mock_update_one.assert_called_once()
-    db.triple.find.assert_not_called()
+    mock_mark_triples_stale.assert_not_awaited()
+    mock_reembed_stale_triples.assert_not_awaited()
     session.commit_transaction.assert_not_awaited()
 
 
 @pytest.mark.asyncio
 @patch("whyhow_api.services.crud.node.update_one", new_callable=AsyncMock)
 @patch(
-    "whyhow_api.services.crud.node.update_triple_embeddings",
+    "whyhow_api.services.crud.node.mark_triples_stale",
     new_callable=AsyncMock,
+    return_value=1,
 )
-async def test_update_node_with_triples(
-    mock_update_triple_embeddings, mock_update_one
+@patch(
+    "whyhow_api.services.crud.node.reembed_stale_triples",
+    new_callable=AsyncMock,
+)
+async def test_update_node_in_background(
+    mock_reembed_stale_triples, mock_mark_triples_stale, mock_update_one
 ):
     fake_node_id = ObjectId()
     user_id = ObjectId()
@@ -286,19 +311,13 @@ async def test_update_node_with_triples(
         "type": "updated type",
         "properties": {"key": "value"},
     }
-    triple_1 = {
-        "_id": ObjectId(),
-        "head_node": fake_node_id,
-        "tail_node": ObjectId(),
-    }
-
     db = MagicMock()
-    db.triple.find.return_value.to_list = AsyncMock(return_value=[triple_1])
     update_one_return = MagicMock()
     fake_updated_node = fake_node.copy()
     fake_updated_node.update(updated_node_data)
     update_one_return.model_dump.return_value = fake_updated_node
     mock_update_one.return_value = update_one_return
+    db.graph.update_many = AsyncMock()
 
     session = MagicMock()
     session.start_transaction.return_value = AsyncMock()
@@ -316,8 +335,17 @@ async def test_update_node_with_triples(
     update.properties = updated_node_data["properties"]
     update.graph = fake_node["graph"]
 
+    background_tasks = MagicMock()
+
     result = await update_node(
-        db, db_client, llm_client, user_id, fake_node_id, node, update
+        db,
+        db_client,
+        llm_client,
+        user_id,
+        fake_node_id,
+        node,
+        update,
+        background_tasks=background_tasks,
     )
 
     mock_update_one.assert_awaited_once_with(
@@ -328,21 +356,12 @@ async def test_update_node_with_triples(
         user_id=user_id,
         session=session,
     )
-    db.triple.find.assert_called_once_with(
-        {
-            "$or": [
-                {"head_node": fake_node_id, "created_by": user_id},
-                {"tail_node": fake_node_id, "created_by": user_id},
-            ]
-        }
-    )
-    mock_update_triple_embeddings.assert_awaited_once_with(
-        db=db,
-        triple_ids=[ObjectId(triple_1["_id"])],
-        llm_client=llm_client,
-        user_id=user_id,
-        session=session,
-    )
+    mock_mark_triples_stale.assert_awaited_once()
+    # Stale triples are re-embedded once the response is sent
+    mock_reembed_stale_triples.assert_not_awaited()
+    background_tasks.add_task.assert_called_once()
+    await background_tasks.add_task.call_args.args[0]()
+    mock_reembed_stale_triples.assert_awaited_once()
 
     assert result.name == updated_node_data["name"]
     assert result.type == updated_node_data["type"]
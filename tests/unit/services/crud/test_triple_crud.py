@@ -3,9 +3,16 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from bson import ObjectId
 
+from whyhow_api.exceptions import NotFoundException
 from whyhow_api.models.common import LLMClient
+from whyhow_api.schemas.triples import TripleCreate
 from whyhow_api.services.crud.triple import (
     delete_triple,
+    mark_triples_stale,
+    reembed_stale_triples,
+    resolve_triples,
+    triple_embedding_text,
+    triple_text_hash,
     update_triple_embeddings,
 )
 
@@ -34,66 +41,143 @@ async def test_delete_triple():
     )
 
 
+def make_resolved_triple(head: str, **kwargs):
+    return {
+        "_id": ObjectId(),
+        "head": head,
+        "head_type": "Person",
+        "head_properties": {},
+        "relation": "knows",
+        "relation_properties": {},
+        "tail": "Ron",
+        "tail_type": "Person",
+        "tail_properties": {},
+        "embedding_version": 2,
+        **kwargs,
+    }
+
+
 @pytest.mark.asyncio
-@patch("whyhow_api.services.crud.triple.embed_triples", new_callable=AsyncMock)
-@patch("whyhow_api.services.crud.triple.UpdateOne", new_callable=MagicMock)
-async def test_update_triple_embeddings(mock_update_one, mock_embed_triples):
-    triple_ids = [ObjectId(), ObjectId()]
+@patch("whyhow_api.services.crud.triple.embed_texts", new_callable=AsyncMock)
+async def test_update_triple_embeddings(mock_embed_texts):
+    first = make_resolved_triple("Harry")
+    second = make_resolved_triple("Hermione")
     user_id = ObjectId()
-    mock_triples = [
-        {
-            "head": "head1",
-            "head_type": "type1",
-            "head_properties": {"key1": "value1"},
-            "relation": "relation1",
-            "relation_properties": {"rel_key": "rel_value"},
-            "tail": "tail1",
-            "tail_type": "type2",
-            "tail_properties": {"key2": "value2"},
-        },
-        {
-            "head": "head2",
-            "head_type": "type3",
-            "head_properties": {"key3": "value3"},
-            "relation": "relation2",
-            "relation_properties": {"rel_key2": "rel_value2"},
-            "tail": "tail2",
-            "tail_type": "type4",
-            "tail_properties": {"key4": "value4"},
-        },
-    ]
-
-    llm_client = MagicMock(spec=LLMClient)
 
     db = MagicMock()
+    # Triples are returned in a different order than requested
     db.triple.aggregate.return_value.to_list = AsyncMock(
-        return_value=mock_triples
-    )
-    mock_embed_triples.return_value = ["embedding1", "embedding2"]
-    db.triple.bulk_write = AsyncMock(
-        return_value=MagicMock(matched_count=len(triple_ids))
+        return_value=[second, first]
     )
+    mock_embed_texts.return_value = [[2.0], [1.0]]
+    db.triple.bulk_write = AsyncMock(return_value=MagicMock(matched_count=2))
 
     session = MagicMock()
 
-    await update_triple_embeddings(
-        db, llm_client, triple_ids, user_id, session=session
+    updated = await update_triple_embeddings(
+        db,
+        MagicMock(spec=LLMClient),
+        [first["_id"], second["_id"]],
+        user_id,
+        session=session,
     )
 
+    assert updated == 2
     db.triple.aggregate.assert_called_once()
-    mock_embed_triples.assert_awaited_once()
+    mock_embed_texts.assert_awaited_once()
+    operations = db.triple.bulk_write.call_args.args[0]
+    # Embeddings are written back by ID
+    assert {
+        op._filter["_id"]: op._doc["$set"]["embedding"] for op in operations
+    } == {first["_id"]: [1.0], second["_id"]: [2.0]}
+    # The hash of the embedded text is stored with the embedding
+    assert operations[0]._doc["$set"][
+        "embedding_text_hash"
+    ] == triple_text_hash(triple_embedding_text(second))
+
+
+@pytest.mark.asyncio
+@patch("whyhow_api.services.crud.triple.embed_texts", new_callable=AsyncMock)
+async def test_update_triple_embeddings_pages(mock_embed_texts):
+    triples = [make_resolved_triple(f"Person {i}") for i in range(5)]
+
+    db = MagicMock()
+    db.triple.aggregate.return_value.to_list = AsyncMock(
+        side_effect=[triples[:2], triples[2:4], triples[4:]]
+    )
+    mock_embed_texts.side_effect = lambda texts, **kwargs: [[0.0]] * len(texts)
+    db.triple.bulk_write = AsyncMock(
+        side_effect=[
+            MagicMock(matched_count=2),
+            MagicMock(matched_count=2),
+            MagicMock(matched_count=1),
+        ]
+    )
+
+    updated = await update_triple_embeddings(
+        db,
+        MagicMock(spec=LLMClient),
+        (triple["_id"] for triple in triples),
+        ObjectId(),
+        page_size=2,
+    )
+
+    assert updated == 5
+    assert db.triple.aggregate.call_count == 3
+    assert db.triple.bulk_write.await_count == 3
+
+
+@pytest.mark.asyncio
+@patch("whyhow_api.services.crud.triple.embed_texts", new_callable=AsyncMock)
+async def test_update_triple_embeddings_missing(mock_embed_texts):
+    triple = make_resolved_triple("Harry")
+
+    db = MagicMock()
+    db.triple.aggregate.return_value.to_list = AsyncMock(return_value=[triple])
+    mock_embed_texts.return_value = [[0.0]]
+    db.triple.bulk_write = AsyncMock(return_value=MagicMock(matched_count=1))
+
+    with pytest.raises(ValueError, match="1 triples not found."):
+        await update_triple_embeddings(
+            db,
+            MagicMock(spec=LLMClient),
+            [triple["_id"], ObjectId()],
+            ObjectId(),
+        )
+
+    # The triples found are still updated
     db.triple.bulk_write.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-@patch("whyhow_api.services.crud.triple.embed_triples", new_callable=AsyncMock)
-async def test_update_triple_embeddings_no_triples(mock_embed_triples):
+@patch("whyhow_api.services.crud.triple.embed_texts", new_callable=AsyncMock)
+async def test_update_triple_embeddings_not_matched(mock_embed_texts):
+    triple = make_resolved_triple("Harry")
+
+    db = MagicMock()
+    db.triple.aggregate.return_value.to_list = AsyncMock(return_value=[triple])
+    mock_embed_texts.return_value = [[0.0]]
+    db.triple.bulk_write = AsyncMock(return_value=MagicMock(matched_count=0))
+
+    updated = await update_triple_embeddings(
+        db, MagicMock(spec=LLMClient), [triple["_id"]], ObjectId()
+    )
+
+    # A triple marked stale since it was read is skipped
+    assert updated == 0
+    operations = db.triple.bulk_write.call_args.args[0]
+    assert operations[0]._filter["embedding_version"] == 2
+
+
+@pytest.mark.asyncio
+@patch("whyhow_api.services.crud.triple.embed_texts", new_callable=AsyncMock)
+async def test_update_triple_embeddings_no_triples(mock_embed_texts):
     triple_ids = [ObjectId(), ObjectId()]
     user_id = ObjectId()
 
     db = MagicMock()
     db.triple.aggregate.return_value.to_list = AsyncMock(return_value=[])
-    mock_embed_triples.return_value = []
+    mock_embed_texts.return_value = []
 
     session = MagicMock()
 
@@ -103,5 +187,179 @@ async def test_update_triple_embeddings_no_triples(mock_embed_triples):
         )
 
     db.triple.aggregate.assert_called_once()
-    mock_embed_triples.assert_not_called()
+    mock_embed_texts.assert_not_called()
+    db.triple.bulk_write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resolve_triples():
+    node_id = ObjectId()
+    chunk_id = ObjectId()
+    db = MagicMock()
+    mock_cursor = AsyncMock()
+    mock_cursor.__aiter__.return_value = iter(
+        [
+            {
+                "_id": node_id,
+                "name": "Ron",
+                "type": "Person",
+                "properties": {"age": 11},
+            }
+        ]
+    )
+    db.node.find = MagicMock(return_value=mock_cursor)
+    triples = [
+        TripleCreate(
+            head_node={"name": "Harry", "type": "Person"},
+            tail_node=str(node_id),
+            type="friends with",
+            properties={"since": 1991},
+            chunks=[str(chunk_id)],
+        ),
+        TripleCreate(
+            head_node=str(node_id),
+            tail_node={"name": "Hermione", "type": "Person"},
+        ),
+    ]
+
+    result = await resolve_triples(db, triples, ObjectId(), ObjectId())
+
+    # Node references are resolved with a single query
+    db.node.find.assert_called_once()
+    assert db.node.find.call_args.args[0]["_id"] == {"$in": [node_id]}
+    assert (result[0].head, result[0].tail, result[0].tail_type) == (
+        "Harry",
+        "Ron",
+        "Person",
+    )
+    assert result[0].tail_properties == {"age": 11}
+    assert result[0].relation_properties == {
+        "since": 1991,
+        "chunks": [str(chunk_id)],
+    }
+    assert result[1].head == "Ron"
+    # The request body is not mutated
+    assert triples[0].properties == {"since": 1991}
+
+
+@pytest.mark.asyncio
+async def test_resolve_triples_node_not_found():
+    db = MagicMock()
+    mock_cursor = AsyncMock()
+    mock_cursor.__aiter__.return_value = iter([])
+    db.node.find = MagicMock(return_value=mock_cursor)
+    triples = [
+        TripleCreate(head_node={"name": "Harry"}, tail_node=str(ObjectId()))
+    ]
+
+    with pytest.raises(NotFoundException, match="Node not found."):
+        await resolve_triples(db, triples, ObjectId(), ObjectId())
+
+
+@pytest.mark.asyncio
+async def test_mark_triples_stale():
+    user_id = ObjectId()
+    node_id = ObjectId()
+    session = MagicMock()
+    db = MagicMock()
+    db.triple.update_many = AsyncMock(return_value=MagicMock(modified_count=3))
+
+    count = await mark_triples_stale(db, user_id, [node_id], session=session)
+
+    assert count == 3
+    query, update = db.triple.update_many.call_args.args
+    assert query["$or"] == [
+        {"head_node": {"$in": [node_id]}},
+        {"tail_node": {"$in": [node_id]}},
+    ]
+    assert update == {
+        "$set": {"embedding_status": "stale"},
+        "$inc": {"embedding_version": 1},
+    }
+    assert db.triple.update_many.call_args.kwargs["session"] is session
+
+
+@pytest.mark.asyncio
+@patch("whyhow_api.services.crud.triple.embed_texts", new_callable=AsyncMock)
+async def test_reembed_stale_triples(mock_embed_texts):
+    user_id = ObjectId()
+    changed = make_resolved_triple("Harry", embedding_text_hash="outdated")
+    unchanged = make_resolved_triple("Hermione")
+    unchanged["embedding_text_hash"] = triple_text_hash(
+        triple_embedding_text(unchanged)
+    )
+
+    graph_id = ObjectId()
+
+    db = MagicMock()
+    find = db.triple.find.return_value.sort.return_value.limit.return_value
+    find.to_list = AsyncMock(
+        side_effect=[
+            [
+                {"_id": changed["_id"], "graph": graph_id},
+                {"_id": unchanged["_id"], "graph": graph_id},
+            ],
+            [],
+        ]
+    )
+    db.triple.aggregate.return_value.to_list = AsyncMock(
+        return_value=[changed, unchanged]
+    )
+    db.triple.bulk_write = AsyncMock()
+    db.graph.update_many = AsyncMock()
+    mock_embed_texts.return_value = [[0.1, 0.2]]
+
+    count = await reembed_stale_triples(
+        db, MagicMock(spec=LLMClient), user_id, batch_size=2
+    )
+
+    # Only the triple whose text changed is embedded again
+    assert count == 1
+    assert mock_embed_texts.call_args.kwargs["texts"] == [
+        triple_embedding_text(changed)
+    ]
+    # The next page starts after the last triple of the previous one
+    assert db.triple.find.call_args.args[0]["_id"] == {"$gt": unchanged["_id"]}
+
+    operations = db.triple.bulk_write.call_args.args[0]
+    assert [op._filter for op in operations] == [
+        {"_id": changed["_id"], "embedding_version": 2},
+        {"_id": unchanged["_id"], "embedding_version": 2},
+    ]
+    assert operations[0]._doc["$set"] == {
+        "embedding_status": "success",
+        "embedding": [0.1, 0.2],
+        "embedding_text_hash": triple_text_hash(
+            triple_embedding_text(changed)
+        ),
+    }
+    assert operations[1]._doc["$set"] == {"embedding_status": "success"}
+    db.graph.update_many.assert_awaited_once_with(
+        {"_id": {"$in": [graph_id]}},
+        {"$inc": {"content_version": 1}},
+        session=None,
+    )
+
+
+@pytest.mark.asyncio
+@patch("whyhow_api.services.crud.triple.embed_texts", new_callable=AsyncMock)
+async def test_reembed_stale_triples_failure(mock_embed_texts):
+    triple = make_resolved_triple("Harry")
+
+    db = MagicMock()
+    find = db.triple.find.return_value.sort.return_value.limit.return_value
+    find.to_list = AsyncMock(
+        side_effect=[[{"_id": triple["_id"], "graph": ObjectId()}], []]
+    )
+    db.triple.aggregate.return_value.to_list = AsyncMock(return_value=[triple])
+    db.triple.bulk_write = AsyncMock()
+    mock_embed_texts.side_effect = RuntimeError("rate limited")
+
+    count = await reembed_stale_triples(
+        db, MagicMock(spec=LLMClient), ObjectId(), node_ids=[ObjectId()]
+    )
+
+    assert count == 0
+    # The triple is left stale for the next run to retry
     db.triple.bulk_write.assert_not_called()
+    db.graph.update_many.assert_not_called()
@@ -81,6 +81,7 @@ async def test_delete_existed_user(monkeypatch):
     collections = [
         "chunk",
         "document",
+        "extraction",
         "graph",
         "node",
         "query",
@@ -19,6 +19,7 @@ async def test_delete_workspace_success():
     db.node.delete_many = AsyncMock(return_value=None)
     db.triple.delete_many = AsyncMock(return_value=None)
     db.query.delete_many = AsyncMock(return_value=None)
+    db.extraction.delete_many = AsyncMock(return_value=None)
     db.graph.delete_many = AsyncMock(return_value=None)
     db.schema.delete_many = AsyncMock(return_value=None)
     db.document.update_many = AsyncMock(return_value=None)
@@ -43,6 +44,9 @@ async def test_delete_workspace_success():
     db.query.delete_many.assert_awaited_once_with(
         {"graph": {"$in": graph_ids}, "created_by": user_id}, session=session
     )
+    db.extraction.delete_many.assert_awaited_once_with(
+        {"graph": {"$in": graph_ids}, "created_by": user_id}, session=session
+    )
     db.graph.delete_many.assert_awaited_once_with(
         {"_id": {"$in": graph_ids}, "created_by": user_id}, session=session
     )
@@ -1,10 +1,14 @@
 """Tests for the graph service."""
 
-from unittest.mock import AsyncMock, MagicMock
+import asyncio
+from unittest.mock import ANY, AsyncMock, MagicMock
 
+import anyio
 import pytest
 from bson import ObjectId
 
+from whyhow_api.config import Settings
+from whyhow_api.exceptions import ExtractionError, NotFoundException
 from whyhow_api.models.common import (
     EntityField,
     SchemaEntity,
@@ -13,23 +17,36 @@ from whyhow_api.models.common import (
     Triple,
 )
 from whyhow_api.schemas.chunks import ChunkDocumentModel, ChunkMetadata
-from whyhow_api.schemas.nodes import NodeWithIdAndSimilarity
+from whyhow_api.schemas.graphs import QueryGraphRequest
+from whyhow_api.schemas.nodes import NodeWithId, NodeWithIdAndSimilarity
+from whyhow_api.schemas.triples import RelationOut, TripleWithId
 from whyhow_api.services.crud.triple import embed_triples
 from whyhow_api.services.graph_service import (
+    ExtractionLedger,
+    ExtractionScheduler,
     MixedQueryProcessor,
+    StreamingGraphBuild,
+    TripleEmbeddingStage,
+    aggregate_nodes,
+    aggregate_triples,
     apply_rules,
+    chunk_filters_to_triples,
     clusters_pipeline,
+    collect_chunk_ids,
     convert_pattern_to_text,
     convert_triple_to_text,
-    create_node_id_map,
+    create_or_update_graph,
     create_structured_patterns,
     extract_properties_from_fields,
     extract_structured_graph_triples,
+    find_node_refs,
     get_and_separate_chunks_on_data_type,
     get_similar_nodes,
     merge_dicts,
     node_keys,
     triple_key,
+    write_node_batch,
+    write_triple_batch,
 )
 
 
@@ -176,6 +193,114 @@ class TestTripleKey:
         assert result == expected
 
 
+class TestCollectChunkIds:
+
+    def test_collect_chunk_ids(self):
+        chunk_1, chunk_2, chunk_3 = ObjectId(), ObjectId(), ObjectId()
+        triples = [
+            Triple(
+                head="Harry",
+                relation="friends with",
+                tail="Ron",
+                head_properties={"chunks": [chunk_1]},
+                relation_properties={"chunks": [str(chunk_2)]},
+                tail_properties={"chunks": [chunk_1, chunk_3]},
+            ),
+            Triple(head="Ron", relation="friends with", tail="Hermione"),
+        ]
+
+        assert collect_chunk_ids(triples) == {chunk_1, chunk_2, chunk_3}
+
+    def test_collect_chunk_ids_skips_invalid(self):
+        chunk_1 = ObjectId()
+        triples = [
+            Triple(
+                head="Harry",
+                relation="friends with",
+                tail="Ron",
+                head_properties={"chunks": [chunk_1, "invalid"]},
+            )
+        ]
+
+        assert collect_chunk_ids(triples) == {chunk_1}
+
+
+class TestAggregateBatch:
+
+    def test_aggregate_nodes(self):
+        chunk_1, chunk_2 = ObjectId(), ObjectId()
+        triples = [
+            Triple(
+                head="Harry",
+                relation="friends with",
+                tail="Ron",
+                head_properties={"age": 11, "chunks": [chunk_1]},
+            ),
+            Triple(
+                head="Harry",
+                relation="friends with",
+                tail="Hermione",
+                head_properties={"age": 12, "chunks": [chunk_1, chunk_2]},
+            ),
+        ]
+
+        result = aggregate_nodes(triples, {chunk_1, chunk_2})
+
+        assert list(result) == [
+            ("Harry", "Entity"),
+            ("Ron", "Entity"),
+            ("Hermione", "Entity"),
+        ]
+        assert result[("Harry", "Entity")] == (
+            {"age": [11, 12]},
+            [chunk_1, chunk_2],
+        )
+        # Inputs are left untouched
+        assert triples[0].head_properties == {"age": 11, "chunks": [chunk_1]}
+
+    def test_aggregate_triples(self):
+        chunk_1, chunk_2 = ObjectId(), ObjectId()
+        triples = [
+            Triple(
+                head="Harry",
+                relation="friends with",
+                tail="Ron",
+                relation_properties={"since": [1991], "chunks": [chunk_1]},
+            ),
+            Triple(
+                head="Harry",
+                relation="friends with",
+                tail="Ron",
+                relation_properties={"since": [1992], "chunks": [chunk_2]},
+            ),
+            Triple(head="Harry", relation="knows", tail="Ron"),
+        ]
+
+        result = aggregate_triples(triples, {chunk_1, chunk_2})
+
+        assert len(result) == 2
+        assert result[
+            ("Harry", "Entity", "friends with", "Ron", "Entity")
+        ] == ({"since": [1991, 1992]}, [chunk_1, chunk_2])
+        assert result[("Harry", "Entity", "knows", "Ron", "Entity")] == (
+            {},
+            [],
+        )
+
+    def test_aggregate_missing_chunk(self):
+        triples = [
+            Triple(
+                head="Harry",
+                relation="friends with",
+                tail="Ron",
+                relation_properties={"chunks": [ObjectId()]},
+            )
+        ]
+
+        with pytest.raises(NotFoundException):
+            aggregate_triples(triples, set())
+
+
 class TestNodeKeys:
 
     def test_node_keys(self):
@@ -673,14 +798,20 @@ async def test_get_and_separate_chunks_on_data_type_no_chunk_ids():
 
 
 @pytest.mark.asyncio
-async def test_create_node_id_map():
+async def test_find_node_refs():
     # Mock database and cursor
     db = MagicMock()
     mock_cursor = AsyncMock()
 
+    chunk_id = ObjectId()
     example_nodes = [
         {"name": "Node1", "type": "TypeA", "_id": ObjectId()},
-        {"name": "Node2", "type": "TypeB", "_id": ObjectId()},
+        {
+            "name": "Node2",
+            "type": "TypeB",
+            "_id": ObjectId(),
+            "chunks": [chunk_id],
+        },
     ]
 
     # Set up async iteration on the mock cursor
@@ -690,27 +821,160 @@ async def test_create_node_id_map():
     db.node.find = MagicMock(return_value=mock_cursor)
 
     # Call the function with mock data
-    node_names = {"Node1", "Node2"}
-    node_types = {"TypeA", "TypeB"}
+    node_keys = {("Node1", "TypeA"), ("Node2", "TypeB")}
     graph_id = ObjectId()
     user_id = ObjectId()
-    node_id_map = await create_node_id_map(
-        db, node_names, node_types, graph_id, user_id
-    )
+    node_refs = await find_node_refs(db, node_keys, graph_id, user_id)
 
     # Check the results
-    assert len(node_id_map) == 2
-    assert (example_nodes[0]["name"], example_nodes[0]["type"]) in node_id_map
-    assert (
-        node_id_map[(example_nodes[0]["name"], example_nodes[0]["type"])]
-        == example_nodes[0]["_id"]
+    assert node_refs == {
+        ("Node1", "TypeA"): (example_nodes[0]["_id"], []),
+        ("Node2", "TypeB"): (example_nodes[1]["_id"], [chunk_id]),
+    }
+    clauses = db.node.find.call_args.args[0]["$or"]
+    assert sorted((c["name"], c["type"]) for c in clauses) == sorted(node_keys)
+    assert all(
+        c["graph"] == graph_id and c["created_by"] == user_id for c in clauses
     )
 
 
+@pytest.mark.asyncio
+async def test_find_node_refs_empty():
+    db = MagicMock()
+
+    assert await find_node_refs(db, set(), ObjectId(), ObjectId()) == {}
+    db.node.find.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_write_node_batch_unordered():
+    harry_id, ron_id = ObjectId(), ObjectId()
+    db = MagicMock()
+    db.node.bulk_write = AsyncMock(
+        return_value=MagicMock(upserted_count=1, upserted_ids={0: harry_id})
+    )
+    mock_cursor = AsyncMock()
+    mock_cursor.__aiter__.return_value = iter(
+        [{"_id": ron_id, "name": "Ron", "type": "Person", "chunks": []}]
+    )
+    db.node.find = MagicMock(return_value=mock_cursor)
+    session = MagicMock()
+    chunk_id = ObjectId()
+
+    node_refs = await write_node_batch(
+        db,
+        [
+            (("Harry", "Person"), ({"age": 11}, [chunk_id])),
+            (("Ron", "Person"), ({}, [])),
+        ],
+        ObjectId(),
+        ObjectId(),
+        False,
+        session=session,
+    )
+
+    operations = db.node.bulk_write.call_args.args[0]
+    assert len(operations) == 2
+    assert db.node.bulk_write.call_args.kwargs == {
+        "ordered": False,
+        "session": session,
+    }
+    # Inserted IDs come from the write result, only matched nodes are read
+    assert node_refs == {
+        ("Harry", "Person"): (harry_id, [chunk_id]),
+        ("Ron", "Person"): (ron_id, []),
+    }
+    assert db.node.find.call_args.args[0]["$or"][0]["name"] == "Ron"
+
+
+@pytest.mark.asyncio
+async def test_write_triple_batch_captures_ids():
+    graph_id, user_id = ObjectId(), ObjectId()
+    harry_id, ron_id, hermione_id = ObjectId(), ObjectId(), ObjectId()
+    inserted_id, matched_id = ObjectId(), ObjectId()
+    chunk_id = ObjectId()
+    node_refs = {
+        ("Harry", "Person"): (harry_id, [chunk_id]),
+        ("Ron", "Person"): (ron_id, [chunk_id]),
+    }
+
+    db = MagicMock()
+    db.triple.bulk_write = AsyncMock(
+        return_value=MagicMock(upserted_count=1, upserted_ids={1: inserted_id})
+    )
+    node_cursor = AsyncMock()
+    node_cursor.__aiter__.return_value = iter(
+        [{"_id": hermione_id, "name": "Hermione", "type": "Person"}]
+    )
+    db.node.find = MagicMock(return_value=node_cursor)
+    triple_cursor = AsyncMock()
+    triple_cursor.__aiter__.return_value = iter([{"_id": matched_id}])
+    db.triple.find = MagicMock(return_value=triple_cursor)
+
+    triple_ids = await write_triple_batch(
+        db,
+        [
+            (
+                ("Harry", "Person", "friends with", "Ron", "Person"),
+                ({}, []),
+            ),
+            (
+                ("Harry", "Person", "friends with", "Hermione", "Person"),
+                ({}, []),
+            ),
+        ],
+        node_refs,
+        graph_id,
+        user_id,
+        False,
+        session=MagicMock(),
+    )
+
+    assert triple_ids == [inserted_id, matched_id]
+    # Only the node missing from the map is looked up
+    assert [
+        (c["name"], c["type"]) for c in db.node.find.call_args.args[0]["$or"]
+    ] == [("Hermione", "Person")]
+    # Matched triples are looked up by their full upsert key
+    assert db.triple.find.call_args.args[0] == {
+        "$or": [
+            {
+                "head_node": harry_id,
+                "tail_node": ron_id,
+                "type": "friends with",
+                "created_by": user_id,
+                "graph": graph_id,
+            }
+        ]
+    }
+    operations = db.triple.bulk_write.call_args.args[0]
+    assert operations[0]._filter["head_node"] == harry_id
+    assert operations[1]._filter["tail_node"] == hermione_id
+
+
+@pytest.mark.asyncio
+async def test_write_triple_batch_missing_node():
+    db = MagicMock()
+    mock_cursor = AsyncMock()
+    mock_cursor.__aiter__.return_value = iter([])
+    db.node.find = MagicMock(return_value=mock_cursor)
+
+    with pytest.raises(NotFoundException, match="head node"):
+        await write_triple_batch(
+            db,
+            [(("Harry", "Person", "knows", "Ron", "Person"), ({}, []))],
+            {},
+            ObjectId(),
+            ObjectId(),
+            False,
+            session=MagicMock(),
+        )
+
+
 @pytest.mark.asyncio
 async def test_embed_triples(monkeypatch):
     # Mock the LLMClient
-    mock_llm_client = MagicMock()
+    mock_llm_client = MagicMock(embedding_cache=None, embedding_batcher=None)
     mock_llm_client.metadata = MagicMock(
         embedding_name="text-embedding-3-small"
     )
@@ -748,11 +1012,643 @@ async def test_embed_triples(monkeypatch):
         ), "Should be called twice for two batches"
 
 
+@pytest.mark.asyncio
+async def test_triple_embedding_stage(monkeypatch):
+    db = MagicMock()
+    user_id = ObjectId()
+    batches = [[ObjectId(), ObjectId()], [ObjectId()]]
+
+    fake_update_triple_embeddings = AsyncMock()
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.update_triple_embeddings",
+        fake_update_triple_embeddings,
+    )
+
+    stage = TripleEmbeddingStage(
+        db=db,
+        llm_client=MagicMock(),
+        user_id=user_id,
+        concurrency=2,
+        queue_size=1,
+    )
+    stage.start()
+    for batch in batches:
+        await stage.put(batch)
+    await stage.put([])  # Empty batches are not queued
+    await stage.drain()
+
+    assert fake_update_triple_embeddings.await_count == 2
+    embedded_batches = [
+        call.kwargs["triple_ids"]
+        for call in fake_update_triple_embeddings.await_args_list
+    ]
+    assert sorted(embedded_batches, key=len) == sorted(batches, key=len)
+    assert stage.workers == []
+
+
+@pytest.mark.asyncio
+async def test_triple_embedding_stage_failure(monkeypatch):
+    db = MagicMock()
+    db.triple.update_many = AsyncMock()
+    user_id = ObjectId()
+    triple_ids = [ObjectId()]
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.update_triple_embeddings",
+        AsyncMock(side_effect=ValueError("No triples found.")),
+    )
+
+    stage = TripleEmbeddingStage(
+        db=db,
+        llm_client=MagicMock(),
+        user_id=user_id,
+        concurrency=1,
+        queue_size=1,
+    )
+    stage.start()
+    await stage.put(triple_ids)
+
+    with pytest.raises(ValueError, match="Failed to embed 1 triple batch"):
+        await stage.drain()
+
+    db.triple.update_many.assert_awaited_once_with(
+        {
+            "_id": {"$in": triple_ids},
+            "created_by": user_id,
+            "embedding_status": {"$ne": "success"},
+        },
+        {"$set": {"embedding_status": "failed"}},
+    )
+
+
+@pytest.mark.asyncio
+async def test_streaming_graph_build(monkeypatch):
+    written = []
+    triple_ids = [ObjectId()]
+
+    async def fake_run_in_transaction(db_client, write):
+        written.append(write)
+        return triple_ids
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.run_in_transaction",
+        fake_run_in_transaction,
+    )
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.find_existing_ids",
+        AsyncMock(return_value=set()),
+    )
+    fake_update_one = AsyncMock()
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.update_one", fake_update_one
+    )
+    fake_update_triple_embeddings = AsyncMock()
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.update_triple_embeddings",
+        fake_update_triple_embeddings,
+    )
+
+    db = MagicMock()
+    db.task.update_one = AsyncMock()
+    db.graph.update_many = AsyncMock()
+    task_id = ObjectId()
+    build = StreamingGraphBuild(
+        db=db,
+        db_client=MagicMock(),
+        llm_client=MagicMock(),
+        graph_id=ObjectId(),
+        user_id=ObjectId(),
+        settings=Settings(),
+        task_id=task_id,
+    )
+    build.start()
+    for _ in range(3):
+        await build.put(
+            [Triple(head="Harry", relation="friends with", tail="Ron")]
+        )
+    await build.close()
+    assert await build.finish()
+
+    assert len(written) == 3
+    assert build.triple_count == 3
+    # Once per batch and once the embeddings are drained
+    assert db.graph.update_many.await_count == 4
+    assert fake_update_triple_embeddings.await_count == 3
+    db.task.update_one.assert_awaited_with(
+        {"_id": task_id},
+        {
+            "$set": {
+                "end_time": ANY,
+                "status": "success",
+                "result": "Graph constructed",
+            }
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_streaming_graph_build_failure(monkeypatch):
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.run_in_transaction",
+        AsyncMock(side_effect=NotFoundException("Failed to find head node")),
+    )
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.find_existing_ids",
+        AsyncMock(return_value=set()),
+    )
+
+    build = StreamingGraphBuild(
+        db=MagicMock(),
+        db_client=MagicMock(),
+        llm_client=MagicMock(),
+        graph_id=ObjectId(),
+        user_id=ObjectId(),
+        settings=Settings(),
+    )
+    build.start()
+    triples = [Triple(head="Harry", relation="friends with", tail="Ron")]
+    await build.put(triples)
+    # Give the writer a chance to fail the first batch
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    with pytest.raises(NotFoundException):
+        for _ in range(5):
+            await build.put(triples)
+        await build.close()
+    build.cancel()
+
+
+@pytest.mark.asyncio
+async def test_extraction_ledger(monkeypatch):
+    chunk_1, chunk_2, chunk_3 = ObjectId(), ObjectId(), ObjectId()
+    pattern = SchemaTriplePattern(
+        head=SchemaEntity(name="person", description="A person"),
+        relation=SchemaRelation(name="runs", description="Runs"),
+        tail=SchemaEntity(name="company", description="A company"),
+        description="A person runs a company",
+    )
+    fake_get_extracted_chunk_ids = AsyncMock(return_value={chunk_1})
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.get_extracted_chunk_ids",
+        fake_get_extracted_chunk_ids,
+    )
+    fake_record_extractions = AsyncMock()
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.record_extractions",
+        fake_record_extractions,
+    )
+
+    ledger = ExtractionLedger(
+        db=MagicMock(), graph_id=ObjectId(), user_id=ObjectId(), model="m"
+    )
+    assert await ledger.filter_chunk_ids(pattern, [chunk_1, chunk_2]) == [
+        chunk_2
+    ]
+
+    ledger.add(pattern, [chunk_2, chunk_3])
+    ledger.discard(pattern, [chunk_3])
+    await ledger.commit()
+
+    extractions = fake_record_extractions.await_args.kwargs["extractions"]
+    assert list(extractions.values()) == [{chunk_2}]
+
+
+@pytest.mark.asyncio
+async def test_extraction_ledger_not_incremental(monkeypatch):
+    fake_get_extracted_chunk_ids = AsyncMock()
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.get_extracted_chunk_ids",
+        fake_get_extracted_chunk_ids,
+    )
+    chunk_ids = [ObjectId(), ObjectId()]
+
+    ledger = ExtractionLedger(
+        db=MagicMock(),
+        graph_id=ObjectId(),
+        user_id=ObjectId(),
+        model="m",
+        incremental=False,
+    )
+
+    assert await ledger.filter_chunk_ids(MagicMock(), chunk_ids) == chunk_ids
+    fake_get_extracted_chunk_ids.assert_not_awaited()
+
+
+def make_scheduler(**kwargs):
+    rate_limiter = MagicMock()
+    rate_limiter.wait = AsyncMock()
+    return ExtractionScheduler(
+        llm_client=MagicMock(),
+        rate_limiter=rate_limiter,
+        **{
+            "max_concurrency": 2,
+            "max_retries": 2,
+            "retry_base_delay": 0,
+            "retry_max_delay": 0,
+            **kwargs,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_extraction_scheduler_bounded_concurrency(monkeypatch):
+    running, max_running = 0, 0
+
+    async def fake_fetch_triples(chunk, **kwargs):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [chunk.id]
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.OpenAIBuilder.fetch_triples",
+        fake_fetch_triples,
+    )
+    scheduler = make_scheduler()
+    scheduler.start()
+    chunks = [MagicMock(id=i, content="text") for i in range(6)]
+
+    triples = await scheduler.extract(chunks, [MagicMock()])
+    await scheduler.close()
+
+    assert triples == list(range(6))
+    assert max_running == 2
+    assert scheduler.progress.requests_total == 6
+    assert scheduler.progress.requests_completed == 6
+    assert scheduler.progress.triples_extracted == 6
+
+
+@pytest.mark.asyncio
+async def test_extraction_scheduler_retries_request(monkeypatch):
+    fake_fetch_triples = AsyncMock(side_effect=[None, ["triple"]])
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.OpenAIBuilder.fetch_triples",
+        fake_fetch_triples,
+    )
+    scheduler = make_scheduler()
+    scheduler.start()
+
+    triples = await scheduler.extract(
+        [MagicMock(content="text")], [MagicMock()]
+    )
+    await scheduler.close()
+
+    assert triples == ["triple"]
+    assert fake_fetch_triples.await_count == 2
+    assert scheduler.progress.requests_retried == 1
+    assert scheduler.progress.requests_failed == 0
+
+
+@pytest.mark.asyncio
+async def test_extraction_scheduler_gives_up(monkeypatch):
+    fake_fetch_triples = AsyncMock(side_effect=Exception("API error"))
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.OpenAIBuilder.fetch_triples",
+        fake_fetch_triples,
+    )
+    db = MagicMock()
+    db.task.update_one = AsyncMock()
+    task_id = ObjectId()
+    scheduler = make_scheduler(db=db, task_id=task_id)
+    scheduler.start()
+
+    triples = await scheduler.extract(
+        [MagicMock(content="text")], [MagicMock()]
+    )
+    await scheduler.close()
+
+    assert triples == []
+    assert fake_fetch_triples.await_count == 3
+    assert scheduler.progress.requests_failed == 1
+    assert len(scheduler.failed_requests) == 1
+    db.task.update_one.assert_awaited_with(
+        {"_id": task_id},
+        {"$set": {"progress": scheduler.progress.model_dump()}},
+    )
+
+
+@pytest.mark.asyncio
+async def test_extraction_scheduler_priority(monkeypatch):
+    order = []
+
+    async def fake_fetch_triples(chunk, **kwargs):
+        order.append(chunk.id)
+        return []
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.OpenAIBuilder.fetch_triples",
+        fake_fetch_triples,
+    )
+    scheduler = make_scheduler(max_concurrency=1)
+
+    low = asyncio.ensure_future(
+        scheduler.extract(
+            [MagicMock(id="low", content="text")], [MagicMock()], priority=1
+        )
+    )
+    high = asyncio.ensure_future(
+        scheduler.extract(
+            [MagicMock(id="high", content="text")], [MagicMock()], priority=0
+        )
+    )
+    await asyncio.sleep(0)
+    scheduler.start()
+    await asyncio.gather(low, high)
+    await scheduler.close()
+
+    assert order == ["high", "low"]
+
+
+@pytest.mark.asyncio
+async def test_extraction_scheduler_sink(monkeypatch):
+    async def fake_fetch_triples(chunk, **kwargs):
+        return [chunk.id]
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.OpenAIBuilder.fetch_triples",
+        fake_fetch_triples,
+    )
+    sink = AsyncMock()
+    scheduler = make_scheduler()
+    scheduler.start()
+    chunks = [MagicMock(id=i, content="text") for i in range(3)]
+
+    triples = await scheduler.extract(chunks, [MagicMock()], sink=sink)
+    await scheduler.close()
+
+    assert triples == []
+    assert sorted(call.args[0] for call in sink.await_args_list) == [
+        [0],
+        [1],
+        [2],
+    ]
+    assert scheduler.progress.triples_extracted == 3
+
+
+@pytest.mark.asyncio
+async def test_extraction_scheduler_sink_failure(monkeypatch):
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.OpenAIBuilder.fetch_triples",
+        AsyncMock(return_value=["triple"]),
+    )
+    scheduler = make_scheduler()
+    scheduler.start()
+
+    with pytest.raises(NotFoundException):
+        await scheduler.extract(
+            [MagicMock(content="text")],
+            [MagicMock()],
+            sink=AsyncMock(side_effect=NotFoundException("Failed")),
+        )
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "ready,requests_failed", [(True, 0), (False, 0), (True, 1)]
+)
+async def test_create_or_update_graph_streaming(
+    monkeypatch, ready, requests_failed
+):
+    triples = [
+        Triple(head=f"Harry {i}", relation="friends with", tail="Ron")
+        for i in range(5)
+    ]
+
+    async def fake_chunk_filters_to_triples(sink, **kwargs):
+        for triple in triples:
+            await sink([triple])
+        return []
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.chunk_filters_to_triples",
+        fake_chunk_filters_to_triples,
+    )
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.get_graph_rules",
+        AsyncMock(return_value=[]),
+    )
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.get_rate_limiter", MagicMock()
+    )
+    scheduler = MagicMock(close=AsyncMock())
+    scheduler.progress.requests_failed = requests_failed
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.ExtractionScheduler.from_settings",
+        MagicMock(return_value=scheduler),
+    )
+    ledger = MagicMock(commit=AsyncMock())
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.ExtractionLedger",
+        MagicMock(return_value=ledger),
+    )
+    build = MagicMock(
+        put=AsyncMock(),
+        close=AsyncMock(),
+        drain=AsyncMock(),
+        finish=AsyncMock(return_value=ready),
+        error=None if ready else ValueError("Failed to embed"),
+    )
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.StreamingGraphBuild",
+        MagicMock(return_value=build),
+    )
+    fake_build_graph = AsyncMock()
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.build_graph", fake_build_graph
+    )
+    fake_update_one = AsyncMock()
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.update_one", fake_update_one
+    )
+
+    db = MagicMock()
+    db.schema.find_one = AsyncMock(return_value={"patterns": [{}]})
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.SchemaTriplePattern", MagicMock()
+    )
+    settings = MagicMock()
+    settings.api.build_streaming = True
+    settings.api.build_batch_size = 2
+    settings.api.max_patterns = 64
+    settings.api.max_chunk_pattern_product = 512
+    settings.api.completion_cache_enabled = False
+
+    kwargs = dict(
+        db=db,
+        db_client=MagicMock(),
+        llm_client=MagicMock(),
+        user_id=ObjectId(),
+        graph_id=ObjectId(),
+        workspace_id=ObjectId(),
+        schema_id=ObjectId(),
+        settings=settings,
+    )
+    if requests_failed:
+        # Triples missing from failed requests fail the build, keeping
+        # the triples and recording the chunks of the other requests
+        with pytest.raises(ExtractionError, match="were kept"):
+            await create_or_update_graph(**kwargs)
+        assert build.put.await_count == 3
+        build.close.assert_awaited_once()
+        build.drain.assert_awaited_once()
+        build.cancel.assert_not_called()
+        build.finish.assert_not_awaited()
+        ledger.commit.assert_awaited_once()
+        document = fake_update_one.await_args.kwargs["document"]
+        assert document.status == "failed"
+        return
+
+    if ready:
+        await create_or_update_graph(**kwargs)
+    else:
+        # A build that failed to finish fails like a non-streaming one
+        with pytest.raises(ValueError, match="Failed to embed"):
+            await create_or_update_graph(**kwargs)
+
+    assert [call.args[0] for call in build.put.await_args_list] == [
+        triples[:2],
+        triples[2:4],
+        triples[4:],
+    ]
+    build.start.assert_called_once()
+    build.close.assert_awaited_once()
+    build.finish.assert_awaited_once()
+    # Chunks are recorded only once the graph is ready
+    assert ledger.commit.await_count == int(ready)
+    scheduler.close.assert_awaited_once()
+    fake_build_graph.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_chunk_filters_to_triples_pattern_groups(monkeypatch):
+    chunk_1 = MagicMock(id=str(ObjectId()), data_type="string")
+    chunk_2 = MagicMock(id=str(ObjectId()), data_type="string")
+    patterns = [
+        SchemaTriplePattern(
+            head=SchemaEntity(name="person", description="A person"),
+            relation=SchemaRelation(name=relation, description=relation),
+            tail=SchemaEntity(name="company", description="A company"),
+            description=f"A person {relation} a company",
+        )
+        for relation in ["runs", "owns", "founded"]
+    ]
+    retrieved = {
+        convert_pattern_to_text(patterns[0]): [chunk_1],
+        convert_pattern_to_text(patterns[1]): [],
+        convert_pattern_to_text(patterns[2]): [chunk_1, chunk_2],
+    }
+
+    async def fake_get_chunks(filters, **kwargs):
+        if filters["data_type"] == "object":
+            return []
+        return retrieved[filters["seed_concept"]]
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.get_chunks", fake_get_chunks
+    )
+    fake_extract_graph_triples = AsyncMock(return_value=[])
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.extract_graph_triples",
+        fake_extract_graph_triples,
+    )
+    db = MagicMock()
+    db.chunk.find.return_value.to_list = AsyncMock(return_value=[])
+    settings = MagicMock()
+    settings.api.extraction_max_concurrency = 2
+
+    await chunk_filters_to_triples(
+        db=db,
+        filters={},
+        llm_client=MagicMock(),
+        user_id=ObjectId(),
+        workspace_id=ObjectId(),
+        max_chunks=10,
+        settings=settings,
+        patterns=patterns,
+        scheduler=MagicMock(pattern_group_size=2),
+    )
+
+    extracted = {
+        call.kwargs["chunks"][0].id: call.kwargs["patterns"]
+        for call in fake_extract_graph_triples.await_args_list
+    }
+    assert extracted == {
+        chunk_1.id: [patterns[0], patterns[2]],
+        chunk_2.id: [patterns[2]],
+    }
+
+
+@pytest.mark.asyncio
+async def test_chunk_filters_to_triples_ledger_skips_failed(monkeypatch):
+    chunk_1 = MagicMock(id=str(ObjectId()), data_type="string")
+    chunk_2 = MagicMock(id=str(ObjectId()), data_type="string")
+    pattern = SchemaTriplePattern(
+        head=SchemaEntity(name="person", description="A person"),
+        relation=SchemaRelation(name="runs", description="Runs"),
+        tail=SchemaEntity(name="company", description="A company"),
+        description="A person runs a company",
+    )
+
+    async def fake_get_chunks(filters, **kwargs):
+        if filters["data_type"] == "object":
+            return []
+        return [chunk_1, chunk_2]
+
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.get_chunks", fake_get_chunks
+    )
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.extract_graph_triples",
+        AsyncMock(return_value=[]),
+    )
+    monkeypatch.setattr(
+        "whyhow_api.services.graph_service.get_extracted_chunk_ids",
+        AsyncMock(return_value=set()),
+    )
+    db = MagicMock()
+    db.chunk.find.return_value.to_list = AsyncMock(
+        return_value=[
+            {"_id": ObjectId(chunk_1.id)},
+            {"_id": ObjectId(chunk_2.id)},
+        ]
+    )
+    settings = MagicMock()
+    settings.api.extraction_max_concurrency = 2
+    ledger = ExtractionLedger(
+        db=db, graph_id=ObjectId(), user_id=ObjectId(), model="m"
+    )
+    scheduler = MagicMock(
+        pattern_group_size=1,
+        failed_requests=[MagicMock(chunk=chunk_2, patterns=[pattern])],
+    )
+
+    await chunk_filters_to_triples(
+        db=db,
+        filters={},
+        llm_client=MagicMock(),
+        user_id=ObjectId(),
+        workspace_id=ObjectId(),
+        max_chunks=10,
+        settings=settings,
+        patterns=[pattern],
+        scheduler=scheduler,
+        ledger=ledger,
+    )
+
+    assert list(ledger.extracted.values()) == [{ObjectId(chunk_1.id)}]
+
+
 @pytest.mark.asyncio
 async def test_embed_triples_no_triples():
 
     embeddings = await embed_triples(
-        llm_client=AsyncMock(), triples=[], batch_size=1
+        llm_client=AsyncMock(embedding_cache=None, embedding_batcher=None),
+        triples=[],
+        batch_size=1,
     )
 
     assert embeddings == []
@@ -1012,7 +1908,7 @@ class TestMixedQuery:
 
     @pytest.fixture
     def llm_client(self):
-        client_mock = MagicMock()
+        client_mock = MagicMock(embedding_cache=None, embedding_batcher=None)
         client_mock.metadata = MagicMock(
             embedding_name="text-embedding-3-small"
         )
@@ -1071,6 +1967,396 @@ class TestMixedQuery:
         assert nl_query.settings is not None
         assert nl_query.schema_id is not None
 
+    @pytest.fixture
+    def query_processor(
+        self, db, llm_client, graph_id, user_id, workspace_id, schema_id
+    ):
+        db.query.insert_one = AsyncMock()
+        db.node.distinct = AsyncMock(return_value=["person"])
+        db.triple.distinct = AsyncMock(return_value=["friends with"])
+        db.graph.find_one = AsyncMock(return_value={"content_version": 3})
+
+        settings = MagicMock()
+        settings.api.query_cache_similarity_threshold = None
+        settings.api.query_reranker = "llm"
+        processor = MixedQueryProcessor(
+            db=db,
+            graph_id=graph_id,
+            user_id=user_id,
+            workspace_id=workspace_id,
+            llm_client=llm_client,
+            settings=settings,
+            schema_id=schema_id,
+        )
+        processor.query_cache = MagicMock(
+            get=AsyncMock(return_value=None),
+            set=AsyncMock(),
+            similarity_enabled=False,
+        )
+        processor._sim_search = AsyncMock(return_value=[{"_id": "t"}])
+        processor._relevance_check = AsyncMock(return_value=[{"_id": "t"}])
+        processor._summarise = AsyncMock(return_value="Ron")
+        return processor
+
+    @pytest.fixture
+    def triple(self):
+        return TripleWithId(
+            _id=str(ObjectId()),
+            head_node=NodeWithId(
+                _id=str(ObjectId()), name="Harry", label="person"
+            ),
+            relation=RelationOut(name="friends with"),
+            tail_node=NodeWithId(
+                _id=str(ObjectId()), name="Ron", label="person"
+            ),
+        )
+
+    @pytest.fixture
+    def request_(self):
+        return QueryGraphRequest(
+            query="Who is Harry's friend?",
+            entities=["person"],
+            relations=["friends with"],
+            return_answer=True,
+        )
+
+    async def test_query_caches_answer(
+        self, query_processor, triple, request_, graph_id, monkeypatch
+    ):
+        monkeypatch.setattr(
+            "whyhow_api.services.graph_service.list_triples_by_ids",
+            AsyncMock(return_value=[triple]),
+        )
+
+        result = await query_processor.query(request_)
+
+        assert result.response == "Ron"
+        cache_set = query_processor.query_cache.set.await_args.kwargs
+        assert cache_set["graph_id"] == graph_id
+        assert cache_set["version"] == 3
+        assert cache_set["parameters"]["query"] == request_.query
+        assert cache_set["result"]["response"] == "Ron"
+        assert cache_set["result"]["triples"] == [
+            triple.model_dump(by_alias=True)
+        ]
+        assert len(cache_set["result"]["nodes"]) == 2
+        query_processor.db.query.insert_one.assert_awaited_once()
+        written = query_processor.db.query.insert_one.await_args.args[0]
+        assert written["_id"] == result.id
+        assert written["status"] == "success"
+        assert written["response"] == "Ron"
+
+    async def test_query_serves_cached_answer(
+        self, query_processor, triple, request_
+    ):
+        query_processor.query_cache.get.return_value = {
+            "response": "Ron",
+            "triples": [triple.model_dump(by_alias=True)],
+            "nodes": [triple.head_node.model_dump(by_alias=True)],
+        }
+
+        result = await query_processor.query(request_)
+
+        assert result.status == "success"
+        assert result.response == "Ron"
+        assert result.triples == [triple]
+        assert result.nodes == [triple.head_node]
+        query_processor._sim_search.assert_not_awaited()
+        query_processor._relevance_check.assert_not_awaited()
+        query_processor._summarise.assert_not_awaited()
+        query_processor.query_cache.set.assert_not_awaited()
+
+    @pytest.mark.parametrize("similarity_enabled", [True, False])
+    async def test_query_embeds_after_cache_miss(
+        self,
+        query_processor,
+        triple,
+        request_,
+        similarity_enabled,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(
+            "whyhow_api.services.graph_service.list_triples_by_ids",
+            AsyncMock(return_value=[triple]),
+        )
+        query_processor.query_cache.similarity_enabled = similarity_enabled
+        query_processor.query_cache.get.return_value = {
+            "response": "Ron",
+            "triples": [triple.model_dump(by_alias=True)],
+            "nodes": [],
+        }
+        query_processor._embed_query = AsyncMock(return_value=[0.5])
+
+        await query_processor.query(request_)
+
+        # Exact cache hits are served without embedding the query
+        assert query_processor._embed_query.called == similarity_enabled
+
+        query_processor.query_cache.get.return_value = None
+        query_processor._embed_query.reset_mock()
+
+        await query_processor.query(request_)
+
+        query_processor._embed_query.assert_awaited_once_with(request_.query)
+        assert query_processor._sim_search.await_args.kwargs[
+            "query_vector"
+        ] == [0.5]
+
+    async def test_query_writes_in_background(self, query_processor, request_):
+        query_processor.query_cache.get.return_value = {
+            "response": "Ron",
+            "triples": [],
+            "nodes": [],
+        }
+        background_tasks = MagicMock()
+
+        result = await query_processor.query(request_, background_tasks)
+
+        query_processor.db.query.insert_one.assert_not_awaited()
+        background_tasks.add_task.assert_called_once_with(
+            query_processor._write_query, result
+        )
+
+    async def test_stream_query(
+        self, query_processor, triple, request_, monkeypatch
+    ):
+        async def summarise_stream(query, triples, include_chunks):
+            assert [e for e, _ in events] == ["triples"]
+            for token in ["Ro", "n "]:
+                yield token
+
+        query_processor._summarise_stream = summarise_stream
+        monkeypatch.setattr(
+            "whyhow_api.services.graph_service.list_triples_by_ids",
+            AsyncMock(return_value=[triple]),
+        )
+
+        events = []
+        async for event in query_processor.stream_query(request_):
+            events.append(event)
+
+        assert [e for e, _ in events] == ["triples", "token", "token", "done"]
+        assert events[0][1]["triples"] == [triple]
+        assert len(events[0][1]["nodes"]) == 2
+        assert events[3][1].response == "Ron"
+        query_processor._summarise.assert_not_awaited()
+        written = query_processor.db.query.insert_one.await_args.args[0]
+        assert written["status"] == "success"
+        assert written["response"] == "Ron"
+
+    async def test_stream_query_closed_early(self, query_processor, request_):
+        query_processor.query_cache.get.return_value = {
+            "response": "Ron",
+            "triples": [],
+            "nodes": [],
+        }
+
+        stream = query_processor.stream_query(request_)
+        assert (await anext(stream))[0] == "triples"
+        await stream.aclose()
+
+        written = query_processor.db.query.insert_one.await_args.args[0]
+        assert written["status"] == "failed"
+
+    async def test_stream_query_cancelled(
+        self, query_processor, triple, request_, monkeypatch
+    ):
+        async def summarise_stream(query, triples, include_chunks):
+            yield "Ro"
+            await asyncio.Event().wait()
+
+        query_processor._summarise_stream = summarise_stream
+        monkeypatch.setattr(
+            "whyhow_api.services.graph_service.list_triples_by_ids",
+            AsyncMock(return_value=[triple]),
+        )
+        events = []
+
+        # The client disconnects while the answer is streamed, cancelling
+        # the stream like Starlette does
+        with anyio.CancelScope() as scope:
+            async for event in query_processor.stream_query(request_):
+                events.append(event)
+                if len(events) == 2:
+                    scope.cancel()
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+        written = query_processor.db.query.insert_one.await_args.args[0]
+        assert written["status"] == "failed"
+
+    @pytest.mark.parametrize(
+        "setting, requested, expected",
+        [
+            ("local", None, "local"),
+            ("local", "llm", "llm"),
+            ("llm", None, "llm"),
+        ],
+    )
+    async def test_query_reranker(
+        self,
+        query_processor,
+        triple,
+        request_,
+        monkeypatch,
+        setting,
+        requested,
+        expected,
+    ):
+        query_processor.settings.api.query_reranker = setting
+        query_processor.settings.api.query_rerank_min_score = 0.5
+        query_processor.settings.api.query_rerank_top_k = 4
+        query_processor.settings.api.query_rerank_mmr_lambda = 0.7
+        query_processor._sim_search.return_value = [
+            {"_id": "t", "score": 0.9, "embedding": [1.0, 0.0]},
+            {"_id": "u", "score": 0.4, "embedding": [0.0, 1.0]},
+        ]
+        list_triples = AsyncMock(return_value=[triple])
+        monkeypatch.setattr(
+            "whyhow_api.services.graph_service.list_triples_by_ids",
+            list_triples,
+        )
+        request_.reranker = requested
+
+        result = await query_processor.query(request_)
+
+        assert result.query.reranker == expected
+        include_embeddings = query_processor._sim_search.await_args.kwargs[
+            "include_embeddings"
+        ]
+        if expected == "local":
+            assert include_embeddings
+            query_processor._relevance_check.assert_not_awaited()
+            assert list_triples.await_args.kwargs["triple_ids"] == ["t"]
+            summarised = query_processor._summarise.await_args.kwargs
+            assert summarised["triples"] == [{"_id": "t", "score": 0.9}]
+        else:
+            assert not include_embeddings
+            query_processor._relevance_check.assert_awaited_once()
+        assert {"search", "rerank", "answer", "total"} <= set(result.timings)
+        written = query_processor.db.query.insert_one.await_args.args[0]
+        assert written["timings"] == result.timings
+
+    async def test_query_local_reranker_bit_vectors(
+        self, query_processor, triple, request_, monkeypatch
+    ):
+        query_processor.settings.api.query_reranker = "local"
+        query_processor.settings.api.query_rerank_min_score = 0.75
+        query_processor.settings.api.query_rerank_top_k = 1
+        query_processor.settings.api.query_rerank_mmr_lambda = 0.7
+        query_processor.settings.mongodb.embedding_storage_format = "bit"
+        # Euclidean scores, 1 / (1 + distance)
+        query_processor._sim_search.return_value = [
+            {"_id": "t", "score": 0.02},
+            {"_id": "u", "score": 0.05},
+        ]
+        list_triples = AsyncMock(return_value=[triple])
+        monkeypatch.setattr(
+            "whyhow_api.services.graph_service.list_triples_by_ids",
+            list_triples,
+        )
+
+        await query_processor.query(request_)
+
+        # Ranked by score alone, without the cosine minimum score
+        assert not query_processor._sim_search.await_args.kwargs[
+            "include_embeddings"
+        ]
+        assert list_triples.await_args.kwargs["triple_ids"] == ["u"]
+
+    @pytest.mark.parametrize(
+        "entities, relations, type_filter, expected",
+        [
+            (["person", "place"], ["friends with"], True, {}),
+            (
+                ["person"],
+                ["knows"],
+                True,
+                {"type": {"$in": ["knows"]}},
+            ),
+        ],
+    )
+    async def test_plan_triple_filter_pushed_down(
+        self, query_processor, entities, relations, type_filter, expected
+    ):
+        query_processor.settings.mongodb.triple_vector_index_type_filter = (
+            type_filter
+        )
+
+        triple_filter = await query_processor._plan_triple_filter(
+            entities=entities, relations=relations
+        )
+
+        assert triple_filter == expected
+        query_processor.db.node.find.assert_not_called()
+        query_processor.db.triple.find.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "entities, values, type_filter",
+        [
+            (["place"], None, True),
+            (["person"], ["Harry"], True),
+            (["person"], None, False),
+        ],
+    )
+    async def test_plan_triple_filter_pre_filtered(
+        self, query_processor, entities, values, type_filter
+    ):
+        node_id, triple_id = ObjectId(), ObjectId()
+        query_processor.settings.mongodb.triple_vector_index_type_filter = (
+            type_filter
+        )
+        query_processor.db.node.find.return_value.to_list = AsyncMock(
+            return_value=[{"_id": node_id}]
+        )
+        query_processor.db.triple.find.return_value.to_list = AsyncMock(
+            return_value=[{"_id": triple_id}]
+        )
+
+        triple_filter = await query_processor._plan_triple_filter(
+            entities=entities, relations=["knows"], values=values
+        )
+
+        assert triple_filter == {"_id": {"$in": [triple_id]}}
+        assert query_processor.db.triple.find.call_args.args[1] == {"_id": 1}
+
+        query_processor.db.triple.find.return_value.to_list.return_value = []
+        triple_filter = await query_processor._plan_triple_filter(
+            entities=entities, relations=["knows"], values=values
+        )
+
+        assert triple_filter is None
+
+    async def test_sim_search_filter(self, query_processor):
+        query_processor.settings.mongodb.embedding_storage_format = "array"
+        query_processor.db.triple.aggregate = MagicMock(
+            return_value=MagicMock(to_list=AsyncMock(return_value=[]))
+        )
+
+        await MixedQueryProcessor._sim_search(
+            query_processor,
+            query="Who is Harry's friend?",
+            include_chunks=False,
+            triple_filter={"type": {"$in": ["knows"]}},
+            query_vector=[0.1, 0.2],
+        )
+
+        pipeline = query_processor.db.triple.aggregate.call_args.args[0]
+        assert pipeline[0]["$vectorSearch"]["filter"] == {
+            "created_by": {"$eq": query_processor.user_id},
+            "graph": {"$eq": query_processor.graph_id},
+            "type": {"$in": ["knows"]},
+        }
+
+    async def test_query_failure_is_written(self, query_processor, request_):
+        query_processor.query_cache.get.side_effect = RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await query_processor.query(request_)
+
+        written = query_processor.db.query.insert_one.await_args.args[0]
+        assert written["status"] == "failed"
+
 
 @pytest.mark.asyncio
 async def test_apply_rules(monkeypatch):
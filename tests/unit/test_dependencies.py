@@ -8,10 +8,17 @@ from fastapi import HTTPException, Security, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from openai import AsyncAzureOpenAI, AsyncOpenAI
 
+from whyhow_api.config import (
+    Settings,
+    SettingsAPI,
+    SettingsGenerative,
+    SettingsGenerativeOpenAI,
+)
 from whyhow_api.dependencies import (  # get_auth0,
     api_key_header,
     get_db,
     get_db_client,
+    get_embedding_batcher,
     get_llm_client,
     get_user,
     valid_create_graph,
@@ -33,6 +40,9 @@ from whyhow_api.schemas.graphs import (
 from whyhow_api.schemas.nodes import NodeDocumentModel
 from whyhow_api.schemas.schemas import SchemaDocumentModel
 from whyhow_api.schemas.workspaces import WorkspaceDocumentModel
+from whyhow_api.utilities.embedding_batcher import EmbeddingBatcher
+from whyhow_api.utilities.embedding_cache import EmbeddingLRU
+from whyhow_api.utilities.llm_client_pool import LLMClientPool
 
 
 @pytest.fixture
@@ -747,6 +757,24 @@ class TestValidCreateGraph:
 
 @pytest.mark.asyncio
 class TestGetLLMClient:
+    @pytest.fixture(autouse=True)
+    def llm_client_pool(self, monkeypatch):
+        """Fixture to isolate the process-wide LLM client pool."""
+        pool = LLMClientPool(max_size=4)
+        monkeypatch.setattr(
+            "whyhow_api.dependencies.get_llm_client_pool",
+            lambda **kwargs: pool,
+        )
+        monkeypatch.setattr(
+            "whyhow_api.dependencies.get_embedding_lru",
+            lambda max_entries: EmbeddingLRU(10),
+        )
+        monkeypatch.setattr(
+            "whyhow_api.dependencies.get_embedding_batcher",
+            lambda client, embedding_name, settings: EmbeddingBatcher(),
+        )
+        return pool
+
     async def test_get_llm_client_with_valid_openai_provider(
         self, monkeypatch
     ):
@@ -832,8 +860,10 @@ class TestGetLLMClient:
 
         # Check that the correct client is returned
         assert isinstance(llm_client.client, AsyncAzureOpenAI)
-
-        await llm_client.client.close()
+        assert llm_client.embedding_cache is not None
+        assert llm_client.embedding_cache.endpoint == str(
+            llm_client.client.base_url
+        )
 
     async def test_get_llm_client_with_valid_byo_openai_provider(
         self, monkeypatch
@@ -879,6 +909,60 @@ class TestGetLLMClient:
         # Check that the correct client is returned
         assert isinstance(llm_client.client, AsyncOpenAI)
 
+    async def test_get_llm_client_reuses_pooled_client(
+        self, llm_client_pool, monkeypatch
+    ):
+        instrument_openai = MagicMock()
+        monkeypatch.setattr(
+            "whyhow_api.dependencies.logfire.instrument_openai",
+            instrument_openai,
+        )
+        settings_mock = MagicMock()
+        db_mock = AsyncMock()
+
+        def user_document(api_key):
+            return {
+                "_id": ObjectId(),
+                "providers": [
+                    {
+                        "type": "llm",
+                        "value": "byo-openai",
+                        "api_key": api_key,
+                        "metadata": {
+                            "byo-openai": {
+                                "language_model_name": None,
+                                "embedding_name": None,
+                            },
+                            "byo-azure-openai": {
+                                "api_version": None,
+                                "azure_endpoint": None,
+                                "language_model_name": None,
+                                "embedding_name": None,
+                            },
+                        },
+                    }
+                ],
+            }
+
+        db_mock.user.find_one.side_effect = [
+            user_document("api key 1"),
+            user_document("api key 1"),
+            user_document("api key 2"),
+        ]
+
+        clients = [
+            await get_llm_client(
+                user_id=ObjectId(), db=db_mock, settings=settings_mock
+            )
+            for _ in range(3)
+        ]
+
+        assert clients[0].client is clients[1].client
+        assert clients[0].client is not clients[2].client
+        assert len(llm_client_pool.clients) == 2
+        assert instrument_openai.call_count == 2
+        await llm_client_pool.close()
+
     async def test_get_llm_client_with_invalid_provider(self):
         settings_mock = MagicMock()
         settings_mock.generative.openai.api_key.get_secret_value.return_value = (
@@ -936,6 +1020,35 @@ class TestGetLLMClient:
             )
 
 
+def test_get_embedding_batcher(monkeypatch):
+    monkeypatch.setattr(
+        "whyhow_api.dependencies.get_embedding_tokenizer", lambda: None
+    )
+    settings = Settings(
+        api=SettingsAPI(
+            embedding_max_concurrency=3, embedding_batch_max_tokens=1000
+        ),
+        generative=SettingsGenerative(openai=SettingsGenerativeOpenAI(tier=1)),
+    )
+    client = AsyncOpenAI(api_key="test-api-key")
+
+    batcher = get_embedding_batcher(client, None, settings)
+
+    assert batcher.max_concurrency == 3
+    assert batcher.max_batch_tokens == 1000
+    assert batcher.rate_limiter.requests.capacity == 300
+    assert (
+        batcher.rate_limiter is get_embedding_batcher(
+            client, "text-embedding-3-small", settings
+        ).rate_limiter
+    )
+    assert (
+        batcher.rate_limiter is not get_embedding_batcher(
+            client, "byo-deployment", settings
+        ).rate_limiter
+    )
+
+
 # @pytest.mark.skip(reason="Disabling Auth0 tests")
 # @pytest.mark.asyncio
 # class TestGetAuth0:
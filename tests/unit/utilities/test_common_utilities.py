@@ -1,13 +1,17 @@
 import string
-from unittest.mock import AsyncMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock
 
 import pytest
+from bson import ObjectId
 
+from whyhow_api.exceptions import NotFoundException
 from whyhow_api.utilities.common import (
+    check_existing_in,
     compress_triples,
     count_frequency,
     dict_to_tuple,
     embed_texts,
+    find_existing_ids,
     remove_punctuation,
     tuple_to_dict,
 )
@@ -151,7 +155,9 @@ class TestEmbedTexts:
         ]
 
         # Mock the llm_client with AsyncMock
-        llm_client_mock = AsyncMock()
+        llm_client_mock = AsyncMock(
+            embedding_cache=None, embedding_batcher=None
+        )
         # Set the return value of llm_client.client.embeddings.create
         llm_client_mock.client.embeddings.create.return_value = (
             mock_response_data
@@ -178,7 +184,9 @@ class TestEmbedTexts:
         ]
 
         # Mocking the LLM client
-        llm_client_mock = AsyncMock()
+        llm_client_mock = AsyncMock(
+            embedding_cache=None, embedding_batcher=None
+        )
         # Set the return value of llm_client.client.embeddings.create
         llm_client_mock.client.embeddings.create.return_value = (
             mock_response_data
@@ -193,6 +201,82 @@ class TestEmbedTexts:
                 llm_client=llm_client_mock, texts=texts, batch_size=2049
             )
 
+    @pytest.mark.asyncio
+    async def test_embed_texts_cache(self):
+        mock_response_data = Mock()
+        mock_response_data.data = [MockResponse([0.4, 0.5, 0.6])]
+        cache = AsyncMock()
+        cache.get_many.return_value = [[0.1, 0.2, 0.3], None]
+        llm_client_mock = AsyncMock(
+            embedding_cache=cache, embedding_batcher=None
+        )
+        llm_client_mock.metadata.embedding_name = None
+        llm_client_mock.client.embeddings.create.return_value = (
+            mock_response_data
+        )
+
+        embeddings = await embed_texts(llm_client_mock, ["Hello", "World"])
+
+        assert embeddings == [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]]
+        # Only the cache miss is embedded, then cached
+        llm_client_mock.client.embeddings.create.assert_awaited_once_with(
+            input=["World"], model="text-embedding-3-small", dimensions=1536
+        )
+        cache.set_many.assert_awaited_once_with(
+            "text-embedding-3-small", 1536, ["World"], [[0.4, 0.5, 0.6]]
+        )
+
+
+class TestFindExistingIds:
+    @pytest.mark.asyncio
+    async def test_find_existing_ids_single_query(self):
+        id_1, id_2 = ObjectId(), ObjectId()
+        db = MagicMock()
+        db["chunk"].find.return_value.distinct = AsyncMock(return_value=[id_1])
+        user_id = ObjectId()
+
+        found = await find_existing_ids(
+            db, "chunk", [id_1, id_2, id_1], {"created_by": user_id}
+        )
+
+        assert found == {id_1}
+        db["chunk"].find.assert_called_once()
+        query, projection = db["chunk"].find.call_args.args
+        assert set(query["_id"]["$in"]) == {id_1, id_2}
+        assert query["created_by"] == user_id
+        assert projection == {"_id": 1}
+
+    @pytest.mark.asyncio
+    async def test_find_existing_ids_empty(self):
+        db = MagicMock()
+
+        found = await find_existing_ids(db, "chunk", [])
+
+        assert found == set()
+        db["chunk"].find.assert_not_called()
+
+
+class TestCheckExistingIn:
+    def test_check_existing_in_all_found(self):
+        id_1, id_2 = ObjectId(), ObjectId()
+
+        result = check_existing_in("chunk", [str(id_1), id_2], {id_1, id_2})
+
+        assert result == [id_1, id_2]
+
+    def test_check_existing_in_empty(self):
+        assert check_existing_in("chunk", [], set()) == []
+
+    def test_check_existing_in_missing(self):
+        id_1, id_2 = ObjectId(), ObjectId()
+
+        with pytest.raises(NotFoundException, match="Chunk IDs not found"):
+            check_existing_in("chunk", [id_1, id_2], {id_1})
+
+    def test_check_existing_in_invalid(self):
+        with pytest.raises(NotFoundException, match="Invalid Chunk ID"):
+            check_existing_in("chunk", ["invalid"], set())
+
 
 class TestDictToTuple:
     def test_dict_to_tuple_simple(self):
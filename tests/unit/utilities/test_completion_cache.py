@@ -0,0 +1,163 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from whyhow_api.utilities.completion_cache import (
+    CompletionCache,
+    InMemoryCompletionCache,
+    MongoCompletionCache,
+)
+
+REQUEST = {
+    "messages": [{"role": "system", "content": "prompt"}],
+    "model": "gpt-4o",
+    "temperature": 0.0,
+}
+
+
+def test_make_key_is_order_independent():
+    reordered = dict(reversed(list(REQUEST.items())))
+
+    assert CompletionCache.make_key(REQUEST) == CompletionCache.make_key(
+        reordered
+    )
+    assert CompletionCache.make_key(REQUEST) != CompletionCache.make_key(
+        {**REQUEST, "model": "gpt-4o-mini"}
+    )
+
+
+class TestInMemoryCompletionCache:
+    @pytest.mark.asyncio
+    async def test_hit_and_miss(self):
+        cache = InMemoryCompletionCache(ttl_seconds=60, max_entries=10)
+
+        assert await cache.get(REQUEST) is None
+        await cache.set(REQUEST, "content")
+        assert await cache.get(REQUEST) == "content"
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_nonzero_temperature_bypass(self):
+        request = {**REQUEST, "temperature": 0.1}
+        cache = InMemoryCompletionCache(ttl_seconds=60, max_entries=10)
+
+        await cache.set(request, "content")
+        assert await cache.get(request) is None
+        assert cache.entries == {}
+        assert cache.misses == 0
+
+        cache.cache_nonzero_temperature = True
+        await cache.set(request, "content")
+        assert await cache.get(request) == "content"
+
+    @pytest.mark.asyncio
+    async def test_expiry(self, monkeypatch):
+        clock = MagicMock(return_value=100.0)
+        monkeypatch.setattr(
+            "whyhow_api.utilities.completion_cache.time.monotonic", clock
+        )
+        cache = InMemoryCompletionCache(ttl_seconds=60, max_entries=10)
+
+        await cache.set(REQUEST, "content")
+        clock.return_value = 161.0
+
+        assert await cache.get(REQUEST) is None
+        assert cache.entries == {}
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        cache = InMemoryCompletionCache(ttl_seconds=60, max_entries=2)
+        requests = [{**REQUEST, "model": f"model_{i}"} for i in range(3)]
+
+        await cache.set(requests[0], "0")
+        await cache.set(requests[1], "1")
+        await cache.get(requests[0])
+        await cache.set(requests[2], "2")
+
+        assert await cache.get(requests[0]) == "0"
+        assert await cache.get(requests[1]) is None
+        assert await cache.get(requests[2]) == "2"
+
+
+class TestMongoCompletionCache:
+    @pytest.mark.asyncio
+    async def test_get(self):
+        collection = MagicMock()
+        collection.find_one_and_update = AsyncMock(
+            return_value={"content": "content"}
+        )
+        cache = MongoCompletionCache(
+            collection, ttl_seconds=60, max_entries=10
+        )
+
+        assert await cache.get(REQUEST) == "content"
+
+        query = collection.find_one_and_update.call_args.args[0]
+        assert query["_id"] == cache.make_key(REQUEST)
+        assert "$gt" in query["expires_at"]
+
+    @pytest.mark.asyncio
+    async def test_get_error_is_miss(self):
+        collection = MagicMock()
+        collection.find_one_and_update = AsyncMock(side_effect=Exception())
+        cache = MongoCompletionCache(
+            collection, ttl_seconds=60, max_entries=10
+        )
+
+        assert await cache.get(REQUEST) is None
+        assert cache.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_set_evicts_least_recently_used(self):
+        collection = MagicMock()
+        collection.update_one = AsyncMock()
+        collection.estimated_document_count = AsyncMock(return_value=12)
+        collection.find.return_value.to_list = AsyncMock(
+            return_value=[{"_id": "a"}, {"_id": "b"}]
+        )
+        collection.delete_many = AsyncMock()
+        cache = MongoCompletionCache(
+            collection, ttl_seconds=60, max_entries=10
+        )
+
+        await cache.set(REQUEST, "content")
+
+        collection.update_one.assert_awaited_once()
+        assert collection.find.call_args.kwargs == {
+            "sort": [("last_used_at", 1)],
+            "limit": 2,
+        }
+        collection.delete_many.assert_awaited_once_with(
+            {"_id": {"$in": ["a", "b"]}}
+        )
+
+    @pytest.mark.asyncio
+    async def test_set_within_capacity(self):
+        collection = MagicMock()
+        collection.update_one = AsyncMock()
+        collection.estimated_document_count = AsyncMock(return_value=10)
+        collection.delete_many = AsyncMock()
+        cache = MongoCompletionCache(
+            collection, ttl_seconds=60, max_entries=10
+        )
+
+        await cache.set(REQUEST, "content")
+
+        collection.delete_many.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_set_evicts_every_interval(self):
+        collection = MagicMock()
+        collection.update_one = AsyncMock()
+        collection.estimated_document_count = AsyncMock(return_value=10)
+        cache = MongoCompletionCache(
+            collection, ttl_seconds=60, max_entries=10, evict_interval=3
+        )
+
+        for _ in range(7):
+            await cache.set(REQUEST, "content")
+
+        assert collection.update_one.await_count == 7
+        # Checked on the 1st, 4th and 7th writes
+        assert collection.estimated_document_count.await_count == 3
@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+from whyhow_api.utilities.concurrency import gather_or_cancel
+
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel_cancels_pending():
+    cancelled = asyncio.Event()
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def wait():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(ValueError, match="boom"):
+        await gather_or_cancel([wait(), fail()])
+    assert cancelled.is_set()
@@ -0,0 +1,112 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import openai
+import pytest
+
+from whyhow_api.utilities.embedding_batcher import EmbeddingBatcher
+
+
+def make_error(status_code):
+    response = httpx.Response(
+        status_code, request=httpx.Request("POST", "https://api.test")
+    )
+    return openai.APIStatusError("rejected", response=response, body=None)
+
+
+def make_client(fail=lambda texts: False, delay=0, status_code=400):
+    client = MagicMock()
+    calls = []
+
+    async def create(input, model, dimensions):
+        calls.append(list(input))
+        await asyncio.sleep(delay)
+        if fail(input):
+            raise make_error(status_code)
+        return MagicMock(
+            data=[MagicMock(embedding=[float(len(t))]) for t in input]
+        )
+
+    client.embeddings.create = AsyncMock(side_effect=create)
+    return client, calls
+
+
+def test_pack_by_size_and_tokens():
+    batcher = EmbeddingBatcher(max_batch_tokens=10)
+
+    batches = batcher.pack([4, 4, 4, 20, 1, 1, 1], batch_size=2)
+
+    # A text above the token budget is sent on its own
+    assert [list(b) for b in batches] == [[0, 1], [2], [3], [4, 5], [6]]
+
+
+@pytest.mark.asyncio
+async def test_embed_keeps_order():
+    client, calls = make_client()
+    batcher = EmbeddingBatcher(max_batch_tokens=1)
+    texts = ["a", "bb", "ccc", "dddd"]
+
+    embeddings = await batcher.embed(client, texts, "model", 1)
+
+    assert embeddings == [[1.0], [2.0], [3.0], [4.0]]
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_embed_bounded_concurrency():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def create(input, model, dimensions):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock(data=[MagicMock(embedding=[0.0]) for _ in input])
+
+    client = MagicMock()
+    client.embeddings.create = AsyncMock(side_effect=create)
+    rate_limiter = AsyncMock()
+    batcher = EmbeddingBatcher(max_concurrency=2, rate_limiter=rate_limiter)
+
+    await batcher.embed(client, ["text"] * 10, "model", 1, batch_size=1)
+
+    assert max_in_flight == 2
+    assert rate_limiter.wait.await_count == 10
+
+
+@pytest.mark.asyncio
+async def test_embed_splits_failed_batch():
+    client, calls = make_client(fail=lambda texts: len(texts) > 1)
+    batcher = EmbeddingBatcher()
+
+    embeddings = await batcher.embed(client, ["a", "bb", "ccc"], "model", 1)
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert calls[0] == ["a", "bb", "ccc"]
+    assert len(calls) == 5
+
+
+@pytest.mark.asyncio
+async def test_embed_raises_rejected_text():
+    client, _ = make_client(fail=lambda texts: "bad" in texts)
+    batcher = EmbeddingBatcher()
+
+    with pytest.raises(openai.APIStatusError, match="rejected"):
+        await batcher.embed(client, ["a", "bad"], "model", 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status_code", [401, 429])
+async def test_embed_raises_other_errors(status_code):
+    client, calls = make_client(
+        fail=lambda texts: True, status_code=status_code
+    )
+    batcher = EmbeddingBatcher()
+
+    with pytest.raises(openai.APIStatusError):
+        await batcher.embed(client, ["a", "bb", "ccc"], "model", 1)
+    # The batch is not split
+    assert len(calls) == 1
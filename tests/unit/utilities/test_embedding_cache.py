@@ -0,0 +1,112 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from whyhow_api.utilities.embedding_cache import (
+    EmbeddingCache,
+    EmbeddingLRU,
+)
+
+ENDPOINT = "https://api.openai.com/v1/"
+
+
+def make_collection(entries=None):
+    collection = MagicMock()
+    collection.find.return_value.to_list = AsyncMock(
+        return_value=entries or []
+    )
+    collection.bulk_write = AsyncMock()
+    return collection
+
+
+def test_make_key():
+    key = EmbeddingCache.make_key(ENDPOINT, "model", 1024, "text")
+
+    assert key.startswith("model:1024:")
+    assert key != EmbeddingCache.make_key(ENDPOINT, "model", 1536, "text")
+    assert key != EmbeddingCache.make_key(
+        ENDPOINT, "other-model", 1024, "text"
+    )
+    assert key != EmbeddingCache.make_key(
+        ENDPOINT, "model", 1024, "other text"
+    )
+    # Deployments of the same name on other endpoints are kept apart
+    assert key != EmbeddingCache.make_key(
+        "https://other.openai.azure.com/openai/", "model", 1024, "text"
+    )
+
+
+def test_lru_eviction():
+    lru = EmbeddingLRU(max_entries=2)
+    lru.set("a", [0.5])
+    lru.set("b", [0.25])
+    lru.get("a")
+
+    lru.set("c", [0.125])
+
+    assert list(lru.entries) == ["a", "c"]
+    assert lru.get("a") == [0.5]
+    assert lru.get("b") is None
+
+
+class TestEmbeddingCache:
+    @pytest.mark.asyncio
+    async def test_get_many(self):
+        key = EmbeddingCache.make_key(ENDPOINT, "model", 2, "stored")
+        collection = make_collection([{"_id": key, "embedding": [0.5, 1]}])
+        lru = EmbeddingLRU(max_entries=10)
+        lru.set(
+            EmbeddingCache.make_key(ENDPOINT, "model", 2, "in memory"),
+            [1, 0.5],
+        )
+        cache = EmbeddingCache(
+            collection, lru, ttl_seconds=60, endpoint=ENDPOINT
+        )
+
+        embeddings = await cache.get_many(
+            "model", 2, ["in memory", "stored", "missing"]
+        )
+
+        assert embeddings == [[1, 0.5], [0.5, 1], None]
+        assert cache.hits == 2
+        assert cache.misses == 1
+        assert cache.hit_rate == pytest.approx(2 / 3)
+        # Only the texts missing from memory are looked up
+        query = collection.find.call_args.args[0]
+        assert key in query["_id"]["$in"]
+        assert len(query["_id"]["$in"]) == 2
+        # Texts found in the collection are kept in memory
+        assert lru.get(key) == [0.5, 1]
+
+    @pytest.mark.asyncio
+    async def test_get_many_error_is_miss(self):
+        collection = MagicMock()
+        collection.find.side_effect = Exception("boom")
+        cache = EmbeddingCache(
+            collection, EmbeddingLRU(10), ttl_seconds=60, endpoint=ENDPOINT
+        )
+
+        assert await cache.get_many("model", 2, ["text"]) == [None]
+        assert cache.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_set_many(self):
+        collection = make_collection()
+        lru = EmbeddingLRU(max_entries=10)
+        cache = EmbeddingCache(
+            collection, lru, ttl_seconds=60, endpoint=ENDPOINT
+        )
+
+        await cache.set_many("model", 2, ["a", "b"], [[0.5, 1], [1, 0.5]])
+
+        operations = collection.bulk_write.await_args.args[0]
+        assert [op._filter["_id"] for op in operations] == [
+            EmbeddingCache.make_key(ENDPOINT, "model", 2, "a"),
+            EmbeddingCache.make_key(ENDPOINT, "model", 2, "b"),
+        ]
+        assert operations[0]._doc["$set"]["embedding"] == [0.5, 1]
+        assert await cache.get_many("model", 2, ["a", "b"]) == [
+            [0.5, 1],
+            [1, 0.5],
+        ]
+        collection.find.assert_not_called()
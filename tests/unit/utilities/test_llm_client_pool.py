@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from openai import AsyncOpenAI
+
+from whyhow_api.utilities.llm_client_pool import LLMClientPool
+
+
+def create(http_client):
+    return AsyncOpenAI(api_key="test-api-key", http_client=http_client)
+
+
+def test_make_key():
+    key = LLMClientPool.make_key("byo-openai", "api key 1")
+
+    assert key == LLMClientPool.make_key("byo-openai", "api key 1")
+    assert key != LLMClientPool.make_key("byo-openai", "api key 2")
+    assert key != LLMClientPool.make_key(
+        "byo-azure-openai", "api key 1", "endpoint", "version"
+    )
+    assert "api key 1" not in key
+
+
+@pytest.mark.asyncio
+async def test_get_reuses_client():
+    pool = LLMClientPool(max_size=2, max_keepalive_connections=5)
+
+    client = pool.get("a", create)
+
+    assert pool.get("a", create) is client
+    assert client._client._transport._pool._max_keepalive_connections == 5
+    await pool.close()
+    assert client.is_closed()
+
+
+@pytest.mark.asyncio
+async def test_get_evicts_least_recently_used():
+    pool = LLMClientPool(max_size=2, close_delay=0.01)
+    a = pool.get("a", create)
+    b = pool.get("b", create)
+    pool.get("a", create)
+
+    pool.get("c", create)
+
+    assert list(pool.clients) == ["a", "c"]
+    # The evicted client stays usable until the close delay has passed
+    assert not b.is_closed()
+    await asyncio.wait_for(asyncio.gather(*pool.closing), timeout=1)
+    assert b.is_closed()
+    assert not a.is_closed()
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_get_replaces_closed_client():
+    pool = LLMClientPool(max_size=2)
+    client = pool.get("a", create)
+    await client.close()
+
+    assert pool.get("a", create) is not client
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_close_closes_evicted_clients():
+    pool = LLMClientPool(max_size=1, close_delay=60)
+    a = pool.get("a", create)
+    pool.get("b", create)
+
+    await pool.close()
+
+    assert a.is_closed()
+    assert not pool.clients
+    assert not pool.closing
@@ -0,0 +1,133 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from whyhow_api.utilities.query_cache import QueryCache
+
+GRAPH_ID = ObjectId()
+USER_ID = ObjectId()
+PARAMETERS = {
+    "query": "Who is Harry's friend?",
+    "entities": ["person"],
+    "relations": ["friends with"],
+    "values": [],
+    "include_chunks": False,
+    "return_answer": True,
+}
+RESULT = {"response": "Ron", "triples": [], "nodes": []}
+
+
+def make_collection(entry=None, entries=None):
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=entry)
+    find = collection.find.return_value.sort.return_value.limit.return_value
+    find.to_list = AsyncMock(return_value=entries or [])
+    collection.update_one = AsyncMock()
+    return collection
+
+
+def test_make_keys():
+    key, scope = QueryCache.make_keys(GRAPH_ID, 1, USER_ID, PARAMETERS)
+
+    # Queries differing only in case, spacing and final punctuation match
+    assert (key, scope) == QueryCache.make_keys(
+        GRAPH_ID,
+        1,
+        USER_ID,
+        {**PARAMETERS, "query": "  who is harry's   FRIEND "},
+    )
+    assert (
+        scope
+        == QueryCache.make_keys(
+            GRAPH_ID, 1, USER_ID, {**PARAMETERS, "query": "Who is Ron?"}
+        )[1]
+    )
+    assert key != QueryCache.make_keys(GRAPH_ID, 2, USER_ID, PARAMETERS)[0]
+    assert (
+        key
+        != QueryCache.make_keys(
+            GRAPH_ID, 1, USER_ID, {**PARAMETERS, "include_chunks": True}
+        )[0]
+    )
+    assert scope != QueryCache.make_keys(ObjectId(), 1, USER_ID, PARAMETERS)[1]
+
+
+class TestQueryCache:
+    @pytest.mark.asyncio
+    async def test_get(self):
+        collection = make_collection({"result": RESULT})
+        cache = QueryCache(collection, ttl_seconds=60)
+
+        result = await cache.get(GRAPH_ID, 1, USER_ID, PARAMETERS)
+
+        assert result == RESULT
+        assert cache.hits == 1
+        key, _ = QueryCache.make_keys(GRAPH_ID, 1, USER_ID, PARAMETERS)
+        assert collection.find_one.await_args.args[0]["_id"] == key
+
+    @pytest.mark.asyncio
+    async def test_get_error_is_miss(self):
+        collection = make_collection()
+        collection.find_one.side_effect = Exception("boom")
+        cache = QueryCache(collection, ttl_seconds=60)
+
+        assert await cache.get(GRAPH_ID, 1, USER_ID, PARAMETERS) is None
+        assert cache.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_get_similar(self):
+        similar = {"embedding": [1, 0.1], "result": RESULT}
+        collection = make_collection(
+            entries=[{"embedding": [0, 1], "result": {}}, similar]
+        )
+        cache = QueryCache(
+            collection, ttl_seconds=60, similarity_threshold=0.95
+        )
+
+        result = await cache.get(
+            GRAPH_ID, 1, USER_ID, PARAMETERS, embedding=[1, 0]
+        )
+
+        assert result == RESULT
+        _, scope = QueryCache.make_keys(GRAPH_ID, 1, USER_ID, PARAMETERS)
+        assert collection.find.call_args.args[0]["scope"] == scope
+
+    @pytest.mark.asyncio
+    async def test_get_similar_below_threshold(self):
+        collection = make_collection(
+            entries=[{"embedding": [0, 1], "result": RESULT}]
+        )
+        cache = QueryCache(
+            collection, ttl_seconds=60, similarity_threshold=0.95
+        )
+
+        assert (
+            await cache.get(GRAPH_ID, 1, USER_ID, PARAMETERS, embedding=[1, 0])
+            is None
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_similar_disabled(self):
+        collection = make_collection()
+        cache = QueryCache(collection, ttl_seconds=60)
+
+        await cache.get(GRAPH_ID, 1, USER_ID, PARAMETERS, embedding=[1, 0])
+
+        collection.find.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_set(self):
+        collection = make_collection()
+        cache = QueryCache(collection, ttl_seconds=60)
+
+        await cache.set(
+            GRAPH_ID, 1, USER_ID, PARAMETERS, RESULT, embedding=[1, 0]
+        )
+
+        key, scope = QueryCache.make_keys(GRAPH_ID, 1, USER_ID, PARAMETERS)
+        query, update = collection.update_one.await_args.args
+        assert query == {"_id": key}
+        assert update["$set"]["scope"] == scope
+        assert update["$set"]["result"] == RESULT
+        assert update["$set"]["embedding"] == [1, 0]
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import pytest
+
+from whyhow_api.utilities.rate_limiter import (
+    RateLimiter,
+    TokenBucket,
+    estimate_tokens,
+    get_rate_limiter,
+)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    # Overestimates English text, of about four characters per token
+    assert estimate_tokens("Alice knows Bob.") == 6
+
+
+def test_token_bucket_refill(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(
+        "whyhow_api.utilities.rate_limiter.time.monotonic", lambda: clock[0]
+    )
+    bucket = TokenBucket(capacity=60)
+    bucket.level = 0
+
+    clock[0] += 10
+    bucket.refill()
+    assert bucket.level == 10
+
+    clock[0] += 120
+    bucket.refill()
+    assert bucket.level == 60
+    assert bucket.delay(90) == 30
+
+
+@pytest.mark.asyncio
+async def test_wait_within_budget():
+    rate_limiter = RateLimiter(rpm_limit=10, tpm_limit=1000)
+
+    await asyncio.wait_for(rate_limiter.wait(500), timeout=1)
+
+    assert rate_limiter.requests.level == pytest.approx(9, abs=0.1)
+    assert rate_limiter.tokens.level == pytest.approx(500, abs=1)
+    assert rate_limiter.timer is None
+
+
+@pytest.mark.asyncio
+async def test_waiters_woken_in_order():
+    # 6000 tokens per minute refill at 100 tokens per second
+    rate_limiter = RateLimiter(rpm_limit=1000, tpm_limit=6000)
+    await rate_limiter.wait(6000)
+    order = []
+
+    async def wait(name, tokens):
+        await rate_limiter.wait(tokens)
+        order.append(name)
+
+    start = time.monotonic()
+    await asyncio.wait_for(
+        asyncio.gather(wait("first", 10), wait("second", 1)), timeout=1
+    )
+
+    assert order == ["first", "second"]
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_skipped():
+    rate_limiter = RateLimiter(rpm_limit=1000, tpm_limit=6000)
+    await rate_limiter.wait(6000)
+
+    cancelled = asyncio.ensure_future(rate_limiter.wait(6000))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    await asyncio.wait_for(rate_limiter.wait(10), timeout=1)
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_oversized_request_is_capped():
+    rate_limiter = RateLimiter(rpm_limit=1000, tpm_limit=60)
+
+    await asyncio.wait_for(rate_limiter.wait(1000), timeout=1)
+
+
+def test_update_from_headers():
+    rate_limiter = RateLimiter(rpm_limit=100, tpm_limit=10000)
+
+    rate_limiter.update_from_headers(
+        {
+            "x-ratelimit-remaining-requests": "5",
+            "x-ratelimit-remaining-tokens": "not a number",
+        }
+    )
+
+    assert rate_limiter.requests.level == pytest.approx(5, abs=0.1)
+    assert rate_limiter.tokens.level == pytest.approx(10000)
+
+    # The provider's remaining budget never raises ours
+    rate_limiter.update_from_headers({"x-ratelimit-remaining-requests": "50"})
+    assert rate_limiter.requests.level < 6
+
+
+def test_get_rate_limiter_shared_per_key():
+    rate_limiter = get_rate_limiter("key_1", rpm_limit=10, tpm_limit=100)
+
+    assert get_rate_limiter("key_1", 20, 200) is rate_limiter
+    assert rate_limiter.requests.capacity == 20
+    assert rate_limiter.tokens.capacity == 200
+    assert get_rate_limiter("key_2", 10, 100) is not rate_limiter
+
+
+def test_get_rate_limiter_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(
+        "whyhow_api.utilities.rate_limiter._rate_limiters", OrderedDict()
+    )
+    monkeypatch.setattr(
+        "whyhow_api.utilities.rate_limiter.MAX_RATE_LIMITERS", 2
+    )
+    rate_limiter_1 = get_rate_limiter("key_1", 10, 100)
+    rate_limiter_2 = get_rate_limiter("key_2", 10, 100)
+    assert get_rate_limiter("key_1", 10, 100) is rate_limiter_1
+
+    get_rate_limiter("key_3", 10, 100)
+
+    assert get_rate_limiter("key_1", 10, 100) is rate_limiter_1
+    assert get_rate_limiter("key_2", 10, 100) is not rate_limiter_2
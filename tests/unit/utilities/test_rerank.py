@@ -0,0 +1,34 @@
+from whyhow_api.utilities.rerank import mmr_rerank
+
+
+def test_mmr_rerank_by_score():
+    results = [
+        {"_id": 1, "score": 0.8},
+        {"_id": 2, "score": 0.9},
+        {"_id": 3, "score": 0.5},
+        {"_id": 4, "score": 0.85},
+    ]
+
+    reranked = mmr_rerank(results, min_score=0.6, top_k=2, mmr_lambda=0.5)
+
+    assert [r["_id"] for r in reranked] == [2, 4]
+
+
+def test_mmr_rerank_diversifies():
+    results = [
+        {"_id": 1, "score": 0.95, "embedding": [1.0, 0.0]},
+        {"_id": 2, "score": 0.94, "embedding": [0.99, 0.01]},
+        {"_id": 3, "score": 0.9, "embedding": [0.0, 1.0]},
+    ]
+
+    reranked = mmr_rerank(results, min_score=0.0, top_k=2, mmr_lambda=0.5)
+    assert [r["_id"] for r in reranked] == [1, 3]
+
+    reranked = mmr_rerank(results, min_score=0.0, top_k=2, mmr_lambda=1.0)
+    assert [r["_id"] for r in reranked] == [1, 2]
+
+
+def test_mmr_rerank_empty():
+    results = [{"_id": 1, "score": 0.5, "embedding": [1.0]}]
+
+    assert mmr_rerank(results, min_score=0.6, top_k=2, mmr_lambda=0.5) == []
@@ -1,6 +1,10 @@
 import pytest
 
-from whyhow_api.utilities.routers import clean_url
+from whyhow_api.utilities.routers import (
+    clean_url,
+    format_sse,
+    iter_ndjson_batches,
+)
 
 
 @pytest.mark.parametrize(
@@ -20,3 +24,32 @@ from whyhow_api.utilities.routers import clean_url
 def test_clean_url(url, expected):
     result = clean_url(url)
     assert result == expected
+
+
+def test_format_sse():
+    assert format_sse("token", "Ron") == 'event: token\ndata: "Ron"\n\n'
+
+
+async def _stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_iter_ndjson_batches():
+    stream = _stream(b'{"a": 1}\n{"a"', b': 2}\n\n{"a": 3}\n', b'{"a": 4}')
+
+    batches = [b async for b in iter_ndjson_batches(stream, batch_size=3)]
+
+    assert batches == [
+        [{"a": 1}, {"a": 2}, {"a": 3}],
+        [{"a": 4}],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_ndjson_batches_invalid_line():
+    stream = _stream(b'{"a": 1}\nnot json\n')
+
+    with pytest.raises(ValueError, match="line 2"):
+        [b async for b in iter_ndjson_batches(stream, batch_size=10)]
@@ -0,0 +1,37 @@
+from opentelemetry.sdk.trace.sampling import Decision
+
+from whyhow_api.utilities.tracing import LLMSpanSampler, StageTimer
+
+
+def test_llm_span_sampler(monkeypatch):
+    monkeypatch.setattr(
+        "whyhow_api.utilities.tracing.random.random", lambda: 0.5
+    )
+    llm_attributes = {"logfire.tags": ("LLM",)}
+
+    def decision(rate, attributes):
+        return (
+            LLMSpanSampler(rate)
+            .should_sample(None, 1, "span", attributes=attributes)
+            .decision
+        )
+
+    assert decision(0.4, llm_attributes) == Decision.DROP
+    assert decision(0.6, llm_attributes) == Decision.RECORD_AND_SAMPLE
+    assert decision(0.0, {}) == Decision.RECORD_AND_SAMPLE
+    assert decision(0.0, None) == Decision.RECORD_AND_SAMPLE
+
+
+def test_stage_timer(monkeypatch):
+    clock = iter([0.0, 1.0, 1.5, 2.0, 2.25, 3.0])
+    monkeypatch.setattr(
+        "whyhow_api.utilities.tracing.time.perf_counter", lambda: next(clock)
+    )
+
+    timer = StageTimer()
+    with timer.stage("search"):
+        pass
+    with timer.stage("search"):
+        pass
+
+    assert timer.total() == {"search": 750.0, "total": 3000.0}
@@ -0,0 +1,75 @@
+import pytest
+from bson import ObjectId
+from bson.binary import Binary
+
+from whyhow_api.schemas.triples import TripleDocumentModel
+from whyhow_api.utilities.vectors import (
+    VECTOR_SUBTYPE,
+    cosine_similarity,
+    decode_vector,
+    encode_vector,
+)
+
+EMBEDDING = [0.5, -0.25, 0.125, -1.0, 0.0, 0.75, -0.5, 0.25, 0.1]
+
+
+def test_encode_array():
+    assert encode_vector(tuple(EMBEDDING), "array") == EMBEDDING
+
+
+def test_encode_float32():
+    vector = encode_vector(EMBEDDING, "float32")
+
+    assert isinstance(vector, Binary)
+    assert vector.subtype == VECTOR_SUBTYPE
+    assert bytes(vector[:2]) == bytes([0x27, 0])
+    # Half the size of an array of doubles
+    assert len(vector) == 2 + 4 * len(EMBEDDING)
+    assert decode_vector(vector) == pytest.approx(EMBEDDING)
+
+
+def test_encode_int8():
+    vector = encode_vector(EMBEDDING, "int8")
+
+    assert bytes(vector[:2]) == bytes([0x03, 0])
+    assert len(vector) == 2 + len(EMBEDDING)
+    # Scaled by the largest component
+    assert decode_vector(vector) == pytest.approx(EMBEDDING, abs=1 / 127)
+
+
+def test_encode_bit():
+    vector = encode_vector(EMBEDDING, "bit")
+
+    # 9 dimensions are packed in 2 bytes with 7 bits of padding
+    assert bytes(vector) == bytes([0x10, 7, 0b10100101, 0b10000000])
+    assert decode_vector(vector) == [1, 0, 1, 0, 0, 1, 0, 1, 1]
+
+
+def test_encode_unknown_format():
+    with pytest.raises(ValueError, match="Unknown embedding storage format"):
+        encode_vector(EMBEDDING, "float16")  # type: ignore[arg-type]
+
+
+def test_decode_other_values():
+    assert decode_vector(EMBEDDING) is EMBEDDING
+    assert decode_vector(None) is None
+    assert decode_vector(Binary(b"\x00", 0)) == Binary(b"\x00", 0)
+
+
+def test_document_embedding_decoded():
+    triple = TripleDocumentModel(
+        head_node=ObjectId(),
+        tail_node=ObjectId(),
+        graph=ObjectId(),
+        created_by=ObjectId(),
+        embedding=encode_vector(EMBEDDING, "float32"),
+    )
+
+    assert triple.embedding == pytest.approx(EMBEDDING)
+
+
+def test_cosine_similarity():
+    assert cosine_similarity([1, 0], [2, 0]) == pytest.approx(1)
+    assert cosine_similarity([1, 0], [0, 1]) == pytest.approx(0)
+    assert cosine_similarity([1, 1], [-1, -1]) == pytest.approx(-1)
+    assert cosine_similarity([0, 0], [1, 0]) == 0